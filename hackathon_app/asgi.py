@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hackathon_app.settings')
+# Serve the analysis endpoints with their async views (uiux_evaluator/async_views.py)
+os.environ.setdefault('UIUX_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -55,6 +56,9 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Tests run on a file rather than SQLite's shared in-memory database,
+        # whose table locks fail the writes full scans make from worker threads
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -64,6 +68,50 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173"
 ]
 
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # Set UIUX_LOG_LEVEL=DEBUG to dump raw analyzer payloads
+        'uiux_evaluator': {
+            'handlers': ['console'],
+            'level': os.environ.get('UIUX_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
+# Cache for upstream analyzer results. UIUX_CACHE_BACKEND selects where they live:
+# 'memory' (per-process LRU), 'sqlite' (the cache table in db.sqlite3, created with
+# `python manage.py createcachetable`) or 'redis' (shared by all workers).
+UIUX_CACHE_BACKEND = os.environ.get('UIUX_CACHE_BACKEND', 'memory')
+
+_ANALYZER_CACHE_BACKENDS = {
+    'memory': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'uiux-analyzer',
+        'OPTIONS': {'MAX_ENTRIES': 2000},
+    },
+    'sqlite': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'uiux_analyzer_cache',
+        'OPTIONS': {'MAX_ENTRIES': 20000, 'CULL_FREQUENCY': 4},
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('UIUX_CACHE_REDIS_URL', 'redis://localhost:6379/1'),
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'analyzer': _ANALYZER_CACHE_BACKENDS[UIUX_CACHE_BACKEND],
+}
+
 # Static files settings
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
@@ -72,3 +120,105 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 WHITENOISE_USE_FINDERS = True
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# UI/UX analyzer settings. Each UIUX_* setting below is optional: its default
+# lives next to the code that reads it, so only deployment-specific values are
+# set here.
+# UIUX_ANALYSIS_DEADLINE: overall per-request budget (seconds) for a
+# single-page analysis (default in uiux_evaluator/views.py)
+# UIUX_FULL_SCAN_WORKERS: pages analyzed in parallel during a full scan
+# (default in uiux_evaluator/views.py)
+
+# UIUX_ANALYZER_CACHE_TTLS = {analyzer: seconds}: how long a successful
+# upstream result is reused before the API is called again (defaults in
+# uiux_evaluator/cache.py)
+
+# Local LLM server (Ollama HTTP API) used for accessibility summaries. Tune
+# with UIUX_LLM_MODEL, UIUX_LLM_TIMEOUT, UIUX_LLM_CONCURRENCY and
+# UIUX_LLM_BATCH_SIZE / UIUX_LLM_BATCH_WINDOW (> 1 lets concurrent summaries
+# share a single generation); defaults in uiux_evaluator/llm.py.
+# Summaries are memoized on the prompt's WAVE fields for UIUX_LLM_SUMMARY_TTL
+# seconds.
+UIUX_LLM_URL = os.environ.get('UIUX_LLM_URL', 'http://localhost:11434')
+
+# Pooled keep-alive HTTP sessions per upstream: UIUX_HTTP_POOL_SIZES =
+# {service: max pooled connections} and UIUX_HTTP_TIMEOUTS = {service:
+# (connect, read) seconds} override the defaults in uiux_evaluator/clients.py
+
+# Async views (ASGI): the analysis endpoints run on the event loop with one
+# pooled httpx client per upstream; UIUX_ASYNC_HTTP_MAX_CONNECTIONS =
+# {service: max connections} caps each pool (defaults in
+# uiux_evaluator/clients.py). hackathon_app/asgi.py turns UIUX_ASYNC_VIEWS on.
+UIUX_ASYNC_VIEWS = os.environ.get('UIUX_ASYNC_VIEWS', '0') == '1'
+
+# Full-scan crawler: UIUX_CRAWL_MAX_DEPTH and UIUX_CRAWL_MAX_PAGES (overridable
+# per request with max_depth / max_pages), UIUX_CRAWL_RENDER (render pages in
+# headless Chrome; False fetches raw HTML), UIUX_CRAWL_RESPECT_ROBOTS and
+# UIUX_CRAWL_USE_SITEMAP (defaults in uiux_evaluator/crawler.py)
+
+# UIUX_BROWSER_POOL_SIZE warm headless Chrome instances are used for link
+# discovery; each is recycled after UIUX_BROWSER_MAX_PAGES page loads, and a
+# page load waits at most UIUX_BROWSER_READY_TIMEOUT seconds for load + network
+# idle (defaults in uiux_evaluator/browser.py)
+
+# Process-wide limits per upstream API, shared across all concurrent requests:
+# UIUX_UPSTREAM_LIMITS = {service: {'rate': requests/second, 'burst': token
+# bucket size, 'concurrency': max calls in flight}}, overriding individual keys
+# of the defaults in uiux_evaluator/ratelimit.py
+
+# Retries and circuit breakers per upstream (resilience.py). attempts includes
+# the first call; only connection errors and 408/425/429/5xx are retried, after
+# a jittered backoff or the upstream's Retry-After, and retries may add at most
+# retry_ratio of recent traffic. failure_threshold consecutive failures open the
+# breaker: calls then fail fast as degraded until a probe after reset_timeout
+# seconds succeeds. UIUX_UPSTREAM_RESILIENCE = {service: {option: value}}
+# overrides individual keys of the defaults in uiux_evaluator/resilience.py.
+
+# SSL Labs assessments are polled by one background scheduler (ssllabs.py).
+# Polls back off from UIUX_SSLLABS_POLL_MIN to UIUX_SSLLABS_POLL_MAX seconds
+# (or follow the API's ETA); an assessment gives up after
+# UIUX_SSLLABS_MAX_DURATION, and a request waits at most
+# UIUX_SSLLABS_REQUEST_WAIT seconds (default in views.py) before reporting it
+# as PENDING. Point UIUX_SSLLABS_API at a local fake server for testing.
+UIUX_SSLLABS_API = os.environ.get('UIUX_SSLLABS_API', 'https://api.ssllabs.com/api/v3')
+
+# Local TLS inspection (security_engine = 'local'): UIUX_TLS_INSPECT_TIMEOUT
+# is the per-handshake timeout in seconds (default in views.py), and
+# UIUX_TLS_CA_FILE an optional CA bundle to trust in addition to the system store
+UIUX_TLS_CA_FILE = os.environ.get('UIUX_TLS_CA_FILE') or None
+
+# Raw upstream responses (Lighthouse reports) are archived compressed in the
+# database, keyed by content hash, unless UIUX_ARCHIVE_RAW_PAYLOADS is False.
+# UIUX_RAW_PAYLOAD_CODEC 'auto' uses zstd when the zstandard package is
+# installed, gzip otherwise. Writes are batched by a background writer
+# (UIUX_ARCHIVE_BATCH_SIZE, UIUX_ARCHIVE_BATCH_WINDOW); defaults in
+# uiux_evaluator/archive.py.
+
+# `manage.py prune_raw_payloads` deletes archived payloads older than
+# UIUX_RAW_PAYLOAD_RETENTION_DAYS (0 keeps them until unreferenced), and
+# payloads no stored scan refers to once they are older than
+# UIUX_RAW_PAYLOAD_ORPHAN_GRACE seconds
+UIUX_RAW_PAYLOAD_RETENTION_DAYS = int(os.environ.get('UIUX_RAW_PAYLOAD_RETENTION_DAYS', '30'))
+
+# Recommendation rules (uiux_evaluator/rules.py) can be replaced per source
+# ('pagespeed', 'security') with UIUX_RECOMMENDATION_RULES; run
+# `manage.py reevaluate_recommendations` to apply new rules to stored scans.
+
+# Prometheus-format metrics (stage latencies, HTTP/retry/error counters, cache
+# hit rates) are served at /api/v1/uiux-feedback/metrics/ when
+# UIUX_METRICS_ENABLED is set. Values are per process. With UIUX_METRICS_TOKEN
+# set, scrapers must send "Authorization: Bearer <token>".
+UIUX_METRICS_ENABLED = os.environ.get('UIUX_METRICS_ENABLED', '0') == '1'
+UIUX_METRICS_TOKEN = os.environ.get('UIUX_METRICS_TOKEN') or None
+
+# Upstream API endpoints (the benchmark command points these at local fakes)
+UIUX_PAGESPEED_API = os.environ.get('UIUX_PAGESPEED_API', 'https://www.googleapis.com/pagespeedonline/v5/runPagespeed')
+UIUX_WAVE_API = os.environ.get('UIUX_WAVE_API', 'https://wave.webaim.org/api/request')
+
+# Background full-scan jobs: 'celery' (needs a broker and `celery -A hackathon_app worker`),
+# 'thread' (in-process background thread) or 'eager' (inline, for tests)
+UIUX_JOB_BACKEND = os.environ.get('UIUX_JOB_BACKEND', 'thread')
+
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+CELERY_TASK_ACKS_LATE = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
@@ -1,3 +1,16 @@
 from django.contrib import admin
+from .models import ScanJob, ScanJobPage
 
-# Register your models here.
+
+class ScanJobPageInline(admin.TabularInline):
+    model = ScanJobPage
+    fields = ['index', 'url', 'status', 'completed_at']
+    readonly_fields = fields
+    extra = 0
+
+
+@admin.register(ScanJob)
+class ScanJobAdmin(admin.ModelAdmin):
+    list_display = ['base_url', 'status', 'completed_pages', 'total_pages', 'created_at']
+    list_filter = ['status']
+    inlines = [ScanJobPageInline]
@@ -0,0 +1,136 @@
+import re
+import statistics
+
+# Numeric PageSpeed fields summarized across pages, per strategy
+PAGESPEED_STRATEGIES = ('mobile', 'desktop')
+DURATION_PATTERN = re.compile(r'([\d.,]+)\s*(ms|s)\b')
+
+
+# Site-level view of a full scan, built one page report at a time so it works
+# for buffered, streamed and background scans alike. Recommendations are
+# interned into one table (each distinct text stored once, with the number of
+# pages it appears on and their indexes), and PageSpeed metrics are reduced to
+# per-strategy min/median/p90 distributions.
+class SiteAggregator:
+    def __init__(self):
+        self._recommendations = {}
+        self._metrics = {}
+        self.pages = 0
+        self.failed_pages = 0
+
+    # Add one page report; returns its compact form, which refers to
+    # recommendations by their id in the table instead of repeating the text.
+    def add(self, index, page_report):
+        self.pages += 1
+        compact = {"index": index, "url": page_report.get("url")}
+        if "error" in page_report:
+            self.failed_pages += 1
+            compact["error"] = page_report["error"]
+            return compact
+
+        categories = page_report.get("final_recommendation", {}).get("categories", {})
+        compact["recommendations"] = {
+            service: [self._intern(service, text, index) for text in texts]
+            for service, texts in categories.items()
+        }
+        scores = self._collect_scores(page_report.get("all_results", {}))
+        if scores:
+            compact["scores"] = scores
+        if page_report.get("skipped_services"):
+            compact["skipped_services"] = page_report["skipped_services"]
+        if page_report.get("degraded_services"):
+            compact["degraded_services"] = page_report["degraded_services"]
+        if "reused" in page_report:
+            compact["reused"] = page_report["reused"]
+        return compact
+
+    def summary(self):
+        table = sorted(self._recommendations.values(), key=lambda entry: (-entry["count"], entry["id"]))
+        return {
+            "pages_analyzed": self.pages,
+            "pages_failed": self.failed_pages,
+            "recommendations": table,
+            "distributions": {
+                strategy: {metric: distribution(values) for metric, values in metrics.items()}
+                for strategy, metrics in self._metrics.items()
+            },
+        }
+
+    # Distinct recommendations per service, in the same shape as a single-page
+    # final_recommendation
+    def final_recommendation(self):
+        categories = {}
+        for entry in self._recommendations.values():
+            categories.setdefault(entry["service"], []).append(entry["text"])
+        if not categories:
+            return {
+                "summary": "No UI/UX feedback could be generated from the analysis.",
+                "categories": {}
+            }
+        return {
+            "summary": "UI/UX recommendations categorized by service.",
+            "categories": categories
+        }
+
+    def _intern(self, service, text, index):
+        entry = self._recommendations.get((service, text))
+        if entry is None:
+            entry = {"id": len(self._recommendations), "service": service, "text": text, "count": 0, "pages": []}
+            self._recommendations[(service, text)] = entry
+        if not entry["pages"] or entry["pages"][-1] != index:
+            entry["count"] += 1
+            entry["pages"].append(index)
+        return entry["id"]
+
+    def _collect_scores(self, all_results):
+        scores = {}
+        pagespeed = all_results.get("pagespeed")
+        if isinstance(pagespeed, dict):
+            for strategy in PAGESPEED_STRATEGIES:
+                details = pagespeed.get(strategy)
+                if not isinstance(details, dict) or "error" in details:
+                    continue
+                values = {
+                    "overall_score": details.get("overall_score"),
+                    "first_contentful_paint_ms": parse_duration_ms(details.get("first_contentful_paint")),
+                    "largest_contentful_paint_ms": parse_duration_ms(details.get("largest_contentful_paint")),
+                }
+                values = {metric: value for metric, value in values.items() if value is not None}
+                for metric, value in values.items():
+                    self._metrics.setdefault(f"pagespeed_{strategy}", {}).setdefault(metric, []).append(value)
+                if values:
+                    scores[f"pagespeed_{strategy}"] = values
+
+        security = all_results.get("security")
+        if isinstance(security, dict) and security.get("ssllabs_grade"):
+            scores["security_grade"] = security["ssllabs_grade"]
+        return scores
+
+
+# Lighthouse display values such as "1.2 s" or "850 ms" (None for "N/A")
+def parse_duration_ms(display_value):
+    if not isinstance(display_value, str):
+        return None
+    match = DURATION_PATTERN.search(display_value.replace('\xa0', ' '))
+    if not match:
+        return None
+    value = float(match.group(1).replace(',', ''))
+    return round(value * 1000 if match.group(2) == 's' else value)
+
+
+def distribution(values):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return {
+        "count": len(ordered),
+        "min": ordered[0],
+        "median": statistics.median(ordered),
+        "p90": percentile(ordered, 90),
+    }
+
+
+# Nearest-rank percentile of an already sorted list
+def percentile(ordered, pct):
+    rank = max(int(-(-pct * len(ordered) // 100)), 1)
+    return ordered[rank - 1]
@@ -0,0 +1,225 @@
+import atexit
+import gzip
+import hashlib
+import json
+import logging
+import queue
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import RawPayload, AnalyzerResult, ScanJobPage
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; gzip is always available
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+
+
+def _codec():
+    preferred = getattr(settings, 'UIUX_RAW_PAYLOAD_CODEC', 'auto')
+    if preferred in ('auto', RawPayload.CODEC_ZSTD) and zstandard is not None:
+        return RawPayload.CODEC_ZSTD
+    return RawPayload.CODEC_GZIP
+
+
+def compress(data, codec):
+    if codec == RawPayload.CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def decompress(data, codec):
+    if codec == RawPayload.CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed payloads")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+# Store raw upstream response bytes, compressed and content-addressed: the key
+# is the SHA-256 of the uncompressed bytes, so re-fetching an unchanged payload
+# stores nothing new (it only refreshes created_at, which retention is measured
+# from). Only the hash is computed in the caller's thread: compressing and
+# storing happen in the background writer (UIUX_ARCHIVE_WRITE_BEHIND = False
+# stores inline instead). Returns the digest, or None if archiving is disabled
+# or fails (the analysis itself must never fail because of the archive).
+def archive_payload(service, raw):
+    if not getattr(settings, 'UIUX_ARCHIVE_RAW_PAYLOADS', True):
+        return None
+    digest = hashlib.sha256(raw).hexdigest()
+    if getattr(settings, 'UIUX_ARCHIVE_WRITE_BEHIND', True):
+        if not get_archive_writer().submit(digest, service, raw):
+            logger.warning("Archive write queue is full; %s payload %s not archived", service, digest)
+            return None
+        return digest
+    try:
+        store_payloads({digest: (service, raw)})
+    except Exception:
+        logger.exception("Could not archive %s payload", service)
+        return None
+    return digest
+
+
+# Store {digest: (service, raw)} payloads in one bulk insert, refreshing the
+# created_at of those already archived
+def store_payloads(payloads):
+    archived = set(RawPayload.objects.filter(pk__in=list(payloads)).values_list('digest', flat=True))
+    if archived:
+        RawPayload.objects.filter(pk__in=archived).update(created_at=timezone.now())
+    codec = _codec()
+    new_payloads = []
+    for digest, (service, raw) in payloads.items():
+        if digest in archived:
+            continue
+        data = compress(raw, codec)
+        new_payloads.append(RawPayload(
+            digest=digest, service=service, codec=codec,
+            size=len(raw), compressed_size=len(data), data=data,
+        ))
+    RawPayload.objects.bulk_create(new_payloads, ignore_conflicts=True)
+
+
+# Writes archived payloads off the request path: a background thread collects
+# queued payloads for up to window seconds (or until batch_size are queued) and
+# stores them with store_payloads. Queued payloads stay readable (load_payload)
+# until they are written; past max_pending_bytes new payloads are dropped
+# rather than holding the caller up.
+class _ArchiveWriter:
+    def __init__(self, batch_size, window, max_pending_bytes):
+        self.batch_size = batch_size
+        self.window = window
+        self.max_pending_bytes = max_pending_bytes
+        self._queue = queue.Queue()
+        self._pending = {}
+        self._pending_bytes = 0
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, name='archive-writer', daemon=True).start()
+
+    def submit(self, digest, service, raw):
+        with self._lock:
+            if digest in self._pending:
+                return True
+            if self._pending and self._pending_bytes + len(raw) > self.max_pending_bytes:
+                return False
+            self._pending[digest] = (service, raw)
+            self._pending_bytes += len(raw)
+        self._queue.put(digest)
+        return True
+
+    def get(self, digest):
+        with self._lock:
+            entry = self._pending.get(digest)
+        return entry[1] if entry else None
+
+    def is_pending(self, digest):
+        with self._lock:
+            return digest in self._pending
+
+    # Block until every payload queued so far has been written
+    def flush(self):
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=self.window))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch):
+        with self._lock:
+            payloads = {digest: self._pending[digest] for digest in batch}
+        try:
+            store_payloads(payloads)
+        except Exception:
+            logger.exception("Could not archive %d payload(s)", len(payloads))
+        finally:
+            close_old_connections()
+            with self._lock:
+                for digest, (service, raw) in payloads.items():
+                    del self._pending[digest]
+                    self._pending_bytes -= len(raw)
+            for _ in batch:
+                self._queue.task_done()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_archive_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = _ArchiveWriter(
+                batch_size=getattr(settings, 'UIUX_ARCHIVE_BATCH_SIZE', 50),
+                window=getattr(settings, 'UIUX_ARCHIVE_BATCH_WINDOW', 0.5),
+                max_pending_bytes=getattr(settings, 'UIUX_ARCHIVE_MAX_PENDING_BYTES', 64 * 1024 * 1024),
+            )
+            atexit.register(_writer.flush)
+        return _writer
+
+
+# Wait for queued payloads to be written; with a digest, only if that payload
+# is still queued
+def flush_archive(digest=None):
+    if _writer is not None and (digest is None or _writer.is_pending(digest)):
+        _writer.flush()
+
+
+def load_payload(digest):
+    raw = _writer.get(digest) if _writer is not None else None
+    if raw is not None:
+        return raw
+    payload = RawPayload.objects.get(pk=digest)
+    return decompress(bytes(payload.data), payload.codec)
+
+
+def load_json(digest):
+    return json.loads(load_payload(digest))
+
+
+# Digests of the archived payloads that stored scans and scan jobs still link to
+def referenced_digests():
+    digests = set()
+    for strategy in ('mobile', 'desktop'):
+        digests.update(AnalyzerResult.objects.filter(service='pagespeed')
+                       .values_list(f'payload__{strategy}__raw_payload', flat=True).iterator())
+        digests.update(ScanJobPage.objects.filter(report__isnull=False)
+                       .values_list(f'report__all_results__pagespeed__{strategy}__raw_payload', flat=True).iterator())
+    digests.discard(None)
+    return digests
+
+
+# Delete archived payloads older than the retention period, and payloads no
+# scan refers to any more. Unreferenced payloads get a grace period first: a
+# payload is archived while its page is analyzed, before the scan is stored.
+# Returns the number of payloads deleted.
+def prune_payloads(retention_days=None, orphan_grace=None):
+    if retention_days is None:
+        retention_days = getattr(settings, 'UIUX_RAW_PAYLOAD_RETENTION_DAYS', 30)
+    if orphan_grace is None:
+        orphan_grace = getattr(settings, 'UIUX_RAW_PAYLOAD_ORPHAN_GRACE', 3600)
+    now = timezone.now()
+    deleted = 0
+    if retention_days:
+        deleted += RawPayload.objects.filter(created_at__lt=now - timedelta(days=retention_days)).delete()[0]
+
+    referenced = referenced_digests()
+    orphans = [digest for digest in RawPayload.objects.filter(created_at__lt=now - timedelta(seconds=orphan_grace))
+               .values_list('digest', flat=True).iterator() if digest not in referenced]
+    for start in range(0, len(orphans), 500):
+        deleted += RawPayload.objects.filter(pk__in=orphans[start:start + 500]).delete()[0]
+    return deleted
@@ -0,0 +1,460 @@
+import asyncio
+import inspect
+import logging
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework import generics, status
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+
+from .aggregation import SiteAggregator
+from .cache import acached_call
+from .clients import httpx
+from .concurrency import arun_parallel, amap_bounded, iterate_in_thread, AsyncSingleFlight
+from .fingerprint import apage_fingerprint
+from .jobs import enqueue_scan_job
+from .llm import get_llm_client, amemoized_summary, LLMError
+from .metrics import span, trace
+from .models import ScanJob, Scan
+from .reports import store_scan_safely, load_previous_pages, IncrementalScanWriter
+from .resilience import arequest_with_retries, degraded_result, CircuitOpenError
+from .serializers import WebsiteURLSerializer, FullScanSerializer, BatchAnalysisSerializer
+from .ssllabs import get_ssllabs_tracker
+from .static_analysis import afetch_and_analyze
+from .tls_inspect import inspect_host
+from .wave import extract_wave_features, prompt_fields, result_fields
+from .views import (
+    UIUXRecommendationAPIView, WebsiteFullScanAPIView, BatchAnalysisAPIView, encode_stream_event, STREAM_CONTENT_TYPES,
+    DEFAULT_ANALYSIS_DEADLINE, DEFAULT_WAVE_API, WAVE_API_KEY, SSLLABS_REQUEST_WAIT, TLS_INSPECT_TIMEOUT, TLS_CA_FILE
+)
+
+logger = logging.getLogger(__name__)
+
+
+# Analyzers for the async views. Upstream I/O awaits the shared httpx clients
+# (clients.py), rate limiters and SSL Labs tracker; request building, parsing
+# and result shaping are the sync view's own methods, so both paths produce
+# identical results. Blocking work (archiving, TLS handshakes) runs in threads.
+class AsyncAnalyzer:
+    def __init__(self):
+        self.sync = UIUXRecommendationAPIView()
+
+    # _request_with_retries on the event loop (resilience.py)
+    async def request_with_retries(self, method, url, service, **kwargs):
+        return await arequest_with_retries(service, method, url, **kwargs)
+
+    async def analyze_pagespeed(self, url, force_refresh=False, evaluate=True):
+        mobile, desktop = await asyncio.gather(
+            self.fetch_pagespeed(url, 'mobile', force_refresh),
+            self.fetch_pagespeed(url, 'desktop', force_refresh),
+        )
+        return self.sync.build_pagespeed_report(mobile, desktop, evaluate)
+
+    async def fetch_pagespeed(self, url, strategy, force_refresh=False):
+        with span('analyzer.pagespeed', strategy=strategy) as current:
+            return current.check(await acached_call(
+                'pagespeed', url, partial(self.request_pagespeed, url, strategy),
+                options={'strategy': strategy}, force_refresh=force_refresh
+            ))
+
+    async def request_pagespeed(self, url, strategy):
+        try:
+            response = await self.request_with_retries('GET', self.sync.pagespeed_api_url(url, strategy), 'pagespeed')
+            # Decoding the report is CPU-bound; archiving it only queues a write (archive.py)
+            return await sync_to_async(self.sync.parse_pagespeed, thread_sensitive=False)(response.content)
+        except CircuitOpenError as e:
+            return degraded_result(e)
+        except Exception as e:
+            return self.sync.pagespeed_error(strategy, e)
+
+    async def analyze_accessibility(self, url, force_refresh=False):
+        with span('analyzer.wave') as current:
+            return current.check(await acached_call(
+                'wave', url, partial(self.request_wave, url),
+                options={'reporttype': '4'}, force_refresh=force_refresh
+            ))
+
+    async def request_wave(self, url):
+        api_endpoint = getattr(settings, 'UIUX_WAVE_API', DEFAULT_WAVE_API)
+        params = {
+            'key': WAVE_API_KEY,
+            'url': url,
+            'reporttype': '4'
+        }
+
+        try:
+            response = await self.request_with_retries('GET', api_endpoint, 'wave', params=params)
+            return response.json()
+        except CircuitOpenError as e:
+            return degraded_result(e)
+        except (httpx.HTTPError, ValueError) as e:
+            return {'error': str(e)}
+
+    async def analyze_accessibility_summary(self, url, force_refresh=False):
+        data = await self.analyze_accessibility(url, force_refresh)
+        if data.get('degraded'):
+            return data
+        if 'error' in data or not data.get('status', {}).get('success', False):
+            return {'error': self.sync.summarize_accessibility_report(data)}
+
+        features = extract_wave_features(data)
+        fields = prompt_fields(features)
+        prompt = self.sync.build_accessibility_prompt(fields)
+        with span('llm.summary') as current:
+            try:
+                summary = await amemoized_summary(fields, partial(get_llm_client().asummarize, prompt))
+            except LLMError as e:
+                current.status = 'error'
+                logger.warning("LLM summary unavailable for %s, using fallback: %s", url, e)
+                summary = self.sync.summarize_accessibility_report(data)
+        return dict(result_fields(features), summary=summary)
+
+    async def analyze_security(self, url, force_refresh=False, engine='ssllabs'):
+        host = self.sync.get_hostname(url).lower()
+        with span('analyzer.security', engine=engine) as current:
+            if engine == 'local':
+                # The handshakes are blocking socket calls
+                compute = partial(
+                    asyncio.to_thread, inspect_host, host, timeout=TLS_INSPECT_TIMEOUT, cafile=TLS_CA_FILE
+                )
+                return current.check(await acached_call(
+                    'tls', f"https://{host}/", compute, force_refresh=force_refresh
+                ))
+            return current.check(await acached_call(
+                'ssllabs', f"https://{host}/", partial(self.assess_ssllabs_host, host, force_refresh),
+                force_refresh=force_refresh
+            ))
+
+    # Waits for the tracker's assessment without holding a thread
+    async def assess_ssllabs_host(self, host, force_refresh=False):
+        with span('ssllabs.wait') as current:
+            assessment = await get_ssllabs_tracker().assess_async(
+                host, timeout=SSLLABS_REQUEST_WAIT, start_new=force_refresh
+            )
+            current.set(assessment_status=assessment['state'], polls=assessment['polls'])
+        return self.sync.build_ssllabs_result(assessment)
+
+    async def analyze_static(self, url, force_refresh=False):
+        with span('analyzer.static') as current:
+            return current.check(
+                await acached_call('static', url, partial(afetch_and_analyze, url), force_refresh=force_refresh)
+            )
+
+
+# Base for the async endpoints: a DRF view whose handlers are coroutines.
+# dispatch follows APIView.dispatch step by step (authentication, permissions,
+# throttling, content negotiation, parsing, exception handling and rendering
+# all come from DRF and its settings) but awaits the handler, so the async
+# endpoints keep the sync views' request and response contract.
+class AsyncAPIView(generics.GenericAPIView):
+    request_trace = None
+
+    async def dispatch(self, request, *args, **kwargs):
+        with trace() as self.request_trace:
+            self.args = args
+            self.kwargs = kwargs
+            request = self.initialize_request(request, *args, **kwargs)
+            self.request = request
+            self.headers = self.default_response_headers
+
+            try:
+                # Authentication and throttling may hit the database or cache
+                await sync_to_async(self.initial)(request, *args, **kwargs)
+                if request.method.lower() in self.http_method_names:
+                    handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+                else:
+                    handler = self.http_method_not_allowed
+                response = handler(request, *args, **kwargs)
+                if inspect.isawaitable(response):
+                    response = await response
+            except Exception as exc:
+                response = self.handle_exception(exc)
+
+            self.response = self.finalize_response(request, response, *args, **kwargs)
+            return self.response
+
+    def get_timings(self, include_spans=True):
+        return self.request_trace.timings(include_spans) if self.request_trace else None
+
+
+# Async UIUXRecommendationAPIView: same request fields and response body
+class AsyncUIUXRecommendationView(AsyncAPIView):
+    serializer_class = WebsiteURLSerializer
+
+    async def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        analyzer = AsyncAnalyzer()
+
+        url = data["url"]
+        services = analyzer.sync.get_requested_services(data)
+        deadline = data.get("deadline_seconds") or DEFAULT_ANALYSIS_DEADLINE
+        force_refresh = data.get("force_refresh", False)
+
+        static_result = None
+        skipped_services = {}
+        if services["static"]:
+            static_result = await analyzer.analyze_static(url, force_refresh)
+            skipped_services = analyzer.sync.skip_remote_services(static_result, services)
+
+        tasks = {}
+        if services["accessibility"]:
+            tasks["accessibility"] = partial(analyzer.analyze_accessibility_summary, url, force_refresh)
+        if services["pagespeed"]:
+            tasks["pagespeed_mobile"] = partial(analyzer.fetch_pagespeed, url, 'mobile', force_refresh)
+            tasks["pagespeed_desktop"] = partial(analyzer.fetch_pagespeed, url, 'desktop', force_refresh)
+        if services["security"]:
+            tasks["security"] = partial(
+                analyzer.analyze_security, url, force_refresh, data.get("security_engine", "ssllabs")
+            )
+
+        outcome, service_timings = await arun_parallel(tasks, deadline=deadline)
+
+        payload = await sync_to_async(analyzer.sync.build_analysis_response)(
+            data, services, outcome, service_timings, static_result, skipped_services
+        )
+        if data.get("include_timings"):
+            payload["timings"] = self.get_timings()
+        return Response(payload)
+
+
+# Async WebsiteFullScanAPIView. Pages are analyzed on the event loop, so a
+# scan holds no thread while it waits on upstreams; crawling (which may drive
+# headless Chrome) still runs in worker threads.
+class AsyncWebsiteFullScanView(AsyncAPIView):
+    serializer_class = FullScanSerializer
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.full_scan = WebsiteFullScanAPIView()
+
+    def discover_pages(self, base_url, options):
+        return iterate_in_thread(self.full_scan.discover_pages(base_url, options))
+
+    async def get_page_analyzer(self, analyzer, base_url, options, defer_rules=False):
+        previous_pages = {}
+        if options.get("incremental"):
+            _, previous_pages = await sync_to_async(load_previous_pages)(base_url, options)
+        return partial(
+            self.analyze_page, analyzer, options=options,
+            host_results=AsyncSingleFlight(memoize=True), previous_pages=previous_pages, defer_rules=defer_rules
+        )
+
+    async def analyze_page(self, analyzer, page_url, options, host_results=None, previous_pages=None,
+                           defer_rules=False):
+        with span('page', url=page_url) as current:
+            page_report = await self._analyze_page(
+                analyzer, page_url, options, host_results, previous_pages, defer_rules
+            )
+            current.set(reused=bool(page_report.get("reused")))
+            return current.check(page_report)
+
+    async def _analyze_page(self, analyzer, page_url, options, host_results=None, previous_pages=None,
+                            defer_rules=False):
+        full_scan = self.full_scan
+        force_refresh = options.get("force_refresh", False)
+        fingerprint = None
+        if options.get("incremental"):
+            previous = (previous_pages or {}).get(page_url)
+            fingerprint = await apage_fingerprint(page_url, previous["fingerprint"] if previous else '')
+            if previous and fingerprint == previous["fingerprint"]:
+                return dict(previous, reused=True)
+
+        try:
+            page_report = full_scan.new_page_report(page_url, fingerprint)
+            services = full_scan.get_page_services(options)
+            engine = options.get("security_engine", "ssllabs")
+
+            if services["static"]:
+                static_result = await analyzer.analyze_static(page_url, force_refresh)
+                full_scan.add_page_result(page_report, "static", static_result)
+                full_scan.skip_page_services(page_report, static_result, services)
+
+            # The page's remote analyzers run concurrently; results are added
+            # in the sync view's order
+            pending = {}
+            if services["pagespeed"]:
+                pending["pagespeed"] = analyzer.analyze_pagespeed(page_url, force_refresh, evaluate=not defer_rules)
+            if services["accessibility"]:
+                pending["accessibility"] = analyzer.analyze_accessibility_summary(page_url, force_refresh)
+            if services["security"]:
+                analyze = partial(analyzer.analyze_security, page_url, force_refresh, engine)
+                if host_results is not None:
+                    pending["security"] = host_results.do(analyzer.sync.get_hostname(page_url).lower(), analyze)
+                else:
+                    pending["security"] = analyze()
+
+            results = await asyncio.gather(*pending.values())
+            for service, result in zip(pending, results):
+                full_scan.add_page_result(page_report, service, result)
+            return page_report
+
+        except Exception as e:
+            return {
+                "url": page_url,
+                "error": f"Failed to analyze {page_url}: {str(e)}"
+            }
+
+    async def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        validated_data = serializer.validated_data
+
+        base_url = validated_data['url']
+        options = self.full_scan.get_scan_options(request.data, validated_data)
+
+        if validated_data.get('run_async'):
+            job = await sync_to_async(self.create_job)(base_url, options)
+            return Response({
+                "job_id": str(job.id),
+                "status": job.status,
+                "status_url": reverse('scan-job-detail', args=[job.id], request=request),
+                "pages_url": reverse('scan-job-pages', args=[job.id], request=request),
+            }, status=status.HTTP_202_ACCEPTED)
+
+        stream_format = validated_data.get('stream')
+        if stream_format:
+            response = StreamingHttpResponse(
+                self.stream_scan(base_url, options, stream_format),
+                content_type=STREAM_CONTENT_TYPES[stream_format]
+            )
+            response['Cache-Control'] = 'no-cache'
+            response['X-Accel-Buffering'] = 'no'
+            return response
+
+        analyzer = AsyncAnalyzer()
+        page_reports = {}
+        analyze = await self.get_page_analyzer(analyzer, base_url, options, defer_rules=True)
+        scanned_pages = self.discover_pages(base_url, options)
+        async for index, page_url, page_report in amap_bounded(analyze, scanned_pages, options["max_workers"]):
+            page_reports[index] = page_report
+        scan_results = [page_reports[index] for index in sorted(page_reports)]
+        self.full_scan.add_recommendations(scan_results)
+
+        aggregator = SiteAggregator()
+        compact_results = [aggregator.add(index, report) for index, report in enumerate(scan_results)]
+        final_recommendation = aggregator.final_recommendation()
+
+        scan = await sync_to_async(store_scan_safely)(
+            Scan.KIND_FULL, base_url, options, scan_results, summary=final_recommendation
+        )
+
+        payload = {
+            "scan_id": scan.id if scan else None,
+            "total_pages_scanned": len(scan_results),
+            "total_pages_reused": sum(1 for report in scan_results if report.get("reused")),
+            "final_recommendation": final_recommendation,
+            "aggregate": aggregator.summary(),
+            "results": compact_results if validated_data.get('compact') else scan_results
+        }
+        if validated_data.get('include_timings'):
+            payload["timings"] = self.get_timings(include_spans=False)
+        return Response(payload)
+
+    def create_job(self, base_url, options):
+        job = ScanJob.objects.create(base_url=base_url, options=options)
+        enqueue_scan_job(job)
+        return job
+
+    # Async generator counterpart of WebsiteFullScanAPIView.stream_scan
+    async def stream_scan(self, base_url, options, stream_format):
+        analyzer = AsyncAnalyzer()
+        discovered = 0
+        completed = 0
+        reused = 0
+        aggregator = SiteAggregator()
+
+        async def discover():
+            nonlocal discovered
+            async for page_url in self.discover_pages(base_url, options):
+                discovered += 1
+                yield page_url
+
+        try:
+            analyze = await self.get_page_analyzer(analyzer, base_url, options)
+            writer = await sync_to_async(IncrementalScanWriter)(Scan.KIND_FULL, base_url, options)
+            async for index, page_url, page_report in amap_bounded(analyze, discover(), options["max_workers"]):
+                completed += 1
+                reused += 1 if page_report.get("reused") else 0
+                await sync_to_async(writer.add)(index, page_report)
+                aggregator.add(index, page_report)
+
+                yield encode_stream_event("page", {"index": index, "report": page_report}, stream_format)
+                yield encode_stream_event("progress", {"completed": completed, "discovered": discovered}, stream_format)
+
+            final_recommendation = aggregator.final_recommendation()
+            scan = await sync_to_async(writer.finish)(final_recommendation)
+            yield encode_stream_event("summary", {
+                "scan_id": scan.id if scan else None,
+                "total_pages_scanned": completed,
+                "total_pages_reused": reused,
+                "final_recommendation": final_recommendation,
+                "aggregate": aggregator.summary()
+            }, stream_format)
+        except Exception as e:
+            logger.exception("Streamed full scan of %s failed", base_url)
+            yield encode_stream_event("error", {"error": f"Full scan failed: {str(e)}"}, stream_format)
+
+
+# Async BatchAnalysisAPIView: same request fields and response body. Under
+# ASGI a sync view runs on the process's single thread-sensitive executor
+# thread, which every sync_to_async call of the async views shares; a large
+# batch there would stall job polling, metrics and the async scans' database
+# writes for minutes. Here the URLs are analyzed on the event loop.
+class AsyncBatchAnalysisView(AsyncAPIView):
+    serializer_class = BatchAnalysisSerializer
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batch = BatchAnalysisAPIView()
+
+    # Yields (index in urls, url, report) as each URL completes
+    async def analyze_batch(self, analyzer, urls, options):
+        analyze = partial(
+            AsyncWebsiteFullScanView().analyze_page, analyzer,
+            options=options, host_results=AsyncSingleFlight(memoize=True)
+        )
+
+        async def interleaved():
+            for url in self.batch.interleave_by_host(urls):
+                yield url
+
+        positions = {url: index for index, url in enumerate(urls)}
+        async for _, url, report in amap_bounded(analyze, interleaved(), options["max_workers"]):
+            scan = await sync_to_async(store_scan_safely)(
+                Scan.KIND_SINGLE, url, options, [report], summary=report.get("final_recommendation")
+            )
+            report["scan_id"] = scan.id if scan else None
+            yield positions[url], url, report
+
+    async def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        options = self.batch.get_batch_options(data)
+        entries = self.batch.dedupe_urls(data["urls"])
+        urls = [url for url, _ in entries]
+        duplicates = {url: submitted for url, submitted in entries if len(submitted) > 1}
+
+        if data.get("run_async"):
+            job = await sync_to_async(self.batch.create_job)(urls, options)
+            return Response(self.batch.job_payload(request, job, data, urls, duplicates),
+                            status=status.HTTP_202_ACCEPTED)
+
+        results = [None] * len(urls)
+        async for index, url, report in self.analyze_batch(AsyncAnalyzer(), urls, options):
+            results[index] = dict(report, submitted_urls=entries[index][1])
+
+        payload = {
+            "total_urls": len(data["urls"]),
+            "unique_urls": len(urls),
+            "results": results
+        }
+        if data.get("include_timings"):
+            payload["timings"] = self.get_timings(include_spans=False)
+        return Response(payload)
@@ -0,0 +1,427 @@
+import json
+import os
+import random
+import re
+import resource
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http.server import BaseHTTPRequestHandler, SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from .aggregation import percentile
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'benchmark_fixtures')
+FIXTURE_SERVICES = ('pagespeed', 'wave', 'ssllabs')
+
+# Simulated upstream response times (seconds). Real ones are far longer
+# (Lighthouse runs take 10-30 s); these keep a benchmark run short while still
+# making the fan-out and pooling behaviour visible.
+DEFAULT_LATENCY = {'pagespeed': 0.3, 'wave': 0.15, 'ssllabs': 0.05, 'llm': 0.1}
+# Statuses returned for injected failures: retryable for the APIs we retry
+INJECTED_ERROR_STATUS = 503
+
+# Path prefixes of the fake upstreams; settings_overrides() points the
+# analyzers at them
+PAGESPEED_PATH = '/pagespeedonline/v5/runPagespeed'
+WAVE_PATH = '/wave/api/request'
+SSLLABS_PATH = '/ssllabs/api/v3'
+LLM_PATH = '/ollama'
+
+LIGHTHOUSE_PAGE_ERROR = {'error': {
+    'code': 500,
+    'message': ("Lighthouse returned error: FAILED_DOCUMENT_REQUEST. Lighthouse was unable to reliably load "
+                "the page you requested. Make sure you are testing the correct URL and that the server is "
+                "properly responding to all requests. (Details: net::ERR_CONNECTION_REFUSED)"),
+    'status': 'INTERNAL',
+}}
+
+BATCH_PROMPT_PATTERN = re.compile(r'Complete each of the following (\d+) tasks')
+
+
+def load_fixtures(directory=FIXTURE_DIR):
+    fixtures = {}
+    for service in FIXTURE_SERVICES:
+        with open(os.path.join(directory, f"{service}.json"), encoding='utf-8') as f:
+            fixtures[service] = json.load(f)
+    return fixtures
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default listen backlog (5) drops connections when hundreds of async
+    # requests connect at once
+    request_queue_size = 1024
+
+
+def _serve(handler):
+    server = _QuietServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, name='benchmark-server', daemon=True).start()
+    return server
+
+
+# Local stand-ins for PageSpeed, WAVE, SSL Labs and the Ollama LLM server. They
+# replay the recorded responses in benchmark_fixtures/ (or another directory of
+# recordings) after a configurable delay, and fail a configurable share of
+# requests with HTTP 503. pagespeed_kb pads Lighthouse reports with screenshot
+# data to a realistic size, since parsing and archiving them is part of the cost.
+# ssllabs_statuses scripts the successive polls of each host: an assessment
+# status ('DNS', 'IN_PROGRESS', 'READY', 'ERROR'), an HTTP status code to answer
+# with, or any other JSON value to return as the body; the last entry repeats.
+# PageSpeed answers for broken_pages like Lighthouse does for a page it cannot
+# load (HTTP 500, "Lighthouse returned error: ...").
+class FakeUpstreams:
+    def __init__(self, fixtures=None, latency=None, error_rate=0.0, pagespeed_kb=0, seed=None,
+                 ssllabs_statuses=('READY',), broken_pages=()):
+        self.fixtures = fixtures or load_fixtures()
+        self.latency = dict(DEFAULT_LATENCY, **(latency or {}))
+        self.error_rate = error_rate
+        self.ssllabs_statuses = tuple(ssllabs_statuses)
+        self.broken_pages = set(broken_pages)
+        self.requests = {service: 0 for service in self.latency}
+        self.errors = {service: 0 for service in self.latency}
+        self.ssllabs_polls = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._pagespeed_body = self._build_pagespeed_body(pagespeed_kb)
+        self._server = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._server = _serve(partial(_UpstreamHandler, self))
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def endpoints(self):
+        return {
+            'pagespeed': self.base_url + PAGESPEED_PATH,
+            'wave': self.base_url + WAVE_PATH,
+            'ssllabs': self.base_url + SSLLABS_PATH,
+            'llm': self.base_url + LLM_PATH,
+        }
+
+    # Count the request, wait out the simulated latency and decide whether it fails
+    def admit(self, service):
+        with self._lock:
+            self.requests[service] += 1
+            failed = self.error_rate > 0 and self._random.random() < self.error_rate
+            if failed:
+                self.errors[service] += 1
+        time.sleep(self.latency.get(service, 0))
+        return not failed
+
+    def pagespeed_body(self):
+        return self._pagespeed_body
+
+    def wave_report(self, url):
+        report = dict(self.fixtures['wave'])
+        report['statistics'] = dict(report.get('statistics', {}), pageurl=url)
+        return report
+
+    # (HTTP status, body) of the next poll of host
+    def ssllabs_poll(self, host):
+        with self._lock:
+            polls = self.ssllabs_polls[host] = self.ssllabs_polls.get(host, 0) + 1
+        step = self.ssllabs_statuses[min(polls, len(self.ssllabs_statuses)) - 1]
+        if isinstance(step, int):
+            return step, {'errors': [{'message': 'Running at full capacity. Please try again later.'}]}
+        if step == 'READY':
+            return 200, dict(self.fixtures['ssllabs'], host=host, status='READY')
+        if step in ('DNS', 'IN_PROGRESS'):
+            endpoints = [{'ipAddress': '127.0.0.1', 'statusMessage': 'In progress', 'eta': 1}]
+            return 200, {'host': host, 'status': step, 'endpoints': endpoints if step == 'IN_PROGRESS' else []}
+        if step == 'ERROR':
+            return 200, {'host': host, 'status': 'ERROR', 'statusMessage': 'Unable to resolve domain name'}
+        return 200, step
+
+    def llm_answer(self, body):
+        prompt = body.get('prompt', '')
+        match = BATCH_PROMPT_PATTERN.search(prompt)
+        if match and body.get('format') == 'json':
+            count = int(match.group(1))
+            return json.dumps({'answers': [self._summary(number) for number in range(1, count + 1)]})
+        return self._summary(1)
+
+    def _summary(self, number):
+        return (f"Summary {number}: the page has missing alternative text, low-contrast links and "
+                f"unlabeled form fields that block screen reader and low-vision users.")
+
+    def _build_pagespeed_body(self, padding_kb):
+        report = json.loads(json.dumps(self.fixtures['pagespeed']))
+        if padding_kb:
+            # Base64-like filler, like the screenshots embedded in real reports
+            filler = ''.join(random.Random(0).choices('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/',
+                                                      k=padding_kb * 1024))
+            report.setdefault('lighthouseResult', {})['fullPageScreenshot'] = {
+                'screenshot': {'data': f"data:image/webp;base64,{filler}", 'width': 412, 'height': 4120}
+            }
+        return json.dumps(report).encode('utf-8')
+
+
+class _UpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def __init__(self, upstreams, *args, **kwargs):
+        self.upstreams = upstreams
+        super().__init__(*args, **kwargs)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        if parts.path == PAGESPEED_PATH:
+            if self.upstreams.admit('pagespeed'):
+                if query.get('url') in self.upstreams.broken_pages:
+                    return self._send_json(500, LIGHTHOUSE_PAGE_ERROR)
+                return self._send(200, self.upstreams.pagespeed_body())
+        elif parts.path == WAVE_PATH:
+            if self.upstreams.admit('wave'):
+                return self._send_json(200, self.upstreams.wave_report(query.get('url', '')))
+        elif parts.path == f"{SSLLABS_PATH}/analyze":
+            if self.upstreams.admit('ssllabs'):
+                return self._send_json(*self.upstreams.ssllabs_poll(query.get('host', '')))
+        else:
+            return self._send_json(404, {'error': 'Unknown endpoint'})
+        self._send_json(INJECTED_ERROR_STATUS, {'error': 'Injected failure'})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+        if urlsplit(self.path).path != f"{LLM_PATH}/api/generate":
+            return self._send_json(404, {'error': 'Unknown endpoint'})
+        if not self.upstreams.admit('llm'):
+            return self._send_json(INJECTED_ERROR_STATUS, {'error': 'Injected failure'})
+        self._send_json(200, {'model': body.get('model'), 'response': self.upstreams.llm_answer(body), 'done': True})
+
+    def _send_json(self, status, payload):
+        self._send(status, json.dumps(payload).encode('utf-8'))
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _SiteHandler(SimpleHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Generated static website for crawling: pages form a tree (each page links to
+# links_per_page children, plus the home page), with robots.txt and a sitemap
+# listing every page when sitemap=True. Pages carry the usual static-analysis
+# findings (images without alt text, an unlabeled input) and filler text up to
+# page_kb kilobytes.
+class StaticSite:
+    def __init__(self, pages=50, links_per_page=3, page_kb=20, sitemap=False):
+        self.pages = pages
+        self.links_per_page = links_per_page
+        self.page_kb = page_kb
+        self.sitemap = sitemap
+        self.directory = None
+        self._server = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def page_urls(self):
+        return [self.base_url] + [f"{self.base_url}page-{number}.html" for number in range(1, self.pages)]
+
+    def start(self):
+        self.directory = tempfile.mkdtemp(prefix='uiux-benchmark-site-')
+        self._server = _serve(partial(_SiteHandler, directory=self.directory))
+        self._write_pages()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        if self.directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _write_pages(self):
+        filler = ("<p>Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor "
+                  "incididunt ut labore et dolore magna aliqua.</p>\n")
+        body_filler = filler * max(self.page_kb * 1024 // len(filler), 1)
+        for number in range(self.pages):
+            children = [
+                child for child in range(number * self.links_per_page + 1, (number + 1) * self.links_per_page + 1)
+                if child < self.pages
+            ]
+            links = ''.join(f'<li><a href="/page-{child}.html">Page {child}</a></li>' for child in children)
+            html = (
+                f"<!DOCTYPE html>\n<html lang=\"en\"><head><meta charset=\"utf-8\">"
+                f"<meta name=\"viewport\" content=\"width=device-width, initial-scale=1\">"
+                f"<title>Benchmark page {number}</title></head>\n<body>\n"
+                f"<nav><a href=\"/\">Home</a><ul>{links}</ul></nav>\n<main><h1>Page {number}</h1>\n"
+                f"<img src=\"/hero-{number}.jpg\"><img src=\"/logo.png\" alt=\"Logo\">\n"
+                f"<form><input type=\"text\" name=\"q\"><button>Search</button></form>\n"
+                f"{body_filler}</main>\n</body></html>\n"
+            )
+            name = 'index.html' if number == 0 else f"page-{number}.html"
+            with open(os.path.join(self.directory, name), 'w', encoding='utf-8') as f:
+                f.write(html)
+
+        robots = "User-agent: *\nAllow: /\n"
+        if self.sitemap:
+            robots += f"Sitemap: {self.base_url}sitemap.xml\n"
+            entries = ''.join(f"<url><loc>{url}</loc></url>" for url in self.page_urls())
+            with open(os.path.join(self.directory, 'sitemap.xml'), 'w', encoding='utf-8') as f:
+                f.write(f'<?xml version="1.0" encoding="UTF-8"?>\n'
+                        f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>\n')
+        with open(os.path.join(self.directory, 'robots.txt'), 'w', encoding='utf-8') as f:
+            f.write(robots)
+
+
+# Settings that point every analyzer at the fakes. Rate limits are lifted
+# (unless keep_rate_limits) and SSL Labs polling is shortened, since the fakes
+# have no quota; pages are crawled without Chrome.
+def settings_overrides(upstreams, keep_rate_limits=False):
+    endpoints = upstreams.endpoints()
+    overrides = {
+        'UIUX_PAGESPEED_API': endpoints['pagespeed'],
+        'UIUX_WAVE_API': endpoints['wave'],
+        'UIUX_SSLLABS_API': endpoints['ssllabs'],
+        'UIUX_SSLLABS_POLL_MIN': 0.05,
+        'UIUX_SSLLABS_POLL_MAX': 1,
+        'UIUX_LLM_URL': endpoints['llm'],
+        'UIUX_CRAWL_RENDER': False,
+    }
+    if not keep_rate_limits:
+        unlimited = {'rate': 1000.0, 'burst': 1000, 'concurrency': 256}
+        overrides['UIUX_UPSTREAM_LIMITS'] = {service: unlimited for service in ('pagespeed', 'wave', 'ssllabs', 'site')}
+    return overrides
+
+
+# Drop the process-wide clients built from settings (HTTP sessions, limiters,
+# circuit breakers, SSL Labs tracker, LLM client) so they are rebuilt from the
+# current settings
+def reset_shared_clients():
+    from . import clients, llm, ratelimit, resilience, ssllabs
+
+    with clients._sessions_lock:
+        clients._sessions.clear()
+    clients._async_clients.clear()
+    with ratelimit._limiters_lock:
+        ratelimit._limiters.clear()
+    with resilience._policies_lock:
+        resilience._policies.clear()
+    with ssllabs._tracker_lock:
+        ssllabs._tracker = None
+    with llm._client_lock:
+        llm._client = None
+
+
+def current_rss_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+
+# Peak resident set size while a block runs, sampled every interval seconds
+# (falls back to the process-lifetime peak where /proc is unavailable)
+class RssSampler:
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.peak = current_rss_bytes()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+        self._sample()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        self.peak = max(self.peak, current_rss_bytes())
+
+
+# Issue `requests` calls of make_request (which returns (ok, pages)) from
+# `concurrency` client threads and summarize latency, throughput and memory
+def run_load(make_request, requests, concurrency):
+    def timed(number):
+        started = time.perf_counter()
+        try:
+            ok, pages = make_request(number)
+        except Exception:
+            ok, pages = False, 0
+        return time.perf_counter() - started, ok, pages
+
+    with RssSampler() as rss:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='benchmark-client') as pool:
+            outcomes = list(pool.map(timed, range(requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency * 1000 for latency, _, _ in outcomes)
+    pages = sum(count for _, _, count in outcomes)
+    return {
+        'requests': requests,
+        'errors': sum(1 for _, ok, _ in outcomes if not ok),
+        'p50_ms': round(percentile(latencies, 50), 1),
+        'p95_ms': round(percentile(latencies, 95), 1),
+        'max_ms': round(latencies[-1], 1),
+        'throughput_rps': round(requests / elapsed, 2),
+        'pages_per_second': round(pages / elapsed, 2),
+        'peak_rss_mb': round(rss.peak / (1024 * 1024), 1),
+        'wall_seconds': round(elapsed, 2),
+    }
+
+
+def result_key(result):
+    return (result['scenario'], result.get('concurrency'), result.get('pages'), result.get('workers'))
+
+
+# Scenarios whose p95 latency rose, or throughput fell, by more than
+# max_regression percent compared with a previous run's results
+def find_regressions(results, baseline, max_regression):
+    previous = {result_key(result): result for result in baseline}
+    tolerance = max_regression / 100
+    regressions = []
+    for result in results:
+        before = previous.get(result_key(result))
+        if before is None:
+            continue
+        if before['p95_ms'] and result['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            regressions.append((result, 'p95_ms', before['p95_ms'], result['p95_ms']))
+        if before['throughput_rps'] and result['throughput_rps'] < before['throughput_rps'] * (1 - tolerance):
+            regressions.append((result, 'throughput_rps', before['throughput_rps'], result['throughput_rps']))
+    return regressions
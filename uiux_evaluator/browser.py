@@ -0,0 +1,153 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .metrics import span
+
+logger = logging.getLogger(__name__)
+
+# Resource count is considered settled once it stops changing for this long
+NETWORK_IDLE_WINDOW = 0.5
+
+
+def default_chrome_factory():
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
+    options = Options()
+    options.add_argument('--headless')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    # Return from driver.get() at DOMContentLoaded; readiness is awaited explicitly
+    options.page_load_strategy = 'eager'
+    return webdriver.Chrome(options=options)
+
+
+# Wait for document.readyState == 'complete' and then for the number of loaded
+# resources to stop growing (a cheap network-idle signal), never longer than timeout.
+def wait_until_ready(driver, timeout, idle_window=NETWORK_IDLE_WINDOW):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if driver.execute_script('return document.readyState') == 'complete':
+            break
+        time.sleep(0.05)
+
+    last_count = None
+    stable_since = time.monotonic()
+    while time.monotonic() < deadline:
+        count = driver.execute_script("return performance.getEntriesByType('resource').length")
+        now = time.monotonic()
+        if count != last_count:
+            last_count, stable_since = count, now
+        elif now - stable_since >= idle_window:
+            return True
+        time.sleep(0.1)
+    return False
+
+
+class _PooledBrowser:
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+
+
+# Pool of warm headless browsers with lease/return semantics. Browsers are
+# health-checked when leased and recycled after max_pages page loads (or any
+# error) so memory leaks in long-lived Chrome processes stay bounded.
+class BrowserPool:
+    def __init__(self, size=2, max_pages=50, factory=default_chrome_factory, ready_timeout=10):
+        self.size = size
+        self.max_pages = max_pages
+        self.factory = factory
+        self.ready_timeout = ready_timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._browsers = set()
+
+    @contextmanager
+    def lease(self, timeout=None):
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("No browser available in the pool")
+        browser = None
+        healthy = False
+        try:
+            browser = self._checkout()
+            yield browser.driver
+            healthy = True
+        finally:
+            if browser is not None:
+                browser.pages += 1
+                if healthy and browser.pages < self.max_pages:
+                    self._idle.put(browser)
+                else:
+                    self._discard(browser)
+            self._slots.release()
+
+    # Load a URL in a pooled browser and return the rendered HTML
+    def render(self, url, timeout=None):
+        with self.lease(timeout=timeout) as driver, span('browser.render') as current:
+            driver.get(url)
+            current.set(network_idle=wait_until_ready(driver, self.ready_timeout))
+            return driver.page_source
+
+    def close(self):
+        with self._lock:
+            browsers = list(self._browsers)
+        for browser in browsers:
+            self._discard(browser)
+
+    def _checkout(self):
+        while True:
+            try:
+                browser = self._idle.get_nowait()
+            except queue.Empty:
+                return self._launch()
+            if self._is_healthy(browser):
+                return browser
+            self._discard(browser)
+
+    # Chrome startup, timed separately from page loads as 'browser.launch'
+    def _launch(self):
+        with span('browser.launch'):
+            browser = _PooledBrowser(self.factory())
+        with self._lock:
+            self._browsers.add(browser)
+        return browser
+
+    def _is_healthy(self, browser):
+        try:
+            return browser.driver.execute_script('return 1') == 1
+        except Exception:
+            return False
+
+    def _discard(self, browser):
+        with self._lock:
+            self._browsers.discard(browser)
+        try:
+            browser.driver.quit()
+        except Exception as e:
+            logger.debug("Error closing browser: %s", e)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool(
+                size=getattr(settings, 'UIUX_BROWSER_POOL_SIZE', 2),
+                max_pages=getattr(settings, 'UIUX_BROWSER_MAX_PAGES', 50),
+                ready_timeout=getattr(settings, 'UIUX_BROWSER_READY_TIMEOUT', 10),
+            )
+            atexit.register(_pool.close)
+        return _pool
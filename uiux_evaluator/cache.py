@@ -0,0 +1,104 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+
+from .metrics import record_cache_lookup
+from .urlutils import normalize_url
+
+# How long (seconds) a successful upstream result stays fresh, per analyzer
+DEFAULT_TTLS = {
+    'pagespeed': 6 * 60 * 60,
+    'wave': 24 * 60 * 60,
+    'ssllabs': 24 * 60 * 60,
+    'static': 15 * 60,
+    'tls': 60 * 60,
+}
+DEFAULT_TTL = 60 * 60
+
+
+def get_analyzer_cache():
+    try:
+        return caches[getattr(settings, 'UIUX_ANALYZER_CACHE', 'analyzer')]
+    except InvalidCacheBackendError:
+        return caches['default']
+
+
+# UIUX_ANALYZER_CACHE_TTLS overrides the TTL of individual analyzers
+def get_ttl(analyzer):
+    ttls = getattr(settings, 'UIUX_ANALYZER_CACHE_TTLS', {})
+    return ttls.get(analyzer, DEFAULT_TTLS.get(analyzer, DEFAULT_TTL))
+
+
+def make_cache_key(analyzer, url, options=None):
+    payload = json.dumps(
+        {'url': normalize_url(url), 'options': options or {}}, sort_keys=True, separators=(',', ':')
+    )
+    return f"uiux:{analyzer}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+# Return the cached result for (analyzer, url, options) or compute and store it.
+# Results carrying an 'error' are never stored. The returned dict gets a 'cache'
+# entry describing whether it was served from the cache and how old it is.
+def cached_call(analyzer, url, compute, options=None, force_refresh=False):
+    cache = get_analyzer_cache()
+    key = make_cache_key(analyzer, url, options)
+    ttl = get_ttl(analyzer)
+
+    if not force_refresh:
+        entry = cache.get(key)
+        if entry is not None:
+            record_cache_lookup(analyzer, hit=True)
+            return _from_entry(entry, ttl)
+
+    record_cache_lookup(analyzer, hit=False)
+    result = compute()
+    if isinstance(result, dict):
+        if is_cacheable(result):
+            cache.set(key, {'result': result, 'stored_at': time.time()}, ttl)
+        result['cache'] = {'hit': False, 'age_seconds': 0, 'ttl_seconds': ttl}
+    return result
+
+
+# cached_call for async callers; compute is a coroutine function
+async def acached_call(analyzer, url, compute, options=None, force_refresh=False):
+    cache = get_analyzer_cache()
+    key = make_cache_key(analyzer, url, options)
+    ttl = get_ttl(analyzer)
+
+    if not force_refresh:
+        entry = await cache.aget(key)
+        if entry is not None:
+            record_cache_lookup(analyzer, hit=True)
+            return _from_entry(entry, ttl)
+
+    record_cache_lookup(analyzer, hit=False)
+    result = await compute()
+    if isinstance(result, dict):
+        if is_cacheable(result):
+            await cache.aset(key, {'result': result, 'stored_at': time.time()}, ttl)
+        result['cache'] = {'hit': False, 'age_seconds': 0, 'ttl_seconds': ttl}
+    return result
+
+
+def _from_entry(entry, ttl):
+    result = entry['result']
+    if isinstance(result, dict):
+        result['cache'] = {
+            'hit': True,
+            'age_seconds': round(time.time() - entry['stored_at'], 1),
+            'ttl_seconds': ttl,
+        }
+    return result
+
+
+def is_cacheable(result):
+    if 'error' in result:
+        return False
+    status = result.get('status')
+    if isinstance(status, dict) and not status.get('success', True):
+        return False
+    return True
@@ -0,0 +1,156 @@
+import asyncio
+import threading
+import weakref
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from .concurrency import deadline_timeout, DeadlineExceeded
+from .metrics import span, HTTP_REQUESTS
+
+try:
+    import httpx
+except ImportError:  # only needed by the async (ASGI) views
+    httpx = None
+
+USER_AGENT = 'UIUXAnalyzer/1.0 (+https://yourdomain.com)'
+
+# (connect, read) timeouts in seconds per upstream service
+DEFAULT_TIMEOUTS = {
+    'pagespeed': (10, 120),  # Lighthouse runs can legitimately take over a minute
+    'wave': (10, 90),
+    'ssllabs': (10, 30),
+    'site': (5, 15),         # fetching the analyzed site itself
+}
+DEFAULT_TIMEOUT = (10, 60)
+
+# Max pooled keep-alive connections per upstream service
+DEFAULT_POOL_SIZES = {
+    'pagespeed': 16,
+    'wave': 8,
+    'ssllabs': 4,
+    'site': 16,
+}
+DEFAULT_POOL_SIZE = 10
+
+# Max connections per async (httpx) client; the event loop has no thread cap,
+# so these bound how many calls one process makes to a service at once
+DEFAULT_ASYNC_MAX_CONNECTIONS = {
+    'pagespeed': 100,
+    'wave': 50,
+    'site': 200,
+}
+DEFAULT_ASYNC_MAX_CONNECTION = 100
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+# Process-wide keep-alive session for an upstream service. Every thread talking
+# to that service shares the session's connection pool, so TCP/TLS handshakes
+# are paid once per pooled connection instead of once per call.
+# Note: requests/urllib3 speak HTTP/1.1; concurrency comes from the pool size.
+def get_session(service):
+    with _sessions_lock:
+        session = _sessions.get(service)
+        if session is None:
+            pool_sizes = getattr(settings, 'UIUX_HTTP_POOL_SIZES', {})
+            pool_size = pool_sizes.get(service, DEFAULT_POOL_SIZES.get(service, DEFAULT_POOL_SIZE))
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=False)
+            session = requests.Session()
+            session.headers['User-Agent'] = USER_AGENT
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _sessions[service] = session
+        return session
+
+
+def get_timeout(service):
+    timeouts = getattr(settings, 'UIUX_HTTP_TIMEOUTS', {})
+    return timeouts.get(service, DEFAULT_TIMEOUTS.get(service, DEFAULT_TIMEOUT))
+
+
+# One upstream HTTP attempt, timed as an 'http.<service>' span and counted by
+# status code ('error' when no response arrived). Inside a run_parallel task
+# the timeout is capped at the task's deadline, and a timeout caused by that
+# cap raises DeadlineExceeded rather than counting against the upstream.
+def http_request(service, method, url, **kwargs):
+    timeout = kwargs.get('timeout', get_timeout(service))
+    kwargs['timeout'] = deadline_timeout(timeout)
+    with span(f"http.{service}", method=method) as current:
+        try:
+            response = get_session(service).request(method, url, **kwargs)
+        except requests.RequestException as e:
+            HTTP_REQUESTS.inc(service=service, status='error')
+            if isinstance(e, requests.Timeout) and kwargs['timeout'] != timeout:
+                raise DeadlineExceeded(f"{service} request cut short by the analysis deadline") from e
+            raise
+        HTTP_REQUESTS.inc(service=service, status=str(response.status_code))
+        current.set(status_code=response.status_code)
+        if response.status_code >= 400:
+            current.status = 'error'
+        return response
+
+
+# Async counterpart of get_session: one httpx client per service and event
+# loop (clients cannot be shared across loops). Under ASGI there is a single
+# loop per process, so every in-flight request shares the pooled connections.
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client(service):
+    if httpx is None:
+        raise RuntimeError("httpx is required for the async views")
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get(service)
+    if client is None:
+        connect, read = get_timeout(service)
+        max_connections = getattr(settings, 'UIUX_ASYNC_HTTP_MAX_CONNECTIONS', {}).get(
+            service, DEFAULT_ASYNC_MAX_CONNECTIONS.get(service, DEFAULT_ASYNC_MAX_CONNECTION)
+        )
+        client = clients[service] = httpx.AsyncClient(
+            headers={'User-Agent': USER_AGENT},
+            timeout=httpx.Timeout(read, connect=connect, pool=None),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            follow_redirects=True,
+        )
+    return client
+
+
+async def async_http_request(service, method, url, **kwargs):
+    with span(f"http.{service}", method=method) as current:
+        try:
+            response = await get_async_client(service).request(method, url, **kwargs)
+        except httpx.HTTPError:
+            HTTP_REQUESTS.inc(service=service, status='error')
+            raise
+        HTTP_REQUESTS.inc(service=service, status=str(response.status_code))
+        current.set(status_code=response.status_code)
+        if response.status_code >= 400:
+            current.status = 'error'
+        return response
+
+
+# Connection reuse per service: requests sent vs. connections actually opened
+def connection_stats():
+    with _sessions_lock:
+        sessions = dict(_sessions)
+
+    stats = {}
+    for service, session in sessions.items():
+        opened = sent = 0
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    opened += pool.num_connections
+                    sent += pool.num_requests
+        stats[service] = {
+            'requests': sent,
+            'connections_opened': opened,
+            'connections_reused': max(sent - opened, 0),
+            'reuse_ratio': round((sent - opened) / sent, 3) if sent else 0.0,
+        }
+    return stats
@@ -0,0 +1,335 @@
+import asyncio
+import contextvars
+import queue
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from functools import partial
+
+# time.monotonic() deadline of the run_parallel task running in this context
+_deadline = contextvars.ContextVar('uiux_deadline', default=None)
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+# Seconds left before the current task's deadline, or None without one
+def remaining_time():
+    expires_at = _deadline.get()
+    return None if expires_at is None else expires_at - time.monotonic()
+
+
+# timeout (seconds, None or a (connect, read) pair) capped at the time left
+# before the current task's deadline. Raises DeadlineExceeded once it passed.
+def deadline_timeout(timeout):
+    remaining = remaining_time()
+    if remaining is None:
+        return timeout
+    if remaining <= 0:
+        raise DeadlineExceeded("The analysis deadline has passed")
+    if isinstance(timeout, tuple):
+        return tuple(remaining if value is None else min(value, remaining) for value in timeout)
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+# Run independent callables in parallel and collect their results by name.
+# Each call gets its own short-lived pool so analyzers that fan out internally
+# (e.g. PageSpeed mobile/desktop) can never deadlock on a shared pool.
+# Tasks still running when the deadline expires are abandoned: their result is
+# replaced with an error marker and the caller gets whatever finished in time.
+# Tasks see the deadline (deadline_timeout), so upstream calls they make are
+# cut short and an abandoned task stops at its next call instead of holding
+# connection and rate limiter slots. Tasks run in a copy of the caller's
+# context, so tracing spans (metrics.py) opened in them belong to the caller's
+# request.
+def run_parallel(tasks, deadline=None):
+    results = {}
+    timings = {}
+    if not tasks:
+        return results, timings
+
+    started = time.monotonic()
+    expires_at = started + deadline if deadline else None
+    pool = ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix='uiux-task')
+    futures = {}
+    try:
+        for name, func in tasks.items():
+            futures[pool.submit(_task_context(expires_at).run, _timed_call, func)] = name
+
+        pending = set(futures)
+        while pending:
+            timeout = None
+            if expires_at is not None:
+                timeout = max(expires_at - time.monotonic(), 0)
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = futures[future]
+                result, error, elapsed = future.result()
+                if error is not None:
+                    results[name] = {'error': f"{name} failed: {error}"}
+                    timings[name] = {'status': 'error', 'elapsed_ms': _ms(elapsed)}
+                else:
+                    results[name] = result
+                    timings[name] = {'status': 'ok', 'elapsed_ms': _ms(elapsed)}
+            if not done and expires_at is not None and time.monotonic() >= expires_at:
+                break
+
+        for future in pending:
+            name = futures[future]
+            future.cancel()
+            results[name] = {
+                'error': f"{name} did not finish within the {deadline:g}s deadline",
+                'timed_out': True,
+            }
+            timings[name] = {'status': 'timeout', 'elapsed_ms': _ms(time.monotonic() - started)}
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    return results, timings
+
+
+# Copy of the caller's context with the earlier of its deadline and expires_at
+def _task_context(expires_at):
+    context = contextvars.copy_context()
+    current = context.get(_deadline)
+    if expires_at is not None and (current is None or expires_at < current):
+        context.run(_deadline.set, expires_at)
+    return context
+
+
+def _timed_call(func):
+    started = time.monotonic()
+    try:
+        return func(), None, time.monotonic() - started
+    except Exception as e:
+        return None, e, time.monotonic() - started
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1)
+
+
+_SOURCE_EXHAUSTED = object()
+
+
+# Apply func to every item with at most max_workers calls in flight, yielding
+# (index, item, result) in completion order. The source is consumed lazily from a
+# feeder thread, so it may be a generator that is still discovering items.
+# Exceptions raised by func or by the source are re-raised in the caller.
+# The feeder and every call run in a copy of the caller's context.
+def map_bounded(func, items, max_workers):
+    completed = queue.Queue()
+    slots = threading.BoundedSemaphore(max_workers)
+    stopped = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='uiux-worker')
+
+    def on_done(index, item, future):
+        slots.release()
+        completed.put((index, item, future))
+
+    def feed():
+        submitted = 0
+        try:
+            for index, item in enumerate(items):
+                while not slots.acquire(timeout=0.5):
+                    if stopped.is_set():
+                        return
+                if stopped.is_set():
+                    slots.release()
+                    return
+                pool.submit(contextvars.copy_context().run, func, item).add_done_callback(partial(on_done, index, item))
+                submitted += 1
+        except Exception as e:
+            completed.put((_SOURCE_EXHAUSTED, submitted, e))
+        else:
+            completed.put((_SOURCE_EXHAUSTED, submitted, None))
+
+    feeder = threading.Thread(target=contextvars.copy_context().run, args=(feed,), name='uiux-feeder', daemon=True)
+    feeder.start()
+
+    yielded = 0
+    total = None
+    source_error = None
+    try:
+        while total is None or yielded < total:
+            index, item, future = completed.get()
+            if index is _SOURCE_EXHAUSTED:
+                total, source_error = item, future
+                continue
+            yielded += 1
+            yield index, item, future.result()
+        if source_error is not None:
+            raise source_error
+    finally:
+        stopped.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Coalesce concurrent calls that share a key onto a single execution: the first
+# caller runs func, everyone else arriving while it is in flight waits for and
+# receives the same result. With memoize=True successful results are also kept
+# for the lifetime of the group (e.g. one full scan).
+class SingleFlight:
+    def __init__(self, memoize=False):
+        self.memoize = memoize
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._results = {}
+
+    def do(self, key, func):
+        with self._lock:
+            if key in self._results:
+                return self._results[key]
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+
+        if leader:
+            try:
+                result = func()
+            except Exception as e:
+                call.set_exception(e)
+            else:
+                call.set_result(result)
+                if self.memoize:
+                    with self._lock:
+                        self._results[key] = result
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+
+        return call.result()
+
+
+# Async counterpart of run_parallel for the ASGI views: tasks are coroutine
+# functions run concurrently on the event loop, with the same results/timings
+# shape. Tasks still running at the deadline are cancelled.
+async def arun_parallel(tasks, deadline=None):
+    results = {}
+    timings = {}
+    if not tasks:
+        return results, timings
+
+    started = time.monotonic()
+    running = {asyncio.ensure_future(_atimed_call(func)): name for name, func in tasks.items()}
+    done, pending = await asyncio.wait(running, timeout=deadline)
+    for future in sorted(done, key=lambda future: future.result()[2]):
+        name = running[future]
+        result, error, elapsed = future.result()
+        if error is not None:
+            results[name] = {'error': f"{name} failed: {error}"}
+            timings[name] = {'status': 'error', 'elapsed_ms': _ms(elapsed)}
+        else:
+            results[name] = result
+            timings[name] = {'status': 'ok', 'elapsed_ms': _ms(elapsed)}
+
+    for future in pending:
+        name = running[future]
+        future.cancel()
+        results[name] = {
+            'error': f"{name} did not finish within the {deadline:g}s deadline",
+            'timed_out': True,
+        }
+        timings[name] = {'status': 'timeout', 'elapsed_ms': _ms(time.monotonic() - started)}
+    return results, timings
+
+
+async def _atimed_call(func):
+    started = time.monotonic()
+    try:
+        return await func(), None, time.monotonic() - started
+    except Exception as e:
+        return None, e, time.monotonic() - started
+
+
+# Async counterpart of map_bounded: applies the coroutine function func to the
+# items of an async iterable with at most max_workers calls in flight, yielding
+# (index, item, result) in completion order. The next item is requested while
+# calls are running, so a slow source (e.g. a crawl) overlaps with the analysis.
+async def amap_bounded(func, items, max_workers):
+    source = aiter(items)
+    running = {}
+    fetching = None
+    exhausted = False
+    source_error = None
+    index = 0
+    try:
+        while True:
+            if fetching is None and not exhausted and len(running) < max_workers:
+                fetching = asyncio.ensure_future(_anext_or_exhausted(source))
+            waiting = set(running) | ({fetching} if fetching is not None else set())
+            if not waiting:
+                break
+            done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+
+            if fetching in done:
+                done.discard(fetching)
+                try:
+                    item = fetching.result()
+                except Exception as e:
+                    item, source_error = _SOURCE_EXHAUSTED, e
+                fetching = None
+                if item is _SOURCE_EXHAUSTED:
+                    exhausted = True
+                else:
+                    running[asyncio.ensure_future(func(item))] = (index, item)
+                    index += 1
+
+            for future in done:
+                item_index, item = running.pop(future)
+                yield item_index, item, future.result()
+        if source_error is not None:
+            raise source_error
+    finally:
+        for future in list(running) + ([fetching] if fetching is not None else []):
+            future.cancel()
+
+
+async def _anext_or_exhausted(source):
+    try:
+        return await anext(source)
+    except StopAsyncIteration:
+        return _SOURCE_EXHAUSTED
+
+
+# Drive a blocking iterator (e.g. the crawler, which may render pages in
+# Chrome) from async code: every step runs in a worker thread, in a copy of the
+# caller's context.
+async def iterate_in_thread(iterable):
+    iterator = iter(iterable)
+    while True:
+        item = await asyncio.to_thread(next, iterator, _SOURCE_EXHAUSTED)
+        if item is _SOURCE_EXHAUSTED:
+            return
+        yield item
+
+
+# Async counterpart of SingleFlight for coroutine functions. Calls in flight
+# are tracked per event loop; a caller that is cancelled does not cancel the
+# shared call for the others.
+class AsyncSingleFlight:
+    def __init__(self, memoize=False):
+        self.memoize = memoize
+        self._calls = weakref.WeakKeyDictionary()
+        self._results = {}
+
+    async def do(self, key, func):
+        if key in self._results:
+            return self._results[key]
+        calls = self._calls.setdefault(asyncio.get_running_loop(), {})
+        call = calls.get(key)
+        if call is None:
+            call = calls[key] = asyncio.ensure_future(self._run(calls, key, func))
+        return await asyncio.shield(call)
+
+    async def _run(self, calls, key, func):
+        try:
+            result = await func()
+            if self.memoize:
+                self._results[key] = result
+            return result
+        finally:
+            calls.pop(key, None)
@@ -0,0 +1,184 @@
+import logging
+from collections import deque
+from urllib.parse import urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+
+from bs4 import BeautifulSoup
+from django.conf import settings
+
+try:
+    from lxml import etree
+except ImportError:  # sitemaps are only read with lxml, which can refuse entities
+    etree = None
+
+from .browser import get_browser_pool
+from .clients import http_request
+from .metrics import span
+from .urlutils import canonical_page_url
+
+logger = logging.getLogger(__name__)
+
+CRAWLER_USER_AGENT = 'UIUXAnalyzer'
+SKIPPED_EXTENSIONS = (
+    '.pdf', '.zip', '.gz', '.rar', '.exe', '.dmg', '.jpg', '.jpeg', '.png', '.gif', '.svg',
+    '.webp', '.avif', '.ico', '.mp3', '.mp4', '.webm', '.mov', '.avi', '.css', '.js', '.json', '.xml',
+)
+MAX_SITEMAP_FILES = 5
+DEFAULT_MAX_DEPTH = 1
+DEFAULT_MAX_PAGES = 50
+
+
+# Breadth-first, same-host site crawler. crawl() is a generator: every page is
+# yielded as soon as it is discovered, so analysis can start while the crawl
+# continues. Discovery stops at max_depth link hops from the base URL or once
+# max_pages pages have been yielded, whichever comes first.
+class SiteCrawler:
+    def __init__(self, base_url, max_depth=1, max_pages=50, render=True,
+                 respect_robots=True, use_sitemap=True, fetch_html=None):
+        self.base_url = canonical_page_url(base_url)
+        self.host = urlsplit(self.base_url).netloc
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.render = render
+        self.respect_robots = respect_robots
+        self.use_sitemap = use_sitemap
+        self._fetch_html = fetch_html or self.fetch_html
+        self._robots = None
+
+    def crawl(self):
+        seen = {self.base_url}
+        frontier = deque([(self.base_url, 0)])
+        yielded = 0
+
+        # The base page is always scanned, even if robots.txt disallows it
+        yield self.base_url
+        yielded += 1
+
+        # Sitemap entries count as one hop from the base page
+        if self.use_sitemap and self.max_depth >= 1:
+            for url in self.sitemap_urls():
+                if yielded >= self.max_pages:
+                    return
+                if url not in seen and self.allowed(url):
+                    seen.add(url)
+                    frontier.append((url, 1))
+                    yield url
+                    yielded += 1
+
+        while frontier and yielded < self.max_pages:
+            url, depth = frontier.popleft()
+            if depth >= self.max_depth:
+                continue
+            for link in self.extract_links(url):
+                if yielded >= self.max_pages:
+                    return
+                if link not in seen and self.allowed(link):
+                    seen.add(link)
+                    frontier.append((link, depth + 1))
+                    yield link
+                    yielded += 1
+
+    def extract_links(self, url):
+        try:
+            html = self._fetch_html(url)
+        except Exception as e:
+            logger.warning("Could not fetch %s for link discovery: %s", url, e)
+            return []
+        if not html:
+            return []
+
+        links = []
+        for tag in BeautifulSoup(html, 'html.parser').find_all('a', href=True):
+            link = self.to_internal_url(urljoin(url, tag['href']))
+            if link:
+                links.append(link)
+        return links
+
+    # Canonical URL if the link is a crawlable page on this host, else None.
+    # Hosts are compared in canonical form, so an explicit default port
+    # (https://example.com:443/) is the same host.
+    def to_internal_url(self, url):
+        if urlsplit(url).scheme.lower() not in ('http', 'https'):
+            return None
+        try:
+            url = canonical_page_url(url)
+        except ValueError:  # e.g. an out-of-range port
+            return None
+        parts = urlsplit(url)
+        if parts.netloc != self.host or parts.path.lower().endswith(SKIPPED_EXTENSIONS):
+            return None
+        return url
+
+    def fetch_html(self, url):
+        with span('crawl.fetch', rendered=self.render):
+            if self.render:
+                return get_browser_pool().render(url)
+            response = http_request('site', 'GET', url)
+            response.raise_for_status()
+            if 'html' not in response.headers.get('Content-Type', 'text/html'):
+                return None
+            return response.text
+
+    def robots(self):
+        if self._robots is None:
+            self._robots = RobotFileParser()
+            try:
+                response = http_request('site', 'GET', urljoin(self.base_url, '/robots.txt'))
+                if response.status_code >= 400:
+                    self._robots.allow_all = True
+                else:
+                    self._robots.parse(response.text.splitlines())
+            except Exception as e:
+                logger.debug("robots.txt unavailable for %s: %s", self.host, e)
+                self._robots.allow_all = True
+        return self._robots
+
+    def allowed(self, url):
+        return not self.respect_robots or self.robots().can_fetch(CRAWLER_USER_AGENT, url)
+
+    # Page URLs listed in the site's sitemaps (robots.txt Sitemap: entries or
+    # /sitemap.xml), following sitemap indexes up to MAX_SITEMAP_FILES files.
+    # Sitemaps come from the scanned site, so they are parsed without entity
+    # expansion, DTD loading or network access.
+    def sitemap_urls(self):
+        if etree is None:
+            logger.debug("lxml is not installed; not reading sitemaps of %s", self.host)
+            return
+        parser = etree.XMLParser(resolve_entities=False, load_dtd=False, no_network=True)
+        pending = list(self.robots().site_maps() or []) if self.respect_robots else []
+        if not pending:
+            pending = [urljoin(self.base_url, '/sitemap.xml')]
+        fetched = 0
+        while pending and fetched < MAX_SITEMAP_FILES:
+            sitemap_url = pending.pop(0)
+            fetched += 1
+            try:
+                response = http_request('site', 'GET', sitemap_url)
+                if response.status_code >= 400:
+                    continue
+                root = etree.fromstring(response.content, parser=parser)
+            except Exception as e:
+                logger.debug("Could not read sitemap %s: %s", sitemap_url, e)
+                continue
+
+            is_index = root.tag.endswith('sitemapindex')
+            for loc in root.iter(etree.Element):
+                if not loc.tag.endswith('loc') or not loc.text:
+                    continue
+                if is_index:
+                    pending.append(loc.text.strip())
+                else:
+                    url = self.to_internal_url(loc.text.strip())
+                    if url:
+                        yield url
+
+
+def build_crawler(base_url, options):
+    return SiteCrawler(
+        base_url,
+        max_depth=options.get('max_depth', getattr(settings, 'UIUX_CRAWL_MAX_DEPTH', DEFAULT_MAX_DEPTH)),
+        max_pages=options.get('max_pages', getattr(settings, 'UIUX_CRAWL_MAX_PAGES', DEFAULT_MAX_PAGES)),
+        render=getattr(settings, 'UIUX_CRAWL_RENDER', True),
+        respect_robots=getattr(settings, 'UIUX_CRAWL_RESPECT_ROBOTS', True),
+        use_sitemap=getattr(settings, 'UIUX_CRAWL_USE_SITEMAP', True),
+    )
@@ -0,0 +1,54 @@
+import hashlib
+import re
+
+import requests
+
+from .clients import http_request, async_http_request
+
+WHITESPACE = re.compile(rb'\s+')
+
+
+# Cheap change detector for a page, compared with the fingerprint stored by
+# the previous scan. The server's validators are preferred: the previous ETag
+# or Last-Modified value is sent as a conditional GET, and a 304 answers
+# "unchanged" without downloading the page. Otherwise the fingerprint is the
+# ETag, the Last-Modified date or a SHA-256 of the whitespace-normalized body.
+# Returns '' when the page cannot be fetched, which never matches.
+def page_fingerprint(url, previous=''):
+    try:
+        response = http_request('site', 'GET', url, headers=conditional_headers(previous))
+    except requests.RequestException:
+        return ''
+    return fingerprint_response(response, previous)
+
+
+async def apage_fingerprint(url, previous=''):
+    try:
+        response = await async_http_request('site', 'GET', url, headers=conditional_headers(previous))
+    except Exception:
+        return ''
+    return fingerprint_response(response, previous)
+
+
+def conditional_headers(previous):
+    headers = {}
+    kind, _, value = previous.partition(':')
+    if kind == 'etag':
+        headers['If-None-Match'] = value
+    elif kind == 'modified':
+        headers['If-Modified-Since'] = value
+    return headers
+
+
+# Works with requests and httpx responses alike
+def fingerprint_response(response, previous=''):
+    if response.status_code == 304 and previous:
+        return previous
+    if response.status_code >= 400:
+        return ''
+
+    if response.headers.get('ETag'):
+        return f"etag:{response.headers['ETag']}"
+    if response.headers.get('Last-Modified'):
+        return f"modified:{response.headers['Last-Modified']}"
+    return f"sha256:{hashlib.sha256(WHITESPACE.sub(b' ', response.content)).hexdigest()}"
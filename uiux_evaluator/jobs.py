@@ -0,0 +1,161 @@
+import logging
+import threading
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import F
+from django.utils import timezone
+
+from .concurrency import map_bounded
+from .models import ScanJob, ScanJobPage, Scan
+from .reports import store_scan_safely
+
+logger = logging.getLogger(__name__)
+
+
+# Hand a freshly created job to the configured backend:
+#   'celery' - queue it on the Celery broker for a separate worker process
+#   'thread' - run it in a background thread of the current process
+#   'eager'  - run it inline before returning (tests, management commands)
+def enqueue_scan_job(job):
+    backend = getattr(settings, 'UIUX_JOB_BACKEND', 'thread')
+    if backend == 'celery':
+        from .tasks import run_full_scan_job
+        run_full_scan_job.delay(str(job.id))
+    elif backend == 'thread':
+        worker = threading.Thread(
+            target=_run_in_thread, args=(job.id,), name=f"scan-job-{job.id}", daemon=True
+        )
+        worker.start()
+    elif backend == 'eager':
+        execute_scan_job(job.id)
+    else:
+        raise ValueError(f"Unknown UIUX_JOB_BACKEND: {backend!r}")
+
+
+def _run_in_thread(job_id):
+    try:
+        execute_scan_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def execute_scan_job(job_id):
+    if ScanJob.objects.filter(pk=job_id, kind=ScanJob.KIND_BATCH).exists():
+        return execute_batch_job(job_id)
+    return execute_full_scan_job(job_id)
+
+
+# Crawl the job's site and analyze every page, saving each report as soon as it
+# is ready so the polling endpoints can serve partial results. A job that was
+# already started (a Celery redelivery after a worker died: tasks are acked
+# late) crawls again and resumes, keeping the reports of pages found again.
+def execute_full_scan_job(job_id):
+    from .views import UIUXRecommendationAPIView, WebsiteFullScanAPIView, DEFAULT_FULL_SCAN_WORKERS
+
+    job = ScanJob.objects.get(pk=job_id)
+    if job.status not in (ScanJob.STATUS_PENDING, ScanJob.STATUS_CRAWLING, ScanJob.STATUS_RUNNING):
+        return job
+
+    full_scan = WebsiteFullScanAPIView()
+    uiux_analyzer = UIUXRecommendationAPIView()
+
+    try:
+        _update_job(job, status=ScanJob.STATUS_CRAWLING, started_at=job.started_at or timezone.now(),
+                    completed_pages=0)
+
+        analyze_url = full_scan.get_page_analyzer(uiux_analyzer, job.base_url, job.options)
+
+        def analyze(page):
+            return analyze_url(page.url)
+
+        # Pages are registered as the crawler discovers them and analyzed right away.
+        # Reports are saved from this thread as workers finish.
+        discovered = _register_pages(job, full_scan.discover_pages(job.base_url, job.options))
+        max_workers = job.options.get('max_workers') or DEFAULT_FULL_SCAN_WORKERS
+        for _, page, report in map_bounded(analyze, discovered, max_workers):
+            record_page_report(job, page, report)
+
+        page_reports = [page.report for page in job.pages.order_by('index')]
+        Scan.objects.filter(job=job).delete()
+        store_scan_safely(Scan.KIND_FULL, job.base_url, job.options, page_reports,
+                          summary=full_scan.aggregate_results(page_reports), job=job)
+        _update_job(job, status=ScanJob.STATUS_COMPLETED, finished_at=timezone.now())
+    except Exception as e:
+        logger.exception("Full scan job %s failed", job.id)
+        _update_job(job, status=ScanJob.STATUS_FAILED, error=str(e), finished_at=timezone.now())
+
+    return job
+
+
+# Analyze every URL of a batch job (its pages were registered when the job was
+# created) through one bounded worker pool, saving each report as it completes.
+# A redelivered job only analyzes the pages that have no report yet.
+def execute_batch_job(job_id):
+    from .views import UIUXRecommendationAPIView, BatchAnalysisAPIView
+
+    job = ScanJob.objects.get(pk=job_id)
+    if job.status not in (ScanJob.STATUS_PENDING, ScanJob.STATUS_RUNNING):
+        return job
+
+    batch = BatchAnalysisAPIView()
+    try:
+        finished = job.pages.exclude(status=ScanJobPage.STATUS_PENDING).count()
+        _update_job(job, status=ScanJob.STATUS_RUNNING, started_at=job.started_at or timezone.now(),
+                    completed_pages=finished)
+        pages = list(job.pages.filter(status=ScanJobPage.STATUS_PENDING).order_by('index'))
+        results = batch.analyze_batch(UIUXRecommendationAPIView(), [page.url for page in pages], job.options)
+        for index, _, report in results:
+            record_page_report(job, pages[index], report)
+        _update_job(job, status=ScanJob.STATUS_COMPLETED, finished_at=timezone.now())
+    except Exception as e:
+        logger.exception("Batch job %s failed", job.id)
+        _update_job(job, status=ScanJob.STATUS_FAILED, error=str(e), finished_at=timezone.now())
+
+    return job
+
+
+# Runs in map_bounded's feeder thread, which owns its own DB connection. Pages
+# left by an earlier run of the job are reused: a finished page found at the
+# same position is counted as completed and not analyzed again, any other page
+# is reset, and pages past the end of the new crawl are deleted.
+def _register_pages(job, page_urls):
+    try:
+        total = 0
+        for index, page_url in enumerate(page_urls):
+            page, created = ScanJobPage.objects.get_or_create(job=job, index=index, defaults={'url': page_url})
+            total = index + 1
+            ScanJob.objects.filter(pk=job.pk).update(total_pages=total)
+            if not created and page.url == page_url and page.status != ScanJobPage.STATUS_PENDING:
+                ScanJob.objects.filter(pk=job.pk).update(completed_pages=F('completed_pages') + 1)
+                continue
+            if not created:
+                _reset_page(page, page_url)
+            yield page
+        job.pages.filter(index__gte=total).delete()
+        _update_job(job, status=ScanJob.STATUS_RUNNING, total_pages=total)
+    finally:
+        connection.close()
+
+
+def _reset_page(page, page_url):
+    page.url = page_url
+    page.status = ScanJobPage.STATUS_PENDING
+    page.report = None
+    page.completed_at = None
+    page.save(update_fields=['url', 'status', 'report', 'completed_at'])
+
+
+def record_page_report(job, page, report):
+    page.report = report
+    page.status = ScanJobPage.STATUS_FAILED if 'error' in report else ScanJobPage.STATUS_DONE
+    page.completed_at = timezone.now()
+    page.save(update_fields=['report', 'status', 'completed_at'])
+    ScanJob.objects.filter(pk=job.pk).update(completed_pages=F('completed_pages') + 1)
+
+
+def _update_job(job, **fields):
+    for name, value in fields.items():
+        setattr(job, name, value)
+    ScanJob.objects.filter(pk=job.pk).update(**fields)
@@ -0,0 +1,81 @@
+import json
+import re
+from json.decoder import scanstring
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r'[ \t\n\r]*')
+_string = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"')
+# Next bracket, or string with brackets or escapes in it: plain strings and
+# everything else in between are passed over inside the regex engine
+_next_token = re.compile(r'(?:[^"\[\]{}]|"[^"\\\[\]{}]*")*([\[\]{}]|' + _string.pattern + ')')
+
+
+# Decode only the parts of a JSON document named by fields, a nested dict that
+# mirrors the document: a key mapped to True is decoded whole, a key mapped to a
+# dict is descended into (when its value is an object), every other value is
+# scanned past without being decoded, so memory use is the document text plus
+# the selected values instead of the fully decoded document. Invalid JSON
+# raises json.JSONDecodeError, as json.loads does; skipped values are only
+# checked for balanced strings and brackets.
+def loads_selected(content, fields):
+    if isinstance(content, (bytes, bytearray)):
+        content = content.decode(json.detect_encoding(content))
+    value, end = _select(content, _skip_whitespace(content, 0), fields)
+    end = _skip_whitespace(content, end)
+    if end != len(content):
+        raise json.JSONDecodeError("Extra data", content, end)
+    return value
+
+
+def _skip_whitespace(text, idx):
+    return _whitespace.match(text, idx).end()
+
+
+def _expect(text, idx, char, message):
+    if text[idx:idx + 1] != char:
+        raise json.JSONDecodeError(message, text, idx)
+    return _skip_whitespace(text, idx + 1)
+
+
+def _select(text, idx, fields):
+    if fields is True or text[idx:idx + 1] != '{':
+        return _decoder.raw_decode(text, idx)
+
+    selected = {}
+    idx = _skip_whitespace(text, idx + 1)
+    if text[idx:idx + 1] == '}':
+        return selected, idx + 1
+    while True:
+        if text[idx:idx + 1] != '"':
+            raise json.JSONDecodeError("Expecting property name enclosed in double quotes", text, idx)
+        key, idx = scanstring(text, idx + 1)
+        idx = _expect(text, _skip_whitespace(text, idx), ':', "Expecting ':' delimiter")
+        if fields.get(key):
+            selected[key], idx = _select(text, idx, fields[key])
+        else:
+            idx = _skip(text, idx)
+        idx = _skip_whitespace(text, idx)
+        if text[idx:idx + 1] == '}':
+            return selected, idx + 1
+        idx = _expect(text, idx, ',', "Expecting ',' delimiter")
+
+
+def _skip(text, idx):
+    char = text[idx:idx + 1]
+    if char == '"':
+        match = _string.match(text, idx)
+        if match is None:
+            raise json.JSONDecodeError("Unterminated string starting at", text, idx)
+        return match.end()
+    if char not in ('{', '['):
+        return _decoder.raw_decode(text, idx)[1]
+    depth = 0
+    for match in _next_token.finditer(text, idx):
+        token = match.group(1)
+        if token in ('{', '['):
+            depth += 1
+        elif token in ('}', ']'):
+            depth -= 1
+            if depth == 0:
+                return match.end()
+    raise json.JSONDecodeError("Unterminated value starting at", text, idx)
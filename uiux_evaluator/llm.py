@@ -0,0 +1,248 @@
+import asyncio
+import hashlib
+import json
+import logging
+import queue
+import threading
+import weakref
+from concurrent.futures import Future
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from .cache import get_analyzer_cache
+from .clients import async_http_request
+from .concurrency import SingleFlight, AsyncSingleFlight, DeadlineExceeded, deadline_timeout
+from .metrics import span
+from .resilience import get_policy, is_failure_status, CircuitOpenError
+
+DEFAULT_MODEL = 'mistral'
+DEFAULT_SUMMARY_TTL = 7 * 24 * 60 * 60
+
+logger = logging.getLogger(__name__)
+
+
+class LLMError(Exception):
+    pass
+
+
+# Client for a long-lived local model server speaking the Ollama HTTP API
+# (POST /api/generate). One keep-alive session is shared by every thread, the
+# number of generations in flight is capped, and every call has a timeout.
+class LLMClient:
+    def __init__(self, base_url, model, timeout=60, max_concurrency=2, keep_alive='30m',
+                 batch_size=1, batch_window=0.05):
+        self.base_url = base_url.rstrip('/')
+        self.model = model
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        self._batcher = None
+        self._batcher_lock = threading.Lock()
+        self.max_concurrency = max_concurrency
+        self._async_slots = weakref.WeakKeyDictionary()
+
+    def _request_body(self, prompt, json_output):
+        body = {
+            'model': self.model,
+            'prompt': prompt,
+            'stream': False,
+            'keep_alive': self.keep_alive,
+        }
+        if json_output:
+            body['format'] = 'json'
+        return body
+
+    # Inside a run_parallel task, neither the wait for a slot nor the call
+    # itself outlasts the task's deadline (concurrency.deadline_timeout)
+    def generate(self, prompt, timeout=None, json_output=False):
+        body = self._request_body(prompt, json_output)
+        try:
+            if not self._slots.acquire(timeout=deadline_timeout(None)):
+                raise DeadlineExceeded("The analysis deadline passed while waiting for the LLM server")
+        except DeadlineExceeded as e:
+            raise LLMError(str(e)) from e
+        try:
+            with span('llm.generate', model=self.model, prompt_chars=len(prompt)):
+                try:
+                    timeout = timeout or self.timeout
+                    capped = deadline_timeout(timeout)
+                    with get_policy('llm').attempt() as outcome:
+                        try:
+                            response = self._session.post(f"{self.base_url}/api/generate", json=body, timeout=capped)
+                        except requests.Timeout as e:
+                            if capped != timeout:
+                                raise DeadlineExceeded("LLM call cut short by the analysis deadline") from e
+                            raise
+                        outcome.failed = is_failure_status(response.status_code)
+                    response.raise_for_status()
+                    return response.json().get('response', '').strip()
+                except (requests.RequestException, ValueError, CircuitOpenError, DeadlineExceeded) as e:
+                    raise LLMError(str(e)) from e
+        finally:
+            self._slots.release()
+
+    # generate() for async callers (ASGI views), over the shared async HTTP
+    # client and with the same cap on generations in flight
+    async def agenerate(self, prompt, timeout=None, json_output=False):
+        slots = self._async_slots.setdefault(asyncio.get_running_loop(), asyncio.Semaphore(self.max_concurrency))
+        async with slots:
+            with span('llm.generate', model=self.model, prompt_chars=len(prompt)):
+                try:
+                    with get_policy('llm').attempt() as outcome:
+                        response = await async_http_request(
+                            'llm', 'POST', f"{self.base_url}/api/generate",
+                            json=self._request_body(prompt, json_output), timeout=timeout or self.timeout
+                        )
+                        outcome.failed = is_failure_status(response.status_code)
+                    response.raise_for_status()
+                    return response.json().get('response', '').strip()
+                except Exception as e:
+                    raise LLMError(str(e)) from e
+
+    # Answer several independent prompts with a single generation. Falls back to
+    # one call per prompt if the model does not return one answer per prompt.
+    def generate_batch(self, prompts, timeout=None):
+        if len(prompts) == 1:
+            return [self.generate(prompts[0], timeout=timeout)]
+
+        tasks = '\n\n'.join(f"Task {number}:\n{prompt}" for number, prompt in enumerate(prompts, start=1))
+        batch_prompt = (
+            f"Complete each of the following {len(prompts)} tasks independently.\n\n{tasks}\n\n"
+            f'Respond with a JSON object of the form {{"answers": ["answer to task 1", ...]}} '
+            f"containing exactly {len(prompts)} strings, in task order."
+        )
+        try:
+            answers = json.loads(self.generate(batch_prompt, timeout=timeout, json_output=True)).get('answers')
+        except (LLMError, ValueError, AttributeError) as e:
+            logger.warning("Batched LLM generation failed, retrying prompts individually: %s", e)
+            answers = None
+
+        if not isinstance(answers, list) or len(answers) != len(prompts):
+            return [self.generate(prompt, timeout=timeout) for prompt in prompts]
+        return [str(answer).strip() for answer in answers]
+
+    # Generate a completion for one prompt. When batching is enabled, prompts
+    # arriving from concurrent callers within batch_window are sent together.
+    def summarize(self, prompt):
+        if self.batch_size <= 1:
+            return self.generate(prompt)
+        with span('llm.batched'):
+            return self._get_batcher().submit(prompt).result()
+
+    async def asummarize(self, prompt):
+        if self.batch_size <= 1:
+            return await self.agenerate(prompt)
+        with span('llm.batched'):
+            return await asyncio.wrap_future(self._get_batcher().submit(prompt))
+
+    def _get_batcher(self):
+        with self._batcher_lock:
+            if self._batcher is None:
+                self._batcher = _MicroBatcher(self, self.batch_size, self.batch_window)
+            return self._batcher
+
+
+class _MicroBatcher:
+    def __init__(self, client, batch_size, window):
+        self.client = client
+        self.batch_size = batch_size
+        self.window = window
+        self._pending = queue.Queue()
+        threading.Thread(target=self._run, name='llm-batcher', daemon=True).start()
+
+    def submit(self, prompt):
+        future = Future()
+        self._pending.put((prompt, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._pending.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._pending.get(timeout=self.window))
+                except queue.Empty:
+                    break
+            threading.Thread(target=self._dispatch, args=(batch,), daemon=True).start()
+
+    def _dispatch(self, batch):
+        try:
+            answers = self.client.generate_batch([prompt for prompt, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+        else:
+            for (_, future), answer in zip(batch, answers):
+                future.set_result(answer)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient(
+                base_url=getattr(settings, 'UIUX_LLM_URL', 'http://localhost:11434'),
+                model=getattr(settings, 'UIUX_LLM_MODEL', DEFAULT_MODEL),
+                timeout=getattr(settings, 'UIUX_LLM_TIMEOUT', 60),
+                max_concurrency=getattr(settings, 'UIUX_LLM_CONCURRENCY', 2),
+                batch_size=getattr(settings, 'UIUX_LLM_BATCH_SIZE', 1),
+                batch_window=getattr(settings, 'UIUX_LLM_BATCH_WINDOW', 0.05),
+            )
+        return _client
+
+
+_summary_inflight = SingleFlight()
+
+
+def summary_cache_key(fields):
+    canonical = json.dumps(fields, sort_keys=True, separators=(',', ':'), default=str)
+    return f"uiux:llm-summary:{getattr(settings, 'UIUX_LLM_MODEL', DEFAULT_MODEL)}:" \
+           f"{hashlib.sha256(canonical.encode('utf-8')).hexdigest()}"
+
+
+# Memoize an LLM generation on a canonical hash of the fields the prompt is
+# built from, so identical analyzer results (e.g. templated pages of one site)
+# are summarized once. Entries live in the shared analyzer cache, so they are
+# reused across requests and, with the sqlite/redis backends, across workers.
+def memoized_summary(fields, generate):
+    key = summary_cache_key(fields)
+    cache = get_analyzer_cache()
+
+    def compute():
+        summary = cache.get(key)
+        if summary is None:
+            summary = generate()
+            cache.set(key, summary, getattr(settings, 'UIUX_LLM_SUMMARY_TTL', DEFAULT_SUMMARY_TTL))
+        return summary
+
+    return _summary_inflight.do(key, compute)
+
+
+_async_summary_inflight = AsyncSingleFlight()
+
+
+# memoized_summary for async callers; generate is a coroutine function
+async def amemoized_summary(fields, generate):
+    key = summary_cache_key(fields)
+    cache = get_analyzer_cache()
+
+    async def compute():
+        summary = await cache.aget(key)
+        if summary is None:
+            summary = await generate()
+            await cache.aset(key, summary, getattr(settings, 'UIUX_LLM_SUMMARY_TTL', DEFAULT_SUMMARY_TTL))
+        return summary
+
+    return await _async_summary_inflight.do(key, compute)
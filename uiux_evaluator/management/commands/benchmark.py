@@ -0,0 +1,218 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory
+
+from uiux_evaluator.archive import flush_archive
+from uiux_evaluator.benchmark import (
+    FakeUpstreams, StaticSite, load_fixtures, settings_overrides, reset_shared_clients, run_load,
+    find_regressions, DEFAULT_LATENCY, FIXTURE_DIR
+)
+from uiux_evaluator.cache import get_analyzer_cache
+
+ANALYZERS = ('pagespeed', 'accessibility', 'security', 'static')
+SCENARIOS = ('single', 'full-scan')
+
+
+def int_list(value):
+    try:
+        return [int(item) for item in value.split(',') if item]
+    except ValueError:
+        raise CommandError(f"Expected a comma-separated list of integers, got {value!r}")
+
+
+def latency_map(value):
+    latency = {}
+    for item in value.split(','):
+        service, _, seconds = item.partition('=')
+        if service not in DEFAULT_LATENCY:
+            raise CommandError(f"Unknown service {service!r} in --latency (expected {', '.join(DEFAULT_LATENCY)})")
+        try:
+            latency[service] = float(seconds)
+        except ValueError:
+            raise CommandError(f"Invalid latency for {service}: {seconds!r}")
+    return latency
+
+
+class Command(BaseCommand):
+    help = ("Benchmark the single-page and full-scan endpoints offline, against local fakes of PageSpeed, "
+            "WAVE, SSL Labs and the LLM server and a generated static site. Reports p50/p95 latency, "
+            "throughput and peak RSS per scenario; runs against a throwaway test database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                            help="Comma-separated scenarios to run: single, full-scan.")
+        parser.add_argument('--analyzers', default='pagespeed,accessibility,security',
+                            help=f"Analyzers to enable: {', '.join(ANALYZERS)}.")
+        parser.add_argument('--requests', type=int, default=20, help="Single-page requests per concurrency level.")
+        parser.add_argument('--concurrency', type=int_list, default=[1, 4, 8],
+                            help="Concurrent clients for the single-page scenario, e.g. 1,4,8.")
+        parser.add_argument('--pages', type=int_list, default=[10, 50], help="Full-scan site sizes, e.g. 10,50.")
+        parser.add_argument('--workers', type=int_list, default=[1, 4, 8], help="Full-scan max_workers levels.")
+        parser.add_argument('--scan-runs', type=int, default=2, help="Full scans per (pages, workers) level.")
+        parser.add_argument('--latency', type=latency_map, default={},
+                            help="Simulated upstream latency in seconds, e.g. pagespeed=0.3,wave=0.15,ssllabs=0.05,llm=0.1.")
+        parser.add_argument('--error-rate', type=float, default=0.0,
+                            help="Share of upstream requests answered with HTTP 503 (0-1).")
+        parser.add_argument('--pagespeed-kb', type=int, default=256,
+                            help="Pad replayed Lighthouse reports to roughly this many extra kilobytes.")
+        parser.add_argument('--fixtures', default=FIXTURE_DIR,
+                            help="Directory with recorded pagespeed.json, wave.json and ssllabs.json responses.")
+        parser.add_argument('--warm-cache', action='store_true',
+                            help="Keep the analyzer cache between requests instead of forcing fresh upstream calls.")
+        parser.add_argument('--keep-rate-limits', action='store_true',
+                            help="Apply the configured upstream rate limits to the fakes too.")
+        parser.add_argument('--seed', type=int, default=0, help="Seed for injected upstream errors.")
+        parser.add_argument('--json', dest='json_path', help="Write the results to this file.")
+        parser.add_argument('--baseline', help="Results file of a previous run to compare against.")
+        parser.add_argument('--max-regression', type=float, default=25.0,
+                            help="Fail if p95 latency or throughput is worse than the baseline by more than this percent.")
+
+    def handle(self, *args, **options):
+        scenarios = [name for name in options['scenarios'].split(',') if name]
+        analyzers = [name for name in options['analyzers'].split(',') if name]
+        for name in scenarios:
+            if name not in SCENARIOS:
+                raise CommandError(f"Unknown scenario {name!r} (expected {', '.join(SCENARIOS)})")
+        for name in analyzers:
+            if name not in ANALYZERS:
+                raise CommandError(f"Unknown analyzer {name!r} (expected {', '.join(ANALYZERS)})")
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as f:
+                baseline = json.load(f)['results']
+
+        upstreams = FakeUpstreams(
+            fixtures=load_fixtures(options['fixtures']), latency=options['latency'],
+            error_rate=options['error_rate'], pagespeed_kb=options['pagespeed_kb'], seed=options['seed'],
+        ).start()
+        site = StaticSite(pages=max(options['pages'] + [10])).start()
+        old_database, database_dir = self.create_database()
+        results = []
+        try:
+            with override_settings(**settings_overrides(upstreams, options['keep_rate_limits'])):
+                reset_shared_clients()
+                if 'single' in scenarios:
+                    results += self.run_single_page(site, analyzers, options)
+                if 'full-scan' in scenarios:
+                    results += self.run_full_scans(site, analyzers, options)
+        finally:
+            flush_archive()
+            reset_shared_clients()
+            connections.close_all()
+            connection.creation.destroy_test_db(old_database, verbosity=0)
+            if database_dir:
+                shutil.rmtree(database_dir, ignore_errors=True)
+            site.stop()
+            upstreams.stop()
+
+        self.report(results, upstreams)
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as f:
+                json.dump({'options': self.recorded_options(options), 'results': results}, f, indent=2)
+            self.stdout.write(f"Results written to {options['json_path']}")
+        if baseline is not None:
+            self.compare(results, baseline, options['max_regression'])
+
+    # Throwaway test database. SQLite gets a file-backed one like the deployed
+    # database; its in-memory test database locks whole tables under concurrent writers.
+    def create_database(self):
+        database_dir = None
+        if connection.vendor == 'sqlite':
+            database_dir = tempfile.mkdtemp(prefix='uiux-benchmark-db-')
+            connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(database_dir, 'benchmark.sqlite3')
+        old_database = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        return old_database, database_dir
+
+    def analyzer_flags(self, analyzers, options):
+        return {
+            'is_pagespeed_applied': 'pagespeed' in analyzers,
+            'is_accessibility_applied': 'accessibility' in analyzers,
+            'is_security_applied': 'security' in analyzers,
+            'is_static_applied': 'static' in analyzers,
+            'force_refresh': not options['warm_cache'],
+        }
+
+    def run_single_page(self, site, analyzers, options):
+        from uiux_evaluator.views import UIUXRecommendationAPIView
+
+        view = UIUXRecommendationAPIView.as_view()
+        factory = APIRequestFactory()
+        urls = site.page_urls()
+        flags = self.analyzer_flags(analyzers, options)
+
+        def make_request(number):
+            response = view(factory.post('/', dict(flags, url=urls[number % len(urls)]), format='json'))
+            response.render()
+            return response.status_code == 200 and not response.data.get('timed_out_services'), 1
+
+        results = []
+        for concurrency in options['concurrency']:
+            get_analyzer_cache().clear()
+            result = run_load(make_request, options['requests'], concurrency)
+            results.append(dict(scenario='single', concurrency=concurrency, **result))
+            self.stdout.write(f"single-page  concurrency={concurrency:<3} p95={result['p95_ms']} ms")
+        return results
+
+    def run_full_scans(self, site, analyzers, options):
+        from uiux_evaluator.views import WebsiteFullScanAPIView
+
+        view = WebsiteFullScanAPIView.as_view()
+        factory = APIRequestFactory()
+        flags = self.analyzer_flags(analyzers, options)
+
+        results = []
+        for pages in options['pages']:
+            for workers in options['workers']:
+                body = dict(flags, url=site.base_url, max_pages=pages, max_depth=5, max_workers=workers, compact=True)
+
+                def make_request(number):
+                    response = view(factory.post('/', body, format='json'))
+                    response.render()
+                    scanned = response.data.get('total_pages_scanned', 0) if response.status_code == 200 else 0
+                    return scanned == pages, scanned
+
+                get_analyzer_cache().clear()
+                result = run_load(make_request, options['scan_runs'], 1)
+                results.append(dict(scenario='full-scan', pages=pages, workers=workers, **result))
+                self.stdout.write(f"full-scan    pages={pages:<4} workers={workers:<3} p95={result['p95_ms']} ms")
+        return results
+
+    def report(self, results, upstreams):
+        header = (f"{'scenario':<10} {'conc':>4} {'pages':>5} {'workers':>7} {'reqs':>5} {'errors':>6} "
+                  f"{'p50 ms':>9} {'p95 ms':>9} {'req/s':>7} {'pages/s':>8} {'peak RSS MB':>11}")
+        self.stdout.write('')
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for result in results:
+            self.stdout.write(
+                f"{result['scenario']:<10} {result.get('concurrency', 1):>4} {result.get('pages', 1):>5} "
+                f"{result.get('workers', '-'):>7} {result['requests']:>5} {result['errors']:>6} "
+                f"{result['p50_ms']:>9} {result['p95_ms']:>9} {result['throughput_rps']:>7} "
+                f"{result['pages_per_second']:>8} {result['peak_rss_mb']:>11}"
+            )
+        calls = ', '.join(
+            f"{service}={count}" + (f" ({upstreams.errors[service]} failed)" if upstreams.errors[service] else '')
+            for service, count in upstreams.requests.items()
+        )
+        self.stdout.write(f"\nUpstream calls: {calls}")
+
+    def compare(self, results, baseline, max_regression):
+        regressions = find_regressions(results, baseline, max_regression)
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS(f"No regressions beyond {max_regression:g}% against the baseline."))
+            return
+        for result, metric, before, after in regressions:
+            label = ' '.join(f"{key}={result[key]}" for key in ('scenario', 'concurrency', 'pages', 'workers') if key in result)
+            self.stderr.write(f"{label}: {metric} {before} -> {after}")
+        raise CommandError(f"{len(regressions)} performance regression(s) beyond {max_regression:g}%")
+
+    def recorded_options(self, options):
+        keys = ('scenarios', 'analyzers', 'requests', 'concurrency', 'pages', 'workers', 'scan_runs',
+                'latency', 'error_rate', 'pagespeed_kb', 'warm_cache', 'keep_rate_limits', 'seed')
+        return {key: options[key] for key in keys}
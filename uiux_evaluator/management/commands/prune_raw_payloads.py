@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from uiux_evaluator.archive import prune_payloads
+
+
+class Command(BaseCommand):
+    help = "Delete archived raw payloads past their retention period or no longer referenced by any stored scan."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int,
+                            help="Delete payloads older than this. Defaults to UIUX_RAW_PAYLOAD_RETENTION_DAYS; 0 disables.")
+        parser.add_argument('--orphan-grace', type=int,
+                            help="Seconds an unreferenced payload is kept. Defaults to UIUX_RAW_PAYLOAD_ORPHAN_GRACE.")
+
+    def handle(self, *args, **options):
+        deleted = prune_payloads(retention_days=options['retention_days'], orphan_grace=options['orphan_grace'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} raw payload(s)."))
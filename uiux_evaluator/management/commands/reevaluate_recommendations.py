@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from uiux_evaluator.reports import reevaluate_stored_results
+
+
+class Command(BaseCommand):
+    help = "Re-apply the recommendation rules to stored PageSpeed and SSL Labs results without re-fetching them."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scan', type=int, action='append', dest='scan_ids',
+                            help="Only re-evaluate this scan id (repeatable). Defaults to every stored scan.")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        updated = reevaluate_stored_results(scan_ids=options['scan_ids'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Re-evaluated {updated} stored analyzer result(s)."))
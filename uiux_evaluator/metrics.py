@@ -0,0 +1,278 @@
+import bisect
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Upper bounds (seconds) of the latency histogram buckets. Analyzer stages range
+# from milliseconds (cache hits, local checks) to minutes (SSL Labs, Lighthouse).
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key):
+    if not key:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in key) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(_label_key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        return [(self.name, key, value) for key, value in sorted(values.items())]
+
+
+# Cumulative-bucket histogram in the Prometheus exposition layout
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series['buckets'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def samples(self):
+        with self._lock:
+            series = {key: dict(data, buckets=list(data['buckets'])) for key, data in self._series.items()}
+        samples = []
+        for key, data in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, data['buckets']):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", key + (('le', f"{bound:g}"),), cumulative))
+            samples.append((f"{self.name}_bucket", key + (('le', '+Inf'),), data['count']))
+            samples.append((f"{self.name}_sum", key, round(data['sum'], 6)))
+            samples.append((f"{self.name}_count", key, data['count']))
+        return samples
+
+
+# Process-local metric registry. Each web or worker process keeps its own
+# values, so scrape every process (or run a single one) when aggregating.
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help_text):
+        return self.register(Counter(name, help_text))
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, buckets))
+
+    # Prometheus text exposition format (version 0.0.4). extra is a list of
+    # (name, kind, help, {label tuple: value}) computed at scrape time, kind
+    # being 'counter' or 'gauge'.
+    def render(self, extra=()):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, key, value in metric.samples():
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        for name, kind, help_text, values in extra:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, value in sorted(values.items()):
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.histogram(
+    'uiux_stage_duration_seconds', 'Latency of analyzer stages, HTTP attempts, crawl fetches and LLM calls.'
+)
+STAGE_ERRORS = registry.counter('uiux_stage_errors_total', 'Stages that raised or returned an error.')
+HTTP_REQUESTS = registry.counter('uiux_http_requests_total', 'Upstream HTTP attempts by service and status code.')
+HTTP_RETRIES = registry.counter('uiux_http_retries_total', 'Upstream HTTP attempts that were retried.')
+CACHE_REQUESTS = registry.counter('uiux_cache_requests_total', 'Analyzer cache lookups by analyzer and result.')
+CIRCUIT_REJECTIONS = registry.counter('uiux_circuit_rejections_total', 'Upstream calls refused by an open circuit breaker.')
+CIRCUIT_TRANSITIONS = registry.counter('uiux_circuit_transitions_total', 'Circuit breaker state changes by new state.')
+RETRY_BUDGET_EXHAUSTED = registry.counter(
+    'uiux_retry_budget_exhausted_total', 'Retries skipped because the retry budget was spent.'
+)
+
+
+_current_trace = ContextVar('uiux_trace', default=None)
+_current_span = ContextVar('uiux_span', default=None)
+
+
+# Spans recorded while serving one request. Spans opened in worker threads
+# belong to the same trace as long as the work was submitted through
+# concurrency.py, which runs every task in a copy of the caller's context.
+class Trace:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.spans = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def next_id(self):
+        return next(self._ids)
+
+    def record(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def elapsed_ms(self):
+        return _ms(time.monotonic() - self.started)
+
+    # Spans in start order plus per-stage totals; with include_spans=False only
+    # the totals are returned (full scans can produce thousands of spans)
+    def timings(self, include_spans=True):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: (span['start_ms'], span['id']))
+        stages = {}
+        for span in spans:
+            stage = stages.setdefault(span['name'], {'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            stage['count'] += 1
+            stage['errors'] += 1 if span['status'] == 'error' else 0
+            stage['total_ms'] = round(stage['total_ms'] + span['duration_ms'], 1)
+            stage['max_ms'] = max(stage['max_ms'], span['duration_ms'])
+        timings = {'total_ms': self.elapsed_ms(), 'stages': stages}
+        if include_spans:
+            timings['spans'] = spans
+        return timings
+
+
+class Span:
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.status = 'ok'
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    # Mark the span failed if an analyzer returned an error payload; returns result
+    def check(self, result):
+        if isinstance(result, dict) and 'error' in result:
+            self.status = 'error'
+        return result
+
+
+# Start collecting spans for the current request
+@contextmanager
+def trace():
+    current = Trace()
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+
+
+# Time a block as a named stage. Every span feeds the latency histogram and the
+# error counter; inside a trace() it is also recorded with its parent span and
+# attributes. Names must be low-cardinality (e.g. 'http.pagespeed'), since they
+# become metric labels; put URLs and other details in attributes.
+@contextmanager
+def span(name, **attributes):
+    current_trace = _current_trace.get()
+    parent_id = _current_span.get()
+    span_id = current_trace.next_id() if current_trace is not None else None
+    token = _current_span.set(span_id)
+    current = Span(name, attributes)
+    started = time.monotonic()
+    try:
+        yield current
+    except BaseException:
+        current.status = 'error'
+        raise
+    finally:
+        elapsed = time.monotonic() - started
+        _current_span.reset(token)
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        if current.status == 'error':
+            STAGE_ERRORS.inc(stage=name)
+        if current_trace is not None:
+            current_trace.record({
+                'id': span_id,
+                'parent_id': parent_id,
+                'name': name,
+                'start_ms': _ms(started - current_trace.started),
+                'duration_ms': _ms(elapsed),
+                'status': current.status,
+                'thread': threading.current_thread().name,
+                **current.attributes,
+            })
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def record_cache_lookup(analyzer, hit):
+    CACHE_REQUESTS.inc(analyzer=analyzer, result='hit' if hit else 'miss')
+
+
+def render_metrics():
+    from .clients import connection_stats
+    from .resilience import breaker_states, OPEN
+
+    stats = connection_stats()
+    extra = [
+        ('uiux_http_pool_requests_total', 'counter', 'Requests sent over pooled upstream connections.',
+         {(('service', service),): values['requests'] for service, values in stats.items()}),
+        ('uiux_http_pool_connections_opened_total', 'counter', 'Upstream connections opened by the pools.',
+         {(('service', service),): values['connections_opened'] for service, values in stats.items()}),
+        ('uiux_http_pool_reuse_ratio', 'gauge', 'Share of upstream requests sent over a reused connection.',
+         {(('service', service),): values['reuse_ratio'] for service, values in stats.items()}),
+        ('uiux_circuit_open', 'gauge', 'Whether the upstream circuit breaker is open (1) or not (0).',
+         {(('service', service),): int(state == OPEN) for service, state in breaker_states().items()}),
+    ]
+    return registry.render(extra=extra)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1)
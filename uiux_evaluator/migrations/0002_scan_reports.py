@@ -0,0 +1,96 @@
+# Generated by Django 5.1.6 on 2026-10-18 15:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uiux_evaluator', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Scan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('single', 'Single page'), ('full', 'Full site')], max_length=16)),
+                ('base_url', models.URLField(max_length=2048)),
+                ('normalized_url', models.CharField(max_length=2048)),
+                ('host', models.CharField(max_length=255)),
+                ('options', models.JSONField(default=dict)),
+                ('total_pages', models.PositiveIntegerField(default=0)),
+                ('summary', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('job', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='scan', to='uiux_evaluator.scanjob')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ScanPage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField()),
+                ('url', models.URLField(max_length=2048)),
+                ('summary', models.CharField(blank=True, max_length=255)),
+                ('error', models.TextField(blank=True)),
+                ('scan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pages', to='uiux_evaluator.scan')),
+            ],
+            options={
+                'ordering': ['index'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Recommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('service', models.CharField(max_length=32)),
+                ('position', models.PositiveIntegerField()),
+                ('text', models.TextField()),
+                ('page', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='uiux_evaluator.scanpage')),
+            ],
+            options={
+                'ordering': ['service', 'position'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AnalyzerResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('service', models.CharField(max_length=32)),
+                ('payload', models.JSONField(null=True)),
+                ('page', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='results', to='uiux_evaluator.scanpage')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='scan',
+            index=models.Index(fields=['normalized_url', '-created_at'], name='scan_url_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scan',
+            index=models.Index(fields=['host', '-created_at'], name='scan_host_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scan',
+            index=models.Index(fields=['-created_at'], name='scan_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scanpage',
+            index=models.Index(fields=['url'], name='scan_page_url_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='scanpage',
+            constraint=models.UniqueConstraint(fields=('scan', 'index'), name='unique_scan_page_index'),
+        ),
+        migrations.AddIndex(
+            model_name='recommendation',
+            index=models.Index(fields=['service'], name='recommendation_service_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='analyzerresult',
+            constraint=models.UniqueConstraint(fields=('page', 'service'), name='unique_analyzer_result_service'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 16:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uiux_evaluator', '0003_raw_payloads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scanpage',
+            name='fingerprint',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 16:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uiux_evaluator', '0004_scan_page_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scanjob',
+            name='kind',
+            field=models.CharField(choices=[('full', 'Full-site scan'), ('batch', 'Batch of URLs')], default='full', max_length=16),
+        ),
+    ]
@@ -1,3 +1,174 @@
+import uuid
+
 from django.db import models
 
-# Create your models here.
+
+# A full-site scan executed in the background. Pages are registered as the
+# crawler discovers them ('crawling'); once discovery is done the job is
+# 'running' until the remaining pages finish, so clients can follow per-page progress.
+class ScanJob(models.Model):
+    KIND_FULL = 'full'
+    KIND_BATCH = 'batch'
+    KIND_CHOICES = [
+        (KIND_FULL, 'Full-site scan'),
+        (KIND_BATCH, 'Batch of URLs'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_CRAWLING = 'crawling'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_CRAWLING, 'Crawling'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES, default=KIND_FULL)
+    base_url = models.URLField(max_length=2048)
+    options = models.JSONField(default=dict)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    total_pages = models.PositiveIntegerField(default=0)
+    completed_pages = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.base_url} ({self.status})"
+
+
+class ScanJobPage(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    job = models.ForeignKey(ScanJob, related_name='pages', on_delete=models.CASCADE)
+    index = models.PositiveIntegerField()
+    url = models.URLField(max_length=2048)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    report = models.JSONField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['index']
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'index'], name='unique_scan_job_page_index'),
+        ]
+
+    def __str__(self):
+        return self.url
+
+
+# Stored result of a finished analysis: a single-page report or a full-site scan.
+# Reports are written once, in bulk, and read back without calling any upstream.
+class Scan(models.Model):
+    KIND_SINGLE = 'single'
+    KIND_FULL = 'full'
+    KIND_CHOICES = [
+        (KIND_SINGLE, 'Single page'),
+        (KIND_FULL, 'Full site'),
+    ]
+
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    base_url = models.URLField(max_length=2048)
+    normalized_url = models.CharField(max_length=2048)
+    host = models.CharField(max_length=255)
+    options = models.JSONField(default=dict)
+    total_pages = models.PositiveIntegerField(default=0)
+    summary = models.JSONField(default=dict)
+    job = models.OneToOneField(ScanJob, null=True, blank=True, related_name='scan', on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['normalized_url', '-created_at'], name='scan_url_created_idx'),
+            models.Index(fields=['host', '-created_at'], name='scan_host_created_idx'),
+            models.Index(fields=['-created_at'], name='scan_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.base_url} ({self.kind}, {self.created_at:%Y-%m-%d %H:%M})"
+
+
+class ScanPage(models.Model):
+    scan = models.ForeignKey(Scan, related_name='pages', on_delete=models.CASCADE)
+    index = models.PositiveIntegerField()
+    url = models.URLField(max_length=2048)
+    summary = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    # Change detector used by incremental scans (see fingerprint.py)
+    fingerprint = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        ordering = ['index']
+        indexes = [
+            models.Index(fields=['url'], name='scan_page_url_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['scan', 'index'], name='unique_scan_page_index'),
+        ]
+
+    def __str__(self):
+        return self.url
+
+
+# Raw (already condensed) output of one analyzer for one page
+class AnalyzerResult(models.Model):
+    page = models.ForeignKey(ScanPage, related_name='results', on_delete=models.CASCADE)
+    service = models.CharField(max_length=32)
+    payload = models.JSONField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['page', 'service'], name='unique_analyzer_result_service'),
+        ]
+
+
+class Recommendation(models.Model):
+    page = models.ForeignKey(ScanPage, related_name='recommendations', on_delete=models.CASCADE)
+    service = models.CharField(max_length=32)
+    position = models.PositiveIntegerField()
+    text = models.TextField()
+
+    class Meta:
+        ordering = ['service', 'position']
+        indexes = [
+            models.Index(fields=['service'], name='recommendation_service_idx'),
+        ]
+
+
+# Compressed raw upstream response, addressed by the SHA-256 of its
+# uncompressed bytes, so identical payloads are stored once (see archive.py)
+class RawPayload(models.Model):
+    CODEC_GZIP = 'gzip'
+    CODEC_ZSTD = 'zstd'
+    CODEC_CHOICES = [
+        (CODEC_GZIP, 'gzip'),
+        (CODEC_ZSTD, 'zstd'),
+    ]
+
+    digest = models.CharField(max_length=64, primary_key=True)
+    service = models.CharField(max_length=32)
+    codec = models.CharField(max_length=8, choices=CODEC_CHOICES)
+    size = models.PositiveIntegerField()
+    compressed_size = models.PositiveIntegerField()
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.service}:{self.digest[:12]}"
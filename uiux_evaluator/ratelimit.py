@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from django.conf import settings
+
+from .metrics import span
+
+# Conservative defaults per upstream. rate is in requests/second, burst is the
+# bucket size and concurrency caps how many calls may be in flight at once.
+DEFAULT_UPSTREAM_LIMITS = {
+    'pagespeed': {'rate': 4.0, 'burst': 8, 'concurrency': 8},   # 240 queries/minute per key
+    'wave': {'rate': 2.0, 'burst': 4, 'concurrency': 4},        # every call costs paid credits
+    'ssllabs': {'rate': 1.0, 'burst': 2, 'concurrency': 2},     # strict per-client assessment limits
+}
+DEFAULT_LIMITS = {'rate': 5.0, 'burst': 5, 'concurrency': 8}
+
+
+# How often (seconds) aslot() re-checks for a free slot or token
+ASYNC_POLL_INTERVAL = 0.05
+
+
+class RateLimitTimeout(Exception):
+    pass
+
+
+# Thread-safe token bucket: tokens refill continuously at `rate` per second up to
+# `capacity`, and every upstream call (retries included) has to take one.
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    # Block until a token is available; returns False if timeout elapses first.
+    def acquire(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+# Concurrency cap plus token bucket for one upstream service.
+class UpstreamLimiter:
+    def __init__(self, name, rate, burst, concurrency):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self._slots = threading.BoundedSemaphore(concurrency)
+
+    # Time spent waiting here is recorded as a 'ratelimit.<service>' span
+    @contextmanager
+    def slot(self, timeout=None):
+        started = time.monotonic()
+        with span(f"ratelimit.{self.name}"):
+            if not self._slots.acquire(timeout=timeout):
+                raise RateLimitTimeout(f"Timed out waiting for a free {self.name} slot")
+            remaining = None if timeout is None else max(timeout - (time.monotonic() - started), 0)
+            if not self.bucket.acquire(timeout=remaining):
+                self._slots.release()
+                raise RateLimitTimeout(f"Timed out waiting for {self.name} rate limit")
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    # Async variant of slot() for the ASGI views. It shares the slots and the
+    # bucket with slot(), so sync and async callers draw on the same quota, but
+    # waits with asyncio.sleep instead of blocking the event loop.
+    @asynccontextmanager
+    async def aslot(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with span(f"ratelimit.{self.name}"):
+            while not self._slots.acquire(blocking=False):
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise RateLimitTimeout(f"Timed out waiting for a free {self.name} slot")
+                await asyncio.sleep(ASYNC_POLL_INTERVAL)
+            try:
+                while not self.bucket.acquire(timeout=0):
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise RateLimitTimeout(f"Timed out waiting for {self.name} rate limit")
+                    await asyncio.sleep(min(1 / self.bucket.rate, ASYNC_POLL_INTERVAL))
+            except BaseException:
+                # Includes cancellation of the waiting request
+                self._slots.release()
+                raise
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+# Process-wide limiter for an upstream, shared by every request and worker
+# thread. UIUX_UPSTREAM_LIMITS overrides individual keys of the defaults.
+def get_limiter(service):
+    with _limiters_lock:
+        limiter = _limiters.get(service)
+        if limiter is None:
+            limits = dict(DEFAULT_UPSTREAM_LIMITS.get(service, DEFAULT_LIMITS))
+            limits.update(getattr(settings, 'UIUX_UPSTREAM_LIMITS', {}).get(service, {}))
+            limiter = UpstreamLimiter(service, limits['rate'], limits['burst'], limits['concurrency'])
+            _limiters[service] = limiter
+        return limiter
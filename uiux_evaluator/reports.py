@@ -0,0 +1,257 @@
+import logging
+from urllib.parse import urlsplit
+
+from django.db import transaction
+from django.db.models import Prefetch
+
+from .aggregation import SiteAggregator
+from .models import Scan, ScanPage, AnalyzerResult, Recommendation
+from .rules import evaluate_pagespeed, evaluate_security, messages, SECURITY_FALLBACK
+from .urlutils import normalize_url
+
+logger = logging.getLogger(__name__)
+
+
+# Persist a finished scan with one bulk insert per table. page_reports use the
+# same shape the endpoints return ({"url", "all_results", "final_recommendation"}
+# or {"url", "error"}).
+@transaction.atomic
+def store_scan(kind, base_url, options, page_reports, summary=None, job=None):
+    scan = create_scan(kind, base_url, options, summary=summary, job=job, total_pages=len(page_reports))
+    add_scan_pages(scan, enumerate(page_reports))
+    return scan
+
+
+def create_scan(kind, base_url, options, summary=None, job=None, total_pages=0):
+    return Scan.objects.create(
+        kind=kind,
+        base_url=base_url,
+        normalized_url=normalize_url(base_url),
+        host=(urlsplit(base_url).hostname or '').lower(),
+        options=options,
+        total_pages=total_pages,
+        summary=summary or {},
+        job=job,
+    )
+
+
+# Bulk insert (index, page_report) pairs of a scan; used for whole scans and
+# for streamed scans that store pages in small batches as they complete
+def add_scan_pages(scan, indexed_reports):
+    indexed_reports = list(indexed_reports)
+    pages = ScanPage.objects.bulk_create([
+        ScanPage(
+            scan=scan,
+            index=index,
+            url=report["url"],
+            summary=report.get("final_recommendation", {}).get("summary", ""),
+            error=report.get("error", ""),
+            fingerprint=report.get("fingerprint", ""),
+        )
+        for index, report in indexed_reports
+    ])
+
+    results = []
+    recommendations = []
+    for page, (_, report) in zip(pages, indexed_reports):
+        for service, payload in report.get("all_results", {}).items():
+            results.append(AnalyzerResult(page=page, service=service, payload=payload))
+        categories = report.get("final_recommendation", {}).get("categories", {})
+        for service, texts in categories.items():
+            recommendations.extend(
+                Recommendation(page=page, service=service, position=position, text=text)
+                for position, text in enumerate(texts)
+            )
+    AnalyzerResult.objects.bulk_create(results, batch_size=500)
+    Recommendation.objects.bulk_create(recommendations, batch_size=1000)
+    return pages
+
+
+# Storing history must never cost the caller the report they just paid for
+def store_scan_safely(*args, **kwargs):
+    try:
+        return store_scan(*args, **kwargs)
+    except Exception:
+        logger.exception("Could not store scan report")
+        return None
+
+
+def get_scan_queryset():
+    return Scan.objects.prefetch_related(
+        Prefetch('pages', queryset=ScanPage.objects.order_by('index')),
+        'pages__results',
+        'pages__recommendations',
+    )
+
+
+# Rebuild the page reports of a stored scan in the shape they were returned in
+def build_page_reports(scan):
+    reports = []
+    for page in scan.pages.all():
+        if page.error:
+            reports.append({"url": page.url, "error": page.error})
+            continue
+
+        categories = {}
+        for recommendation in sorted(page.recommendations.all(), key=lambda r: (r.service, r.position)):
+            categories.setdefault(recommendation.service, []).append(recommendation.text)
+
+        report = {
+            "url": page.url,
+            "all_results": {result.service: result.payload for result in page.results.all()},
+            "final_recommendation": {
+                "summary": page.summary,
+                "categories": categories
+            }
+        }
+        if page.fingerprint:
+            report["fingerprint"] = page.fingerprint
+        reports.append(report)
+    return reports
+
+
+# Options that must match for a stored page report to be reused by an incremental scan
+REUSE_OPTION_KEYS = ('apply_accessibility', 'apply_pagespeed', 'apply_security', 'security_engine',
+                     'apply_static', 'scan_mode')
+
+
+# Fingerprinted page reports of the latest stored full scan of base_url that
+# ran the same analyzers, keyed by page URL. Failed pages are left out.
+# Streamed scans only set total_pages once they complete (IncrementalScanWriter),
+# so scans still running, aborted or without pages are never picked.
+# Returns (scan id or None, {url: report}).
+def load_previous_pages(base_url, options, lookback=10):
+    wanted = {key: options.get(key) for key in REUSE_OPTION_KEYS}
+    candidates = Scan.objects.filter(
+        kind=Scan.KIND_FULL, normalized_url=normalize_url(base_url), total_pages__gt=0
+    ).only('pk', 'options')[:lookback]
+    for candidate in candidates:
+        if {key: candidate.options.get(key) for key in REUSE_OPTION_KEYS} != wanted:
+            continue
+        scan = get_scan_queryset().get(pk=candidate.pk)
+        return scan.pk, {
+            report["url"]: dict(report, reused_from_scan=scan.pk)
+            for report in build_page_reports(scan)
+            if "error" not in report and report.get("fingerprint")
+        }
+    return None, {}
+
+
+def render_scan(scan):
+    page_reports = build_page_reports(scan)
+    report = {
+        "scan_id": scan.id,
+        "kind": scan.kind,
+        "url": scan.base_url,
+        "created_at": scan.created_at,
+    }
+    if scan.kind == Scan.KIND_SINGLE:
+        report.update({
+            "final_recommendation": scan.summary,
+            "all_results": page_reports[0].get("all_results", {}) if page_reports else {},
+        })
+    else:
+        report.update({
+            "total_pages_scanned": len(page_reports),
+            "final_recommendation": scan.summary,
+            "results": page_reports,
+        })
+    return report
+
+
+# Stores a streamed scan page by page, in small bulk batches, so the full list
+# of page reports never has to be held in memory. Failures are logged and turn
+# the writer into a no-op rather than interrupting the stream.
+class IncrementalScanWriter:
+    def __init__(self, kind, base_url, options, batch_size=25):
+        self.batch_size = batch_size
+        self.total_pages = 0
+        self._pending = []
+        self.scan = store_scan_safely(kind, base_url, options, [])
+
+    def add(self, index, report):
+        self.total_pages += 1
+        if self.scan is None:
+            return
+        self._pending.append((index, report))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+
+    def finish(self, summary):
+        if self.scan is None:
+            return None
+        self._flush()
+        try:
+            Scan.objects.filter(pk=self.scan.pk).update(total_pages=self.total_pages, summary=summary)
+        except Exception:
+            logger.exception("Could not finalize scan %s", self.scan.pk)
+        return self.scan
+
+    def _flush(self):
+        pending, self._pending = self._pending, []
+        try:
+            with transaction.atomic():
+                add_scan_pages(self.scan, pending)
+        except Exception:
+            logger.exception("Could not store pages of scan %s", self.scan.pk)
+            self.scan = None
+
+
+# Re-run the recommendation rules (rules.py) over stored analyzer results, e.g.
+# after the rules changed, without calling any upstream API. Results are read
+# in primary-key batches and each batch is evaluated in a single pass; the
+# stored recommendation rows and the affected scans' summaries are rebuilt.
+# Returns the number of analyzer results updated.
+def reevaluate_stored_results(scan_ids=None, batch_size=500):
+    results = AnalyzerResult.objects.filter(service__in=['pagespeed', 'security']).order_by('pk')
+    if scan_ids:
+        results = results.filter(page__scan_id__in=scan_ids)
+
+    updated = 0
+    affected_scans = set()
+    last_pk = 0
+    while True:
+        batch = list(results.filter(pk__gt=last_pk).select_related('page')[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        changed = _reevaluate_batch(batch)
+        updated += len(changed)
+        affected_scans.update(result.page.scan_id for result in changed)
+
+    for scan in get_scan_queryset().filter(pk__in=affected_scans):
+        aggregator = SiteAggregator()
+        for index, report in enumerate(build_page_reports(scan)):
+            aggregator.add(index, report)
+        Scan.objects.filter(pk=scan.pk).update(summary=aggregator.final_recommendation())
+    return updated
+
+
+def _reevaluate_batch(batch):
+    # Security results stored before the rules engine carry no metrics to re-evaluate
+    pagespeed = [result for result in batch if result.service == 'pagespeed' and isinstance(result.payload, dict)
+                 and ('mobile' in result.payload or 'desktop' in result.payload)]
+    security = [result for result in batch if result.service == 'security' and isinstance(result.payload, dict)
+                and result.payload.get('metrics')]
+
+    pagespeed_pairs = [(result.payload.get('mobile'), result.payload.get('desktop')) for result in pagespeed]
+    for result, findings in zip(pagespeed, evaluate_pagespeed(pagespeed_pairs)):
+        result.payload['recommendations'] = messages(findings)
+        result.payload['prioritized_recommendations'] = findings
+    for result, findings in zip(security, evaluate_security([result.payload['metrics'] for result in security])):
+        result.payload['recommendations'] = messages(findings) or [SECURITY_FALLBACK]
+        result.payload['prioritized_recommendations'] = findings
+
+    changed = pagespeed + security
+    with transaction.atomic():
+        AnalyzerResult.objects.bulk_update(changed, ['payload'], batch_size=500)
+        for service, service_results in (('pagespeed', pagespeed), ('security', security)):
+            Recommendation.objects.filter(
+                service=service, page_id__in=[result.page_id for result in service_results]
+            ).delete()
+        Recommendation.objects.bulk_create([
+            Recommendation(page_id=result.page_id, service=result.service, position=position, text=text)
+            for result in changed
+            for position, text in enumerate(result.payload['recommendations'])
+        ], batch_size=1000)
+    return changed
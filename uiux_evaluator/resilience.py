@@ -0,0 +1,359 @@
+import asyncio
+import itertools
+import math
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from django.conf import settings
+
+from .clients import http_request, async_http_request, httpx
+from .concurrency import deadline_timeout, remaining_time
+from .metrics import span, HTTP_RETRIES, CIRCUIT_REJECTIONS, CIRCUIT_TRANSITIONS, RETRY_BUDGET_EXHAUSTED
+from .ratelimit import get_limiter
+
+# Responses worth retrying: request timeouts, throttling and transient server
+# errors. Any other 4xx would fail the same way again.
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+# attempts includes the first call. backoff/max_backoff bound the jittered
+# exponential delay between attempts; a Retry-After longer than
+# max_retry_after is not waited for. Retries may add at most retry_ratio of
+# the calls made in the last budget_window seconds (plus min_retries_per_second,
+# so a quiet service can still retry). failure_threshold consecutive failures
+# open the breaker, which lets a probe call through after reset_timeout seconds.
+DEFAULT_POLICY = {
+    'attempts': 3,
+    'backoff': 1.0,
+    'max_backoff': 30.0,
+    'max_retry_after': 60.0,
+    'retry_ratio': 0.2,
+    'min_retries_per_second': 1.0,
+    'budget_window': 10.0,
+    'failure_threshold': 5,
+    'reset_timeout': 30.0,
+}
+DEFAULT_UPSTREAM_RESILIENCE = {
+    'wave': {'attempts': 1},     # every call costs paid credits
+    # the tracker schedules its own polls (ssllabs.py), and SSL Labs recovers slowly
+    'ssllabs': {'attempts': 1, 'reset_timeout': 60.0},
+    'llm': {'attempts': 1, 'failure_threshold': 3},
+}
+
+# Transport errors that mean the request never reached the upstream, so
+# retrying is safe and cheap. Read timeouts are not retried: the upstream is
+# already slow and another attempt would cost the full timeout again.
+RETRYABLE_ERRORS = (requests.ConnectionError,)
+TRANSPORT_ERRORS = (requests.RequestException,)
+if httpx is not None:
+    RETRYABLE_ERRORS += (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+    TRANSPORT_ERRORS += (httpx.TransportError,)
+
+# Error responses about the page being analyzed rather than the upstream:
+# PageSpeed answers HTTP 500 "Lighthouse returned error: ..." when the target
+# page fails to load. They are final results, neither retried nor counted
+# against the breaker.
+TARGET_ERROR_PREFIXES = {'pagespeed': 'Lighthouse returned error'}
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, service, retry_after):
+        self.service = service
+        self.retry_after = retry_after
+        super().__init__(f"{service} is degraded (circuit open); not calling it for another {math.ceil(retry_after)}s")
+
+
+# Upstream health counts 5xx, 408/429 and transport errors; other 4xx are the
+# caller's fault and say nothing about the upstream
+def is_failure_status(status_code):
+    return status_code >= 500 or status_code in (408, 429)
+
+
+# The upstream's message when response reports a problem with the target page
+# (TARGET_ERROR_PREFIXES), else None
+def target_error_message(service, response):
+    prefix = TARGET_ERROR_PREFIXES.get(service)
+    if prefix is None or response.status_code != 500:
+        return None
+    try:
+        message = response.json().get('error', {}).get('message')
+    except (ValueError, AttributeError):
+        return None
+    if isinstance(message, str) and message.startswith(prefix):
+        return message
+    return None
+
+
+# Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None
+def parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+# Consecutive-failure circuit breaker. Open, it refuses calls right away
+# (CircuitOpenError) instead of letting every caller wait out the upstream's
+# timeout; after reset_timeout one probe call is let through (half-open), and
+# its outcome closes the circuit again or re-opens it.
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    # Returns whether this call is the half-open probe
+    def before_call(self):
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self._opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    CIRCUIT_REJECTIONS.inc(service=self.name)
+                    raise CircuitOpenError(self.name, remaining)
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._probing:
+                    CIRCUIT_REJECTIONS.inc(service=self.name)
+                    raise CircuitOpenError(self.name, self.reset_timeout)
+                self._probing = True
+                return True
+            return False
+
+    # failed is True/False for a call that got an answer (or a transport error),
+    # None for one that never reached the upstream (e.g. a cancelled wait)
+    def record(self, failed, probe=False):
+        with self._lock:
+            if probe:
+                self._probing = False
+            if failed is None:
+                return
+            if not failed:
+                self._failures = 0
+                if self.state != CLOSED:
+                    self._transition(CLOSED)
+                return
+            self._failures += 1
+            if probe or (self.state == CLOSED and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self._transition(OPEN)
+
+    def _transition(self, state):
+        self.state = state
+        CIRCUIT_TRANSITIONS.inc(service=self.name, state=state)
+
+
+# Caps retries at a fraction of recent traffic, so a struggling upstream is
+# not hit with up to attempts-times its normal load by every caller retrying.
+class RetryBudget:
+    def __init__(self, ratio=0.2, min_per_second=1.0, window=10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window = window
+        self._requests = deque()
+        self._retries = deque()
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        with self._lock:
+            self._requests.append(time.monotonic())
+
+    # Take one retry from the budget; False when it is spent
+    def try_spend(self):
+        with self._lock:
+            now = time.monotonic()
+            cutoff = now - self.window
+            for calls in (self._requests, self._retries):
+                while calls and calls[0] < cutoff:
+                    calls.popleft()
+            allowed = self.min_per_second * self.window + self.ratio * len(self._requests)
+            if len(self._retries) >= allowed:
+                return False
+            self._retries.append(now)
+            return True
+
+
+class _Outcome:
+    failed = None
+
+
+# Breaker, retry budget and retry settings of one upstream service
+class UpstreamPolicy:
+    def __init__(self, name, attempts, backoff, max_backoff, max_retry_after, retry_ratio,
+                 min_retries_per_second, budget_window, failure_threshold, reset_timeout):
+        self.name = name
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        self.budget = RetryBudget(retry_ratio, min_retries_per_second, budget_window)
+
+    # Guards one call to the upstream: raises CircuitOpenError while the
+    # breaker is open and reports the call's outcome to it. Transport errors
+    # count as failures; callers set outcome.failed for responses.
+    @contextmanager
+    def attempt(self):
+        probe = self.breaker.before_call()
+        outcome = _Outcome()
+        try:
+            yield outcome
+        except TRANSPORT_ERRORS:
+            if outcome.failed is None:
+                outcome.failed = True
+            raise
+        finally:
+            self.breaker.record(outcome.failed, probe)
+
+    # Seconds to wait before the next attempt after `attempt` attempts, or None
+    # to give up: out of attempts, Retry-After too long or retry budget spent.
+    # Equal jitter (half fixed, half random) keeps callers from retrying in sync.
+    def retry_delay(self, attempt, retry_after=None):
+        if attempt >= self.attempts:
+            return None
+        if retry_after is not None and retry_after > self.max_retry_after:
+            return None
+        if not self.budget.try_spend():
+            RETRY_BUDGET_EXHAUSTED.inc(service=self.name)
+            return None
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        return max(delay, retry_after or 0.0)
+
+
+_policies = {}
+_policies_lock = threading.Lock()
+
+
+# Process-wide policy for an upstream, shared like its rate limiter (ratelimit.py)
+def get_policy(service):
+    with _policies_lock:
+        policy = _policies.get(service)
+        if policy is None:
+            options = dict(DEFAULT_POLICY, **DEFAULT_UPSTREAM_RESILIENCE.get(service, {}))
+            options.update(getattr(settings, 'UIUX_UPSTREAM_RESILIENCE', {}).get(service, {}))
+            policy = _policies[service] = UpstreamPolicy(service, **options)
+        return policy
+
+
+# Breaker state per service, for the metrics endpoint
+def breaker_states():
+    with _policies_lock:
+        return {service: policy.breaker.state for service, policy in _policies.items()}
+
+
+# Upstream request through the service's breaker, rate limiter and retry
+# budget. Only connection errors and RETRYABLE_STATUSES are retried, after a
+# jittered exponential delay or the upstream's Retry-After; target errors
+# (target_error_message) are returned as failed responses right away. Raises
+# CircuitOpenError while the upstream is considered down, and
+# requests.HTTPError for error responses that are not retried. Inside a
+# run_parallel task, waits and retries stop at the task's deadline.
+def request_with_retries(service, method, url, **kwargs):
+    policy = get_policy(service)
+    policy.budget.record_request()
+    for attempt in itertools.count(1):
+        with policy.attempt() as outcome:
+            try:
+                with get_limiter(service).slot(timeout=deadline_timeout(None)):
+                    response = http_request(service, method, url, **kwargs)
+            except RETRYABLE_ERRORS:
+                outcome.failed = True
+                delay = _within_deadline(policy.retry_delay(attempt))
+                if delay is None:
+                    raise
+            else:
+                target_error = target_error_message(service, response) is not None
+                outcome.failed = is_failure_status(response.status_code) and not target_error
+                if response.status_code < 400:
+                    return response
+                delay = None if target_error else _within_deadline(_response_retry_delay(policy, attempt, response))
+                if delay is None:
+                    response.raise_for_status()
+        HTTP_RETRIES.inc(service=service)
+        with span(f"backoff.{service}", attempt=attempt, seconds=round(delay, 2)):
+            time.sleep(delay)
+
+
+# request_with_retries for the async views (httpx.HTTPStatusError for error responses)
+async def arequest_with_retries(service, method, url, **kwargs):
+    policy = get_policy(service)
+    policy.budget.record_request()
+    for attempt in itertools.count(1):
+        with policy.attempt() as outcome:
+            try:
+                async with get_limiter(service).aslot():
+                    response = await async_http_request(service, method, url, **kwargs)
+            except RETRYABLE_ERRORS:
+                outcome.failed = True
+                delay = policy.retry_delay(attempt)
+                if delay is None:
+                    raise
+            else:
+                target_error = target_error_message(service, response) is not None
+                outcome.failed = is_failure_status(response.status_code) and not target_error
+                if response.status_code < 400:
+                    return response
+                delay = None if target_error else _response_retry_delay(policy, attempt, response)
+                if delay is None:
+                    response.raise_for_status()
+        HTTP_RETRIES.inc(service=service)
+        with span(f"backoff.{service}", attempt=attempt, seconds=round(delay, 2)):
+            await asyncio.sleep(delay)
+
+
+# delay, or None when waiting it out would pass the current task's deadline
+def _within_deadline(delay):
+    remaining = remaining_time()
+    if delay is None or remaining is None or delay < remaining:
+        return delay
+    return None
+
+
+def _response_retry_delay(policy, attempt, response):
+    if response.status_code not in RETRYABLE_STATUSES:
+        return None
+    return policy.retry_delay(attempt, parse_retry_after(response.headers.get('Retry-After')))
+
+
+# Analyzer result for a call refused by an open breaker. It is an error result
+# (so it is never cached) marked degraded, telling clients the upstream is
+# down rather than the page having a problem.
+def degraded_result(error):
+    return {
+        'error': str(error),
+        'degraded': True,
+        'service': error.service,
+        'retry_after_seconds': round(error.retry_after, 1),
+    }
+
+
+# Whether an analyzer result, or one of its parts (e.g. a PageSpeed strategy), is degraded
+def is_degraded(result):
+    if not isinstance(result, dict):
+        return False
+    return bool(result.get('degraded')) or any(
+        isinstance(value, dict) and value.get('degraded') for value in result.values()
+    )
@@ -0,0 +1,295 @@
+import operator
+import threading
+
+from django.conf import settings
+
+SEVERITY_RANKS = {'high': 0, 'medium': 1, 'low': 2, 'info': 3}
+
+# Lighthouse audits whose details carry savings estimates
+SAVINGS_AUDITS = (
+    'render-blocking-resources', 'uses-rel-preconnect', 'uses-text-compression', 'uses-optimized-images',
+    'uses-webp-images', 'modern-image-formats', 'efficient-animated-content', 'unused-javascript',
+    'unused-css-rules', 'server-response-time',
+)
+
+# Recommendation rules, as data. Each rule tests one extracted metric (field)
+# with op/threshold and renders message with {label}, {value}, {count} and
+# {threshold}; comparison ops (lt, le, gt, ge, eq, ne) never match a missing
+# metric. savings names the Lighthouse audit whose estimated savings are
+# attached to the finding. Findings are ordered by severity, then by savings.
+PAGESPEED_RULES = [
+    {'id': 'performance-score', 'field': 'overall_score', 'op': 'lt', 'threshold': 80,
+     'severity': 'high', 'category': 'performance',
+     'message': "{label}: Performance is below optimal. Optimize images, enable compression, and minimize blocking scripts."},
+    {'id': 'viewport', 'field': 'mobile_friendly', 'op': 'eq', 'threshold': 0,
+     'severity': 'high', 'category': 'mobile',
+     'message': "{label}: Page is not mobile-friendly. Add a meta viewport and use responsive design."},
+    {'id': 'uses-optimized-images', 'field': 'uses_optimized_images', 'op': 'lt', 'threshold': 0.9,
+     'severity': 'medium', 'category': 'images', 'savings': 'uses-optimized-images',
+     'message': "{label}: Serve images in next-gen formats like WebP or AVIF for better loading speed."},
+    {'id': 'render-blocking-resources', 'field': 'render_blocking_resources', 'op': 'lt', 'threshold': 0.9,
+     'severity': 'high', 'category': 'performance', 'savings': 'render-blocking-resources',
+     'message': "{label}: Eliminate or defer render-blocking resources such as CSS and JS."},
+    {'id': 'uses-rel-preconnect', 'field': 'uses_rel_preconnect', 'op': 'lt', 'threshold': 0.9,
+     'severity': 'low', 'category': 'network', 'savings': 'uses-rel-preconnect',
+     'message': "{label}: Consider using resource hints like preconnect or dns-prefetch for critical origins."},
+    {'id': 'uses-text-compression', 'field': 'uses_text_compression', 'op': 'lt', 'threshold': 0.9,
+     'severity': 'medium', 'category': 'network', 'savings': 'uses-text-compression',
+     'message': "{label}: Enable text compression (gzip, brotli) on your server."},
+    {'id': 'uses-webp-images', 'field': 'uses_webp_images', 'op': 'lt', 'threshold': 0.9,
+     'severity': 'medium', 'category': 'images', 'savings': 'uses-webp-images',
+     'message': "{label}: Convert images to WebP format to reduce size."},
+    {'id': 'efficient-animated-content', 'field': 'efficient_animated_content', 'op': 'lt', 'threshold': 0.9,
+     'severity': 'low', 'category': 'images', 'savings': 'efficient-animated-content',
+     'message': "{label}: Optimize animated content for better performance."},
+    {'id': 'unused-javascript', 'field': 'unused_javascript_count', 'op': 'gt', 'threshold': 0,
+     'severity': 'medium', 'category': 'performance', 'savings': 'unused-javascript',
+     'message': "{label}: Remove unused JavaScript ({value} scripts identified)."},
+    {'id': 'unused-css-rules', 'field': 'unused_css_rules_count', 'op': 'gt', 'threshold': 0,
+     'severity': 'low', 'category': 'performance', 'savings': 'unused-css-rules',
+     'message': "{label}: Remove unused CSS rules ({value} rules identified)."},
+    # One row per failing Lighthouse UI audit (see pagespeed_rows)
+    {'id': 'ui-issue', 'field': 'ui_issue_title', 'op': 'truthy',
+     'severity': 'medium', 'category': 'ui',
+     'message': "{label}: {value}"},
+]
+
+# Security rules apply to SSL Labs metrics (ssllabs_metrics) and to local TLS
+# inspection metrics (tls_inspect.tls_metrics); rules on fields only one of them
+# sets never match the other.
+SECURITY_RULES = [
+    {'id': 'certificate-untrusted', 'field': 'trust_error', 'op': 'truthy',
+     'severity': 'high', 'category': 'certificate',
+     'message': "Certificate is not trusted ({value}). Serve a complete chain from a public CA."},
+    {'id': 'weak-grade', 'field': 'grade', 'op': 'in', 'threshold': ['B', 'C', 'D', 'E', 'F', 'T', 'M'],
+     'severity': 'high', 'category': 'tls',
+     'message': "SSL Labs grade is {value}. Review the protocol, cipher and certificate findings to raise it."},
+    {'id': 'rc4-enabled', 'field': 'supports_rc4', 'op': 'truthy',
+     'severity': 'high', 'category': 'tls',
+     'message': "Disable the RC4 cipher; it is broken and rejected by modern browsers."},
+    {'id': 'modern-tls-disabled', 'field': 'supports_modern_tls', 'op': 'eq', 'threshold': False,
+     'severity': 'high', 'category': 'tls',
+     'message': "Enable TLS 1.2 and TLS 1.3."},
+    {'id': 'legacy-protocols', 'field': 'legacy_protocols', 'op': 'truthy',
+     'severity': 'medium', 'category': 'tls',
+     'message': "Disable legacy protocols ({value}); they cap the grade at B."},
+    {'id': 'forward-secrecy-missing', 'field': 'forward_secrecy', 'op': 'eq', 'threshold': 0,
+     'severity': 'medium', 'category': 'tls',
+     'message': "Prefer ECDHE key exchange so connections get Forward Secrecy."},
+    # Only for reports that include an HSTS policy ('ne' never matches a missing metric)
+    {'id': 'hsts-missing', 'field': 'hsts_status', 'op': 'ne', 'threshold': 'present',
+     'severity': 'medium', 'category': 'headers',
+     'message': "Enable HSTS (Strict-Transport-Security header)."},
+    {'id': 'certificate-expiring', 'field': 'cert_days_remaining', 'op': 'lt', 'threshold': 30,
+     'severity': 'medium', 'category': 'certificate',
+     'message': "Certificate expires in {value} day(s); renew it soon."},
+    {'id': 'tls13-disabled', 'field': 'supports_tls13', 'op': 'eq', 'threshold': False,
+     'severity': 'low', 'category': 'tls',
+     'message': "Enable TLS 1.3 for faster, more secure handshakes."},
+    {'id': 'hsts-short-max-age', 'field': 'hsts_short_max_age', 'op': 'truthy',
+     'severity': 'low', 'category': 'headers',
+     'message': "Raise the HSTS max-age to at least 180 days to qualify for A+."},
+    {'id': 'warnings', 'field': 'has_warnings', 'op': 'truthy',
+     'severity': 'low', 'category': 'tls',
+     'message': "Review non-fatal SSL warnings for further improvement."},
+    {'id': 'strong-grade', 'field': 'grade', 'op': 'in', 'threshold': ['A+', 'A'],
+     'severity': 'info', 'category': 'tls',
+     'message': "Site has a strong SSL/TLS configuration with a grade of {value}."},
+    {'id': 'forward-secrecy', 'field': 'forward_secrecy', 'op': 'eq', 'threshold': 2,
+     'severity': 'info', 'category': 'tls',
+     'message': "Ensure continued support for Forward Secrecy across all modern browsers."},
+    {'id': 'rc4-disabled', 'field': 'supports_rc4', 'op': 'eq', 'threshold': False,
+     'severity': 'info', 'category': 'tls',
+     'message': "RC4 cipher is disabled, which is recommended."},
+    {'id': 'hsts-enabled', 'field': 'hsts_status', 'op': 'eq', 'threshold': 'present',
+     'severity': 'info', 'category': 'headers',
+     'message': "HSTS is enabled."},
+    {'id': 'hsts-long-max-age', 'field': 'hsts_long_max_age', 'op': 'truthy',
+     'severity': 'info', 'category': 'headers',
+     'message': "HSTS max-age is sufficiently long for preloading (helps maintain A+)."},
+    {'id': 'certificate-chain', 'field': 'cert_issues', 'op': 'falsy',
+     'severity': 'info', 'category': 'certificate',
+     'message': "Certificate chain is complete and valid."},
+    {'id': 'certificate-valid', 'field': 'cert_not_after', 'op': 'truthy',
+     'severity': 'info', 'category': 'certificate',
+     'message': "Certificate is valid and not expired."},
+]
+SECURITY_FALLBACK = "No specific recommendations. SSL Labs scan returned no major findings."
+
+
+def _compare(compare):
+    def test(value, threshold):
+        return isinstance(value, (int, float)) and not isinstance(value, bool) and compare(value, threshold)
+    return test
+
+
+OPERATORS = {
+    'lt': _compare(operator.lt),
+    'le': _compare(operator.le),
+    'gt': _compare(operator.gt),
+    'ge': _compare(operator.ge),
+    'eq': lambda value, threshold: value is not None and value == threshold,
+    'ne': lambda value, threshold: value is not None and value != threshold,
+    'in': lambda value, threshold: value in threshold,
+    'truthy': lambda value, threshold: bool(value),
+    'falsy': lambda value, threshold: not value,
+}
+
+
+class Rule:
+    def __init__(self, order, spec):
+        try:
+            self.test = OPERATORS[spec['op']]
+        except KeyError:
+            raise ValueError(f"Rule {spec.get('id')!r} has unknown op {spec.get('op')!r}")
+        if spec.get('severity', 'medium') not in SEVERITY_RANKS:
+            raise ValueError(f"Rule {spec.get('id')!r} has unknown severity {spec.get('severity')!r}")
+        self.order = order
+        self.id = spec['id']
+        self.field = spec['field']
+        self.threshold = spec.get('threshold')
+        self.message = spec['message']
+        self.severity = spec.get('severity', 'medium')
+        self.category = spec.get('category', 'general')
+        self.savings = spec.get('savings')
+
+    def finding(self, label, value, metrics):
+        savings = (metrics.get('savings') or {}).get(self.savings) or {} if self.savings else {}
+        return {
+            'rule': self.id,
+            'severity': self.severity,
+            'category': self.category,
+            'message': self.message.format(
+                label=label, value=value, threshold=self.threshold,
+                count=len(value) if isinstance(value, (list, tuple, dict)) else value,
+            ),
+            'estimated_savings_ms': savings.get('ms'),
+            'estimated_savings_bytes': savings.get('bytes'),
+        }
+
+
+# A compiled list of rules. evaluate() takes the metric rows of any number of
+# pages at once and sweeps each rule over the column of its field, so a whole
+# scan (or every stored result) is re-evaluated in a single pass.
+class RuleSet:
+    def __init__(self, specs):
+        self.rules = [Rule(order, spec) for order, spec in enumerate(specs)]
+
+    # rows: (key, label, metrics) tuples. Returns {key: [finding, ...]} with
+    # each key's findings in priority order.
+    def evaluate(self, rows):
+        findings = {key: [] for key, _, _ in rows}
+        columns = {}
+        for rule in self.rules:
+            column = columns.get(rule.field)
+            if column is None:
+                column = columns[rule.field] = [metrics.get(rule.field) for _, _, metrics in rows]
+            for (key, label, metrics), value in zip(rows, column):
+                if rule.test(value, rule.threshold):
+                    findings[key].append((rule.order, rule.finding(label, value, metrics)))
+
+        return {key: prioritize([finding for _, finding in sorted(items, key=lambda item: item[0])])
+                for key, items in findings.items()}
+
+
+# Stable sort by severity, then by estimated savings (largest first); repeated
+# messages keep their highest-priority occurrence. Adds 1-based 'priority'.
+def prioritize(findings):
+    ordered = sorted(findings, key=lambda finding: (
+        SEVERITY_RANKS[finding['severity']],
+        -(finding['estimated_savings_ms'] or 0),
+        -(finding['estimated_savings_bytes'] or 0),
+    ))
+    unique = []
+    seen = set()
+    for finding in ordered:
+        if finding['message'] not in seen:
+            seen.add(finding['message'])
+            unique.append(dict(finding, priority=len(unique) + 1))
+    return unique
+
+
+_rulesets = {}
+_rulesets_lock = threading.Lock()
+DEFAULT_RULES = {'pagespeed': PAGESPEED_RULES, 'security': SECURITY_RULES}
+
+
+# Compiled once per process. UIUX_RECOMMENDATION_RULES may replace the rule
+# list of a source ('pagespeed' or 'security').
+def get_ruleset(source):
+    with _rulesets_lock:
+        ruleset = _rulesets.get(source)
+        if ruleset is None:
+            specs = getattr(settings, 'UIUX_RECOMMENDATION_RULES', {}).get(source, DEFAULT_RULES[source])
+            ruleset = _rulesets[source] = RuleSet(specs)
+        return ruleset
+
+
+# Estimated savings per Lighthouse opportunity audit, from its details
+def extract_savings(audits):
+    savings = {}
+    for audit_id in SAVINGS_AUDITS:
+        audit = audits.get(audit_id) or {}
+        details = audit.get('details') or {}
+        saved_ms = details.get('overallSavingsMs')
+        if saved_ms is None and audit.get('metricSavings'):
+            saved_ms = max((value for value in audit['metricSavings'].values() if value is not None), default=None)
+        saved_bytes = details.get('overallSavingsBytes')
+        if saved_ms or saved_bytes:
+            savings[audit_id] = {
+                'ms': round(saved_ms) if saved_ms is not None else None,
+                'bytes': round(saved_bytes) if saved_bytes is not None else None,
+            }
+    return savings
+
+
+# Results stored before the heavy item lists moved to the raw payload archive
+# carry the lists themselves instead of their counts
+LEGACY_COUNT_FIELDS = {'unused_javascript_count': 'unused_javascript', 'unused_css_rules_count': 'unused_css_rules'}
+
+
+def pagespeed_rows(key, mobile_results, desktop_results):
+    rows = []
+    for label, details in (("Mobile", mobile_results), ("Desktop", desktop_results)):
+        if isinstance(details, dict) and 'error' not in details:
+            legacy = {count_field: len(details[list_field]) for count_field, list_field in LEGACY_COUNT_FIELDS.items()
+                      if count_field not in details and isinstance(details.get(list_field), list)}
+            rows.append((key, label, dict(details, **legacy) if legacy else details))
+    for details in (mobile_results, desktop_results):
+        if isinstance(details, dict):
+            for issue in details.get('ui_issues', {}).values():
+                rows.append((key, "General", {'ui_issue_title': issue.get('title')}))
+    return rows
+
+
+# Prioritized PageSpeed findings for many (mobile, desktop) result pairs at once
+def evaluate_pagespeed(result_pairs):
+    rows = [row for key, (mobile, desktop) in enumerate(result_pairs) for row in pagespeed_rows(key, mobile, desktop)]
+    findings = get_ruleset('pagespeed').evaluate(rows)
+    return [findings.get(key, []) for key in range(len(result_pairs))]
+
+
+# Prioritized security findings for many extracted SSL Labs metric dicts at once
+def evaluate_security(metrics_list):
+    findings = get_ruleset('security').evaluate([(key, '', metrics) for key, metrics in enumerate(metrics_list)])
+    return [findings[key] for key in range(len(metrics_list))]
+
+
+def ssllabs_metrics(endpoint):
+    details = endpoint.get("details", {})
+    cert = details.get("cert", {})
+    hsts = details.get("hstsPolicy", {})
+    return {
+        'grade': endpoint.get("grade", "N/A"),
+        'forward_secrecy': details.get("forwardSecrecy"),
+        'supports_rc4': details.get("supportsRc4", False),
+        'hsts_status': hsts.get("status"),
+        'hsts_long_max_age': hsts.get("status") == "present" and hsts.get("longMaxAge", False),
+        'cert_issues': cert.get("issues"),
+        'cert_not_after': cert.get("notAfter"),
+        'has_warnings': endpoint.get("hasWarnings", False),
+    }
+
+
+def messages(findings):
+    return [finding['message'] for finding in findings]
@@ -1,7 +1,102 @@
 from rest_framework import serializers
+from .models import ScanJob, ScanJobPage, Scan
 
 class WebsiteURLSerializer(serializers.Serializer):
     url = serializers.URLField(required = True)
     is_accessibility_applied = serializers.BooleanField(default = True)
     is_pagespeed_applied = serializers.BooleanField(default = True)
-    is_security_applied = serializers.BooleanField(default = True)
\ No newline at end of file
+    is_security_applied = serializers.BooleanField(default = True)
+    security_engine = serializers.ChoiceField(choices = ['ssllabs', 'local'], default = 'ssllabs')
+    is_static_applied = serializers.BooleanField(default = False)
+    scan_mode = serializers.ChoiceField(choices = ['full', 'quick'], default = 'full')
+    deadline_seconds = serializers.FloatField(required = False, min_value = 1, max_value = 600)
+    force_refresh = serializers.BooleanField(default = False)
+    include_details = serializers.BooleanField(default = False)
+    include_timings = serializers.BooleanField(default = False)
+
+
+# Single-page options that the multi-page endpoints do not support. The
+# serializers below drop these fields and reject them with a validation error
+# instead of silently ignoring them.
+SINGLE_PAGE_ONLY_FIELDS = ('deadline_seconds', 'include_details')
+
+
+def reject_single_page_fields(data):
+    errors = {name: ["Only supported for single-page analysis."] for name in SINGLE_PAGE_ONLY_FIELDS if name in data}
+    if errors:
+        raise serializers.ValidationError(errors)
+
+
+class FullScanSerializer(WebsiteURLSerializer):
+    deadline_seconds = None
+    include_details = None
+    run_async = serializers.BooleanField(default = False)
+    max_workers = serializers.IntegerField(required = False, min_value = 1, max_value = 16)
+    max_depth = serializers.IntegerField(required = False, min_value = 0, max_value = 5)
+    max_pages = serializers.IntegerField(required = False, min_value = 1, max_value = 500)
+    stream = serializers.ChoiceField(choices = ['ndjson', 'sse'], required = False)
+    compact = serializers.BooleanField(default = False)
+    incremental = serializers.BooleanField(default = False)
+
+    def validate(self, attrs):
+        reject_single_page_fields(self.initial_data)
+        return attrs
+
+
+class BatchAnalysisSerializer(WebsiteURLSerializer):
+    url = None
+    deadline_seconds = None
+    include_details = None
+    urls = serializers.ListField(child = serializers.URLField(), min_length = 1, max_length = 200)
+    run_async = serializers.BooleanField(default = False)
+    max_workers = serializers.IntegerField(required = False, min_value = 1, max_value = 16)
+
+    def validate(self, attrs):
+        reject_single_page_fields(self.initial_data)
+        return attrs
+
+
+class ScanJobPageSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ScanJobPage
+        fields = ['index', 'url', 'status', 'completed_at', 'report']
+
+
+class ScanJobPageProgressSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ScanJobPage
+        fields = ['index', 'url', 'status', 'completed_at']
+
+
+class ScanJobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+    scan_id = serializers.SerializerMethodField()
+    pages = ScanJobPageProgressSerializer(many = True, read_only = True)
+
+    class Meta:
+        model = ScanJob
+        fields = ['id', 'kind', 'base_url', 'options', 'status', 'error', 'total_pages', 'completed_pages',
+                  'progress', 'scan_id', 'created_at', 'started_at', 'finished_at', 'pages']
+
+    def get_scan_id(self, job):
+        scan = getattr(job, 'scan', None)
+        return scan.id if scan else None
+
+    def get_progress(self, job):
+        if not job.total_pages:
+            return 0.0
+        return round(job.completed_pages / job.total_pages * 100, 1)
+
+
+class ScanHistorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Scan
+        fields = ['id', 'kind', 'base_url', 'host', 'total_pages', 'options', 'created_at']
+
+
+# Query parameters of the scan history endpoint
+class ScanHistoryQuerySerializer(serializers.Serializer):
+    url = serializers.CharField(required = False)
+    host = serializers.CharField(required = False)
+    kind = serializers.ChoiceField(choices = Scan.KIND_CHOICES, required = False)
+    limit = serializers.IntegerField(default = 50, min_value = 1, max_value = 500)
@@ -0,0 +1,265 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+import requests
+from django.conf import settings
+
+from .clients import http_request
+from .concurrency import deadline_timeout
+from .ratelimit import get_limiter, RateLimitTimeout
+from .resilience import get_policy, is_failure_status, CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_BASE = 'https://api.ssllabs.com/api/v3'
+
+READY = 'READY'
+PENDING = 'PENDING'
+TIMEOUT = 'TIMEOUT'
+ERROR = 'ERROR'
+
+# HTTP statuses meaning SSL Labs is overloaded or we are polling too often
+BACKOFF_HTTP_STATUSES = (429, 503, 529)
+
+
+class _Assessment:
+    def __init__(self, host, start_new):
+        self.host = host
+        self.start_new = start_new
+        self.started = time.monotonic()
+        self.finished = None
+        self.interval = None
+        self.polls = 0
+        self.state = PENDING
+        self.data = None
+        self.error = None
+        self.degraded = False
+        self.done = threading.Event()
+        self._callbacks = []
+        self._callbacks_lock = threading.Lock()
+
+    def elapsed(self):
+        return round((self.finished or time.monotonic()) - self.started, 1)
+
+    # Call callback() (from the polling thread) once the assessment finishes, or
+    # right away if it already has
+    def add_done_callback(self, callback):
+        with self._callbacks_lock:
+            if not self.done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def finish(self):
+        with self._callbacks_lock:
+            self.done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def snapshot(self):
+        return {
+            'state': self.state,
+            'elapsed_seconds': self.elapsed(),
+            'polls': self.polls,
+            'data': self.data,
+            'error': self.error,
+            'degraded': self.degraded,
+        }
+
+
+# Tracks SSL Labs assessments off the request thread. One scheduler thread keeps
+# a heap of (next poll time, assessment) for every host being assessed and hands
+# due polls to a small worker pool, so any number of hosts are polled
+# concurrently without a sleeping thread per host. Poll intervals follow the
+# API's hints: short while resolving DNS, the endpoints' ETA while in progress,
+# otherwise doubling from min_interval up to max_interval. An assessment that
+# is not READY after max_duration seconds ends in the TIMEOUT state.
+class SSLLabsTracker:
+    def __init__(self, api_base=DEFAULT_API_BASE, min_interval=5, max_interval=60,
+                 max_duration=300, poll_workers=4, retention=600):
+        self.api_base = api_base.rstrip('/')
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_duration = max_duration
+        self.retention = retention
+        self._assessments = {}
+        self._heap = []
+        self._sequence = itertools.count()
+        self._lock = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=poll_workers, thread_name_prefix='ssllabs-poll')
+        self._scheduler = None
+
+    # Start (or join) the assessment of host and wait up to timeout seconds for
+    # it (less inside a run_parallel task whose deadline comes first). If it is
+    # still running the snapshot is PENDING; polling carries on in the
+    # background and a later call for the same host picks up the result.
+    def assess(self, host, timeout=None, start_new=False):
+        assessment = self.track(host, start_new=start_new)
+        assessment.done.wait(deadline_timeout(timeout))
+        return assessment.snapshot()
+
+    # assess() for async callers: waits on the event loop instead of a thread
+    async def assess_async(self, host, timeout=None, start_new=False):
+        assessment = self.track(host, start_new=start_new)
+        loop = asyncio.get_running_loop()
+        finished = loop.create_future()
+
+        def resolve():
+            if not finished.done():
+                finished.set_result(None)
+
+        def notify():
+            try:
+                loop.call_soon_threadsafe(resolve)
+            except RuntimeError:  # the loop has closed; nobody is waiting any more
+                pass
+
+        assessment.add_done_callback(notify)
+        try:
+            await asyncio.wait_for(finished, timeout)
+        except asyncio.TimeoutError:
+            pass
+        return assessment.snapshot()
+
+    def track(self, host, start_new=False):
+        with self._lock:
+            self._evict_finished()
+            assessment = self._assessments.get(host)
+            # Finished READY results are reused until evicted; anything else that
+            # has finished (errors, timeouts) is assessed again
+            if assessment is None or (assessment.done.is_set() and (start_new or assessment.state != READY)):
+                assessment = _Assessment(host, start_new)
+                self._assessments[host] = assessment
+                self._schedule(assessment, 0)
+            if self._scheduler is None:
+                self._scheduler = threading.Thread(target=self._run, name='ssllabs-scheduler', daemon=True)
+                self._scheduler.start()
+            return assessment
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    self._lock.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                _, _, assessment = heapq.heappop(self._heap)
+            self._executor.submit(self._poll, assessment)
+
+    def _schedule(self, assessment, delay):
+        # Never sleep past the assessment's deadline, so timeouts are reported on time
+        due = min(time.monotonic() + delay, assessment.started + self.max_duration)
+        heapq.heappush(self._heap, (due, next(self._sequence), assessment))
+        self._lock.notify()
+
+    def _reschedule(self, assessment, interval):
+        assessment.interval = interval
+        with self._lock:
+            self._schedule(assessment, interval)
+
+    # Runs in the poll pool, where an exception would be lost and leave the
+    # assessment PENDING forever; anything unexpected ends it as an ERROR
+    def _poll(self, assessment):
+        try:
+            self._poll_once(assessment)
+        except Exception as e:
+            logger.exception("SSL Labs poll for %s failed", assessment.host)
+            self._finish(assessment, ERROR, error=f"Unexpected error while polling SSL Labs: {e}")
+
+    def _poll_once(self, assessment):
+        if time.monotonic() - assessment.started >= self.max_duration:
+            return self._finish(assessment, TIMEOUT, error=(
+                f"SSL Labs assessment of {assessment.host} not ready after {assessment.elapsed()}s"
+            ))
+
+        params = {'host': assessment.host, 'publish': 'off', 'all': 'done'}
+        if assessment.start_new and assessment.polls == 0:
+            params['startNew'] = 'on'
+        # While the SSL Labs circuit breaker is open (resilience.py) assessments
+        # end right away as degraded instead of polling a dead API until max_duration
+        try:
+            with get_policy('ssllabs').attempt() as outcome:
+                with get_limiter('ssllabs').slot(timeout=self.max_interval):
+                    response = http_request('ssllabs', 'GET', f"{self.api_base}/analyze?{urlencode(params)}")
+                outcome.failed = is_failure_status(response.status_code)
+        except CircuitOpenError as e:
+            return self._finish(assessment, ERROR, error=str(e), degraded=True)
+        except (requests.RequestException, RateLimitTimeout) as e:
+            logger.warning("SSL Labs poll for %s failed, backing off: %s", assessment.host, e)
+            return self._reschedule(assessment, self._backoff_interval(assessment))
+
+        if response.status_code in BACKOFF_HTTP_STATUSES:
+            return self._reschedule(assessment, self._backoff_interval(assessment))
+        if response.status_code >= 400:
+            return self._finish(assessment, ERROR, error=f"HTTP {response.status_code} from SSL Labs")
+        try:
+            data = response.json()
+        except ValueError as e:
+            return self._finish(assessment, ERROR, error=f"Invalid response from SSL Labs: {e}")
+        if not isinstance(data, dict):
+            return self._finish(assessment, ERROR, error=(
+                f"Invalid response from SSL Labs: expected an object, got {type(data).__name__}"
+            ))
+
+        assessment.polls += 1
+        status = data.get('status')
+        if status == READY:
+            return self._finish(assessment, READY, data=data)
+        if status == ERROR:
+            return self._finish(assessment, ERROR, data=data, error=data.get('statusMessage') or 'Assessment failed')
+        self._reschedule(assessment, self._next_interval(assessment, data))
+
+    def _next_interval(self, assessment, data):
+        if data.get('status') == 'DNS':
+            return self.min_interval
+        endpoints = data.get('endpoints')
+        etas = [
+            endpoint['eta'] for endpoint in (endpoints if isinstance(endpoints, list) else [])
+            if isinstance(endpoint, dict) and isinstance(endpoint.get('eta'), (int, float)) and endpoint['eta'] > 0
+        ]
+        if etas:
+            return min(max(min(etas), self.min_interval), self.max_interval)
+        return self._backoff_interval(assessment)
+
+    def _backoff_interval(self, assessment):
+        if assessment.interval is None:
+            return self.min_interval
+        return min(assessment.interval * 2, self.max_interval)
+
+    def _finish(self, assessment, state, data=None, error=None, degraded=False):
+        assessment.state = state
+        assessment.data = data
+        assessment.error = error
+        assessment.degraded = degraded
+        assessment.finished = time.monotonic()
+        assessment.finish()
+        logger.info("SSL Labs assessment of %s finished as %s after %ss (%d polls)",
+                    assessment.host, state, assessment.elapsed(), assessment.polls)
+
+    def _evict_finished(self):
+        cutoff = time.monotonic() - self.retention
+        for host, assessment in list(self._assessments.items()):
+            if assessment.finished is not None and assessment.finished < cutoff:
+                del self._assessments[host]
+
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+def get_ssllabs_tracker():
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = SSLLabsTracker(
+                api_base=getattr(settings, 'UIUX_SSLLABS_API', DEFAULT_API_BASE),
+                min_interval=getattr(settings, 'UIUX_SSLLABS_POLL_MIN', 5),
+                max_interval=getattr(settings, 'UIUX_SSLLABS_POLL_MAX', 60),
+                max_duration=getattr(settings, 'UIUX_SSLLABS_MAX_DURATION', 300),
+            )
+        return _tracker
@@ -0,0 +1,271 @@
+import asyncio
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
+
+from .clients import http_request, async_http_request
+
+try:
+    from lxml import etree, html as lxml_html
+except ImportError:  # lxml is optional; fall back to the stdlib parser
+    lxml_html = None
+
+MAX_LISTED_ITEMS = 10
+HEADING_TAGS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+
+
+# Local checks computed from the page HTML alone, in a single pass over the
+# document: no PageSpeed/WAVE call, so results are instant and free. The score
+# fields mirror the matching PageSpeed audits (1 = pass, 0 = fail). A document
+# that cannot be parsed (e.g. an empty body) gets an explicit unparseable
+# result instead of findings about everything it seems to lack.
+def analyze_static_html(url, html_text):
+    collector = _Collector(url)
+    try:
+        if not html_text.strip():
+            raise ValueError("Document is empty")
+        parser = _feed_lxml(collector, html_text) if lxml_html is not None else _feed_stdlib(collector, html_text)
+    except ValueError as e:
+        return unparseable_report('lxml' if lxml_html is not None else 'html.parser', str(e))
+    return collector.report(parser)
+
+
+def unparseable_report(parser, reason):
+    return {
+        'parser': parser,
+        'unparseable': True,
+        'parse_error': reason,
+        'mobile_friendly': None,
+        'render_blocking_resources': None,
+        'uses_rel_preconnect': None,
+        'checks': {},
+        'recommendations': [],
+    }
+
+
+def fetch_and_analyze(url):
+    try:
+        response = http_request('site', 'GET', url)
+    except Exception as e:
+        return {'error': f"Could not fetch page: {str(e)}"}
+    return analyze_response(url, response.status_code, response.headers, response.url, response.text)
+
+
+# Async variant for the ASGI views; the parse runs in a worker thread so large
+# pages do not stall the event loop
+async def afetch_and_analyze(url):
+    try:
+        response = await async_http_request('site', 'GET', url)
+    except Exception as e:
+        return {'error': f"Could not fetch page: {str(e)}"}
+    return await asyncio.to_thread(
+        analyze_response, url, response.status_code, response.headers, str(response.url), response.text
+    )
+
+
+def analyze_response(url, status_code, headers, final_url, text):
+    content_type = headers.get('Content-Type', '')
+    if status_code >= 400 or 'html' not in content_type:
+        return {
+            'status_code': status_code,
+            'content_type': content_type,
+            'is_html_page': False,
+            'recommendations': [],
+        }
+
+    result = analyze_static_html(final_url or url, text)
+    result.update({'status_code': status_code, 'content_type': content_type, 'is_html_page': True})
+    return result
+
+
+# Reason to skip the paid PageSpeed/WAVE analysis for a page, or None. Only
+# definite answers count (gone, or not an HTML document); other fetch errors
+# may just mean the site blocks our client, so the remote analyzers still run.
+def remote_analysis_skip_reason(static_result):
+    if not static_result or 'error' in static_result:
+        return None
+    status_code = static_result.get('status_code')
+    if status_code in (404, 410):
+        return f"Page returned HTTP {status_code}"
+    if status_code is not None and status_code < 400 and not static_result.get('is_html_page', True):
+        return f"Page is not an HTML document ({static_result.get('content_type') or 'unknown type'})"
+    return None
+
+
+def _feed_lxml(collector, html_text):
+    # The text is already decoded: parse its UTF-8 bytes as UTF-8 whatever the
+    # page's <meta charset> says (lxml refuses str input with an XML encoding
+    # declaration, so the bytes are what gets parsed)
+    parser = lxml_html.HTMLParser(encoding='utf-8')
+    try:
+        document = lxml_html.document_fromstring(html_text.encode('utf-8'), parser=parser)
+    except etree.ParserError as e:
+        raise ValueError(str(e)) from e
+    for event, element in etree.iterwalk(document, events=('start', 'end')):
+        if not isinstance(element.tag, str):
+            continue
+        if event == 'start':
+            collector.start(element.tag.lower(), element.attrib, element.text)
+        else:
+            collector.end(element.tag.lower())
+    return 'lxml'
+
+
+def _feed_stdlib(collector, html_text):
+    _StdlibAdapter(collector).feed(html_text)
+    return 'html.parser'
+
+
+class _StdlibAdapter(HTMLParser):
+    def __init__(self, collector):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag, {name: value or '' for name, value in attrs}, None)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        self.collector.end(tag)
+
+    def handle_endtag(self, tag):
+        self.collector.end(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+
+class _Collector:
+    def __init__(self, url):
+        self.url = url
+        self.origin = _origin(url)
+        self.in_head = False
+        self.in_title = False
+        self.lang = None
+        self.title = ''
+        self.viewport = None
+        self.images = 0
+        self.images_missing_alt = []
+        self.blocking_scripts = []
+        self.blocking_styles = []
+        self.hinted_origins = set()
+        self.third_party_origins = []
+        self.headings = []
+
+    def start(self, tag, attrs, text):
+        if tag == 'html':
+            self.lang = (attrs.get('lang') or '').strip() or None
+        elif tag == 'head':
+            self.in_head = True
+        elif tag == 'title':
+            self.in_title = True
+            if text:
+                self.title += text
+        elif tag == 'meta' and (attrs.get('name') or '').lower() == 'viewport':
+            self.viewport = attrs.get('content') or ''
+        elif tag == 'img':
+            self.images += 1
+            if 'alt' not in attrs:
+                self.images_missing_alt.append(attrs.get('src') or '(inline image)')
+            self._note_origin(attrs.get('src'))
+        elif tag == 'script':
+            src = attrs.get('src')
+            if src:
+                self._note_origin(src)
+                is_module = (attrs.get('type') or '').lower() == 'module'
+                if self.in_head and 'async' not in attrs and 'defer' not in attrs and not is_module:
+                    self.blocking_scripts.append(src)
+        elif tag == 'link':
+            rel = (attrs.get('rel') or '').lower().split()
+            href = attrs.get('href')
+            if 'preconnect' in rel or 'dns-prefetch' in rel:
+                origin = _origin(urljoin(self.url, href or ''))
+                if origin:
+                    self.hinted_origins.add(origin)
+            elif 'stylesheet' in rel:
+                self._note_origin(href)
+                media = (attrs.get('media') or 'all').lower()
+                if self.in_head and media in ('all', 'screen', '') and 'disabled' not in attrs:
+                    self.blocking_styles.append(href)
+        elif tag in HEADING_TAGS:
+            self.headings.append(HEADING_TAGS[tag])
+
+    def end(self, tag):
+        if tag == 'head':
+            self.in_head = False
+        elif tag == 'title':
+            self.in_title = False
+
+    def data(self, data):
+        if self.in_title:
+            self.title += data
+
+    def _note_origin(self, resource_url):
+        if not resource_url:
+            return
+        origin = _origin(urljoin(self.url, resource_url))
+        if origin and origin != self.origin and origin not in self.third_party_origins:
+            self.third_party_origins.append(origin)
+
+    def report(self, parser):
+        viewport_ok = self.viewport is not None and 'width=' in self.viewport.replace(' ', '')
+        unhinted = [origin for origin in self.third_party_origins if origin not in self.hinted_origins]
+        h1_count = self.headings.count(1)
+        skipped_levels = [
+            f"h{previous} -> h{current}"
+            for previous, current in zip(self.headings, self.headings[1:])
+            if current > previous + 1
+        ]
+        blocking = self.blocking_scripts + self.blocking_styles
+
+        recommendations = []
+        if not viewport_ok:
+            recommendations.append("Page is not mobile-friendly. Add a meta viewport (width=device-width) and use responsive design.")
+        if not self.lang:
+            recommendations.append("Declare the page language with a lang attribute on <html>.")
+        if not self.title.strip():
+            recommendations.append("Add a descriptive <title> to the page.")
+        if self.images_missing_alt:
+            recommendations.append(f"Add alt text to {len(self.images_missing_alt)} image(s) missing an alt attribute.")
+        if blocking:
+            recommendations.append(
+                f"Defer or async {len(self.blocking_scripts)} script(s) and inline or defer "
+                f"{len(self.blocking_styles)} stylesheet(s) that block rendering in <head>."
+            )
+        if unhinted:
+            recommendations.append(
+                f"Consider preconnect or dns-prefetch hints for {len(unhinted)} third-party origin(s) such as {unhinted[0]}."
+            )
+        if h1_count == 0:
+            recommendations.append("Add a single <h1> heading describing the page.")
+        elif h1_count > 1:
+            recommendations.append(f"Use a single <h1> per page ({h1_count} found).")
+        if skipped_levels:
+            recommendations.append(f"Avoid skipping heading levels ({', '.join(skipped_levels[:3])}).")
+
+        return {
+            'parser': parser,
+            'mobile_friendly': 1 if viewport_ok else 0,
+            'render_blocking_resources': 0 if blocking else 1,
+            'uses_rel_preconnect': 0 if unhinted else 1,
+            'checks': {
+                'lang': self.lang,
+                'title': self.title.strip() or None,
+                'viewport': self.viewport,
+                'images': self.images,
+                'images_missing_alt': len(self.images_missing_alt),
+                'images_missing_alt_sample': self.images_missing_alt[:MAX_LISTED_ITEMS],
+                'render_blocking_scripts': self.blocking_scripts[:MAX_LISTED_ITEMS],
+                'render_blocking_stylesheets': self.blocking_styles[:MAX_LISTED_ITEMS],
+                'origins_without_preconnect': unhinted[:MAX_LISTED_ITEMS],
+                'h1_count': h1_count,
+                'skipped_heading_levels': skipped_levels[:MAX_LISTED_ITEMS],
+            },
+            'recommendations': recommendations,
+        }
+
+
+def _origin(url):
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.netloc:
+        return None
+    return f"{parts.scheme}://{parts.netloc.lower()}"
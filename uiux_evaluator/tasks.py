@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .jobs import execute_scan_job
+
+
+# Runs full-scan and batch jobs alike (the name predates batch jobs)
+@shared_task(ignore_result=True)
+def run_full_scan_job(job_id):
+    execute_scan_job(job_id)
@@ -0,0 +1,37 @@
+from django.test import override_settings
+
+from ..benchmark import FakeUpstreams, StaticSite, DEFAULT_LATENCY, settings_overrides, reset_shared_clients
+from ..cache import get_analyzer_cache
+
+NO_LATENCY = {service: 0 for service in DEFAULT_LATENCY}
+
+
+# Runs tests against the benchmark's fake upstreams and static site
+# (benchmark.py) instead of the real APIs. Fakes answer without delay unless a
+# test asks for latency; raw payload archiving is off unless a test turns it on.
+class FakeUpstreamsMixin:
+    def setUp(self):
+        super().setUp()
+        get_analyzer_cache().clear()
+        self.addCleanup(get_analyzer_cache().clear)
+
+    def start_upstreams(self, latency=None, **options):
+        upstreams = FakeUpstreams(latency=dict(NO_LATENCY, **(latency or {})), seed=0, **options).start()
+        self.addCleanup(upstreams.stop)
+        return upstreams
+
+    def start_site(self, pages=5, links_per_page=4, page_kb=1, **options):
+        site = StaticSite(pages=pages, links_per_page=links_per_page, page_kb=page_kb, **options).start()
+        self.addCleanup(site.stop)
+        return site
+
+    # Point the analyzers at upstreams for the rest of the test, with fresh
+    # shared clients (sessions, limiters, breakers, SSL Labs tracker)
+    def use_upstreams(self, upstreams, **overrides):
+        options = dict(settings_overrides(upstreams), UIUX_ARCHIVE_RAW_PAYLOADS=False)
+        options.update(overrides)
+        override = override_settings(**options)
+        self.addCleanup(reset_shared_clients)
+        override.enable()
+        self.addCleanup(override.disable)
+        reset_shared_clients()
@@ -0,0 +1,50 @@
+from django.test import SimpleTestCase
+
+from ..aggregation import SiteAggregator, parse_duration_ms, percentile
+
+
+def page_report(url, recommendations, overall_score=None, largest_contentful_paint=None):
+    report = {
+        'url': url,
+        'all_results': {},
+        'final_recommendation': {'summary': 'UI/UX recommendations categorized by service.',
+                                 'categories': {'pagespeed': recommendations}},
+    }
+    if overall_score is not None:
+        report['all_results']['pagespeed'] = {
+            'mobile': {'overall_score': overall_score, 'largest_contentful_paint': largest_contentful_paint},
+        }
+    return report
+
+
+class SiteAggregatorTests(SimpleTestCase):
+    def test_recommendations_are_interned_across_pages(self):
+        aggregator = SiteAggregator()
+        first = aggregator.add(0, page_report('https://example.com/', ['Compress images.', 'Minify CSS.']))
+        second = aggregator.add(1, page_report('https://example.com/a', ['Compress images.']))
+        aggregator.add(2, {'url': 'https://example.com/b', 'error': 'Timed out'})
+
+        self.assertEqual(first['recommendations'], {'pagespeed': [0, 1]})
+        self.assertEqual(second['recommendations'], {'pagespeed': [0]})
+        summary = aggregator.summary()
+        self.assertEqual((summary['pages_analyzed'], summary['pages_failed']), (3, 1))
+        self.assertEqual([(entry['text'], entry['count'], entry['pages']) for entry in summary['recommendations']],
+                         [('Compress images.', 2, [0, 1]), ('Minify CSS.', 1, [0])])
+        self.assertEqual(aggregator.final_recommendation()['categories'],
+                         {'pagespeed': ['Compress images.', 'Minify CSS.']})
+
+    def test_score_distributions(self):
+        aggregator = SiteAggregator()
+        for index, (score, lcp) in enumerate([(90, '1.2\xa0s'), (70, '850 ms'), (80, 'N/A')]):
+            aggregator.add(index, page_report(f"https://example.com/{index}", [], score, lcp))
+        mobile = aggregator.summary()['distributions']['pagespeed_mobile']
+        self.assertEqual(mobile['overall_score'], {'count': 3, 'min': 70, 'median': 80, 'p90': 90})
+        self.assertEqual(mobile['largest_contentful_paint_ms'], {'count': 2, 'min': 850, 'median': 1025.0, 'p90': 1200})
+
+    def test_empty_scan(self):
+        self.assertEqual(SiteAggregator().final_recommendation()['categories'], {})
+
+    def test_helpers(self):
+        self.assertEqual(parse_duration_ms('1,250 ms'), 1250)
+        self.assertIsNone(parse_duration_ms(None))
+        self.assertEqual(percentile([1, 2, 3, 4, 5, 6, 7, 8, 9, 10], 90), 9)
@@ -0,0 +1,109 @@
+import json
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..archive import archive_payload, load_json, flush_archive, get_archive_writer, store_payloads
+from ..models import RawPayload, Scan, ScanJob, ScanJobPage
+from ..reports import store_scan
+
+
+def page_report(mobile_digest, desktop_digest=None):
+    return {
+        'url': 'https://example.com/',
+        'all_results': {'pagespeed': {'mobile': {'raw_payload': mobile_digest},
+                                      'desktop': {'raw_payload': desktop_digest}}},
+        'final_recommendation': {},
+    }
+
+
+@override_settings(UIUX_ARCHIVE_RAW_PAYLOADS=True, UIUX_ARCHIVE_WRITE_BEHIND=False,
+                   UIUX_RAW_PAYLOAD_RETENTION_DAYS=30, UIUX_RAW_PAYLOAD_ORPHAN_GRACE=3600)
+class RawPayloadArchiveTests(TestCase):
+    def archive(self, name, age=timedelta(days=2)):
+        digest = archive_payload('pagespeed', json.dumps({'name': name}).encode())
+        RawPayload.objects.filter(pk=digest).update(created_at=timezone.now() - age)
+        return digest
+
+    def prune(self, *args):
+        out = StringIO()
+        call_command('prune_raw_payloads', *args, stdout=out)
+        return out.getvalue()
+
+    def test_round_trips_and_deduplicates(self):
+        digest = self.archive('report')
+        self.assertEqual(archive_payload('pagespeed', json.dumps({'name': 'report'}).encode()), digest)
+        self.assertEqual(RawPayload.objects.count(), 1)
+        self.assertEqual(load_json(digest), {'name': 'report'})
+
+    def test_prunes_expired_and_unreferenced_payloads(self):
+        mobile, desktop, job_page = self.archive('mobile'), self.archive('desktop'), self.archive('job')
+        expired = self.archive('expired', age=timedelta(days=31))
+        orphan = self.archive('orphan')
+        recent_orphan = self.archive('recent', age=timedelta(minutes=5))
+        store_scan(Scan.KIND_SINGLE, 'https://example.com/', {}, [page_report(mobile, desktop), page_report(expired)])
+        job = ScanJob.objects.create(base_url='https://example.com/')
+        ScanJobPage.objects.create(job=job, index=0, url='https://example.com/', report=page_report(job_page))
+
+        self.assertIn("Deleted 2 raw payload(s).", self.prune())
+        self.assertEqual(set(RawPayload.objects.values_list('digest', flat=True)),
+                         {mobile, desktop, job_page, recent_orphan})
+        self.assertFalse(RawPayload.objects.filter(pk__in=[expired, orphan]).exists())
+
+    def test_archiving_again_refreshes_the_retention_clock(self):
+        digest = self.archive('report', age=timedelta(days=31))
+        archive_payload('pagespeed', json.dumps({'name': 'report'}).encode())
+        store_scan(Scan.KIND_SINGLE, 'https://example.com/', {}, [page_report(digest)])
+        self.prune()
+        self.assertTrue(RawPayload.objects.filter(pk=digest).exists())
+
+    def test_retention_can_be_disabled(self):
+        digest = self.archive('report', age=timedelta(days=365))
+        store_scan(Scan.KIND_SINGLE, 'https://example.com/', {}, [page_report(digest)])
+        self.prune('--retention-days', '0')
+        self.assertTrue(RawPayload.objects.filter(pk=digest).exists())
+        self.prune()
+        self.assertFalse(RawPayload.objects.filter(pk=digest).exists())
+
+
+@override_settings(UIUX_ARCHIVE_RAW_PAYLOADS=True, UIUX_ARCHIVE_WRITE_BEHIND=True)
+class ArchiveWriterTests(TransactionTestCase):
+    # Hold the background writer up until the returned event is set
+    def hold_writer(self):
+        release = threading.Event()
+
+        def held_store(payloads):
+            release.wait(5)
+            return store_payloads(payloads)
+
+        patcher = mock.patch('uiux_evaluator.archive.store_payloads', side_effect=held_store)
+        self.addCleanup(patcher.stop)
+        self.addCleanup(release.set)
+        return release, patcher.start()
+
+    def test_writes_in_the_background(self):
+        release, store = self.hold_writer()
+        digests = [archive_payload('pagespeed', json.dumps({'page': index}).encode()) for index in range(3)]
+        self.assertEqual(archive_payload('pagespeed', json.dumps({'page': 0}).encode()), digests[0])
+        self.assertFalse(RawPayload.objects.exists())
+        self.assertEqual(load_json(digests[1]), {'page': 1})
+
+        release.set()
+        flush_archive()
+        self.assertEqual(set(RawPayload.objects.values_list('digest', flat=True)), set(digests))
+        self.assertLessEqual(store.call_count, 2)
+        self.assertEqual(load_json(digests[2]), {'page': 2})
+
+    def test_payload_detail_waits_for_queued_payloads(self):
+        release, store = self.hold_writer()
+        digest = archive_payload('pagespeed', json.dumps({'lighthouseResult': {}}).encode())
+        threading.Timer(0.2, release.set).start()
+        response = self.client.get(reverse('raw-payload-detail', args=[digest]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['service'], 'pagespeed')
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase, AsyncRequestFactory
+
+from ..async_views import AsyncUIUXRecommendationView, AsyncWebsiteFullScanView, AsyncBatchAnalysisView
+from ..models import Scan, ScanJob
+from ..views import UIUXRecommendationAPIView, ScanJobDetailAPIView
+from .base import FakeUpstreamsMixin
+
+ALL_SERVICES = {'is_accessibility_applied': True, 'is_pagespeed_applied': True, 'is_security_applied': True}
+
+
+# The async views are only routed under ASGI (urls.py), so they are called directly
+class AsyncViewTests(FakeUpstreamsMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.upstreams = self.start_upstreams()
+        self.use_upstreams(self.upstreams)
+        self.factory = AsyncRequestFactory()
+
+    async def call(self, view, request):
+        response = await view.as_view()(request)
+        # Django's handler renders DRF responses after the view returns
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    async def post(self, view, **data):
+        return await self.call(view, self.factory.post('/', data, content_type='application/json'))
+
+    async def test_single_page_analysis(self):
+        response = await self.post(AsyncUIUXRecommendationView, url='https://example.com/')
+        self.assertEqual(response.status_code, 200)
+        payload = json.loads(response.content)
+        self.assertEqual(payload['all_results']['security']['ssllabs_grade'], 'A')
+        self.assertIn('mobile', payload['all_results']['pagespeed'])
+        accessibility = payload['all_results']['accessibility']
+        self.assertTrue(accessibility['summary'].startswith('Summary'))
+        self.assertIn('error', accessibility['counts'])
+        self.assertEqual(await Scan.objects.filter(pk=payload['scan_id']).acount(), 1)
+        self.assertEqual(self.upstreams.requests, {'pagespeed': 2, 'wave': 1, 'ssllabs': 1, 'llm': 1})
+
+    async def test_validation_errors_use_the_drf_contract(self):
+        response = await self.post(AsyncUIUXRecommendationView, url='not a url')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('url', json.loads(response.content))
+
+        response = await self.call(AsyncUIUXRecommendationView, self.factory.post('/', 'url=', content_type='text/plain'))
+        self.assertEqual(response.status_code, 415)
+
+        response = await self.call(AsyncWebsiteFullScanView, self.factory.get('/'))
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(json.loads(response.content), {'detail': 'Method "GET" not allowed.'})
+
+    async def test_errors_match_the_sync_views(self):
+        data = {'url': 'not a url', 'deadline_seconds': 0}
+        request = self.factory.post('/', data, content_type='application/json')
+        sync_response = await sync_to_async(UIUXRecommendationAPIView.as_view())(request)
+        sync_response.render()
+        response = await self.post(AsyncUIUXRecommendationView, **data)
+        self.assertEqual(response.status_code, sync_response.status_code)
+        self.assertEqual(response.content, sync_response.content)
+
+    async def test_full_scan(self):
+        site = self.start_site(pages=5)
+        response = await self.post(AsyncWebsiteFullScanView, url=site.base_url, **ALL_SERVICES)
+        self.assertEqual(response.status_code, 200)
+        payload = json.loads(response.content)
+        self.assertEqual([page['url'] for page in payload['results']], site.page_urls())
+        self.assertEqual(self.upstreams.requests['ssllabs'], 1)
+
+        response = await self.post(AsyncWebsiteFullScanView, url=site.base_url, incremental=True, **ALL_SERVICES)
+        response = await self.post(AsyncWebsiteFullScanView, url=site.base_url, incremental=True, **ALL_SERVICES)
+        self.assertEqual(json.loads(response.content)['total_pages_reused'], 5)
+
+    async def test_streamed_full_scan(self):
+        site = self.start_site(pages=5)
+        response = await self.post(AsyncWebsiteFullScanView, url=site.base_url, stream='ndjson', **ALL_SERVICES)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        events = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(sum(1 for event in events if event['event'] == 'page'), 5)
+        self.assertEqual(events[-1]['event'], 'summary')
+        self.assertEqual(events[-1]['total_pages_scanned'], 5)
+
+    async def test_streamed_incremental_scan_reuses_unchanged_pages(self):
+        site = self.start_site(pages=5)
+        for _ in range(2):
+            response = await self.post(AsyncWebsiteFullScanView, url=site.base_url, stream='ndjson', incremental=True,
+                                       **ALL_SERVICES)
+            body = b''.join([chunk async for chunk in response.streaming_content])
+        summary = json.loads(body.splitlines()[-1])
+        self.assertEqual(summary['total_pages_reused'], 5)
+
+
+class AsyncBatchTests(FakeUpstreamsMixin, TestCase):
+    URLS = ['https://example.com/', 'https://example.org/a', 'https://example.com/b?utm_source=mail',
+            'https://example.com/b', 'https://example.org/c', 'https://example.com/d']
+
+    def setUp(self):
+        super().setUp()
+        self.upstreams = self.start_upstreams(latency={'pagespeed': 0.2})
+        self.use_upstreams(self.upstreams)
+        self.factory = AsyncRequestFactory()
+
+    async def batch(self, **data):
+        request = self.factory.post('/', dict(ALL_SERVICES, urls=self.URLS, **data), content_type='application/json')
+        response = await AsyncBatchAnalysisView.as_view()(request)
+        response.render()
+        self.assertEqual(response.status_code, 200, response.content)
+        return json.loads(response.content)
+
+    async def test_batch(self):
+        payload = await self.batch(max_workers=4)
+        self.assertEqual((payload['total_urls'], payload['unique_urls']), (6, 5))
+        self.assertEqual(payload['results'][2]['submitted_urls'], self.URLS[2:4])
+        self.assertTrue(all(result['scan_id'] for result in payload['results']))
+        # One SSL Labs assessment per host
+        self.assertEqual(self.upstreams.requests['ssllabs'], 2)
+
+    # Django runs sync views (job polling, history, metrics) on the one
+    # thread-sensitive executor thread; a running batch must not hold it
+    async def test_polling_is_served_while_a_batch_runs(self):
+        job = await ScanJob.objects.acreate(base_url='https://example.com/')
+        poll_view = sync_to_async(ScanJobDetailAPIView.as_view())
+        batch = asyncio.ensure_future(self.batch(max_workers=1))
+
+        poll_times = []
+        while not batch.done():
+            started = time.monotonic()
+            response = await poll_view(self.factory.get('/'), pk=job.pk)
+            poll_times.append(time.monotonic() - started)
+            self.assertEqual(response.status_code, 200)
+            await asyncio.sleep(0.05)
+        await batch
+
+        self.assertGreater(len(poll_times), 5)
+        self.assertLess(max(poll_times), 0.5)
@@ -0,0 +1,29 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Scan
+from ..views import BatchAnalysisAPIView, UIUXRecommendationAPIView
+
+PAGESPEED_RESULT = {'mobile': {'overall_score': 95}, 'desktop': {'overall_score': 99}, 'recommendations': []}
+ONLY_PAGESPEED = {'is_pagespeed_applied': True, 'is_accessibility_applied': False, 'is_security_applied': False}
+
+
+@mock.patch.object(UIUXRecommendationAPIView, 'analyze_pagespeed', return_value=PAGESPEED_RESULT)
+class BatchAnalysisTests(TestCase):
+    def test_deduplicates_and_stores_each_url(self, analyze_pagespeed):
+        urls = ['https://example.com/a', 'https://Example.com/a/?utm_source=mail', 'https://example.org/']
+        response = self.client.post(reverse('batch-analysis'), {'urls': urls, **ONLY_PAGESPEED},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        payload = response.json()
+        self.assertEqual((payload['total_urls'], payload['unique_urls']), (3, 2))
+        self.assertEqual([result['submitted_urls'] for result in payload['results']], [urls[:2], urls[2:]])
+        self.assertEqual(analyze_pagespeed.call_count, 2)
+        self.assertEqual(Scan.objects.filter(kind=Scan.KIND_SINGLE).count(), 2)
+
+    def test_round_robins_across_hosts(self, analyze_pagespeed):
+        urls = ['https://a.com/1', 'https://a.com/2', 'https://a.com/3', 'https://b.com/1', 'https://c.com/1']
+        self.assertEqual(BatchAnalysisAPIView().interleave_by_host(urls),
+                         ['https://a.com/1', 'https://b.com/1', 'https://c.com/1', 'https://a.com/2', 'https://a.com/3'])
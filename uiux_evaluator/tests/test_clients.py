@@ -0,0 +1,53 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.test import SimpleTestCase, override_settings
+
+from .. import clients
+from ..clients import connection_stats, get_timeout, http_request
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class SessionPoolTests(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _KeepAliveHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.url = f"http://127.0.0.1:{server.server_address[1]}/"
+        self.addCleanup(self.close_session)
+
+    def close_session(self):
+        with clients._sessions_lock:
+            session = clients._sessions.pop('test', None)
+        if session is not None:
+            session.close()
+
+    def test_sequential_requests_reuse_one_connection(self):
+        for _ in range(5):
+            self.assertEqual(http_request('test', 'GET', self.url).json(), {'ok': True})
+        self.assertEqual(connection_stats()['test'], {
+            'requests': 5, 'connections_opened': 1, 'connections_reused': 4, 'reuse_ratio': 0.8,
+        })
+
+    def test_timeouts_per_service(self):
+        self.assertEqual(get_timeout('pagespeed'), clients.DEFAULT_TIMEOUTS['pagespeed'])
+        self.assertEqual(get_timeout('test'), clients.DEFAULT_TIMEOUT)
+        with override_settings(UIUX_HTTP_TIMEOUTS={'test': (1, 2)}):
+            self.assertEqual(get_timeout('test'), (1, 2))
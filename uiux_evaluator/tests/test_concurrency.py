@@ -0,0 +1,141 @@
+import asyncio
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from ..concurrency import run_parallel, map_bounded, SingleFlight, arun_parallel, amap_bounded, AsyncSingleFlight
+
+
+class RunParallelTests(SimpleTestCase):
+    def test_collects_results_errors_and_timeouts(self):
+        def fail():
+            raise ValueError('boom')
+
+        results, timings = run_parallel({
+            'fast': lambda: 'done',
+            'broken': fail,
+            'slow': lambda: time.sleep(1),
+        }, deadline=0.2)
+        self.assertEqual(results['fast'], 'done')
+        self.assertEqual(results['broken'], {'error': 'broken failed: boom'})
+        self.assertTrue(results['slow']['timed_out'])
+        self.assertEqual({name: timing['status'] for name, timing in timings.items()},
+                         {'fast': 'ok', 'broken': 'error', 'slow': 'timeout'})
+
+    def test_async_counterpart_has_the_same_shape(self):
+        async def slow():
+            await asyncio.sleep(1)
+
+        async def fast():
+            return 'done'
+
+        results, timings = asyncio.run(arun_parallel({'fast': fast, 'slow': slow}, deadline=0.1))
+        self.assertEqual(results['fast'], 'done')
+        self.assertTrue(results['slow']['timed_out'])
+        self.assertEqual(timings['slow']['status'], 'timeout')
+
+
+class MapBoundedTests(SimpleTestCase):
+    def test_bounds_calls_in_flight(self):
+        in_flight = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def work(item):
+            nonlocal in_flight, peak
+            with lock:
+                in_flight += 1
+                peak = max(peak, in_flight)
+            time.sleep(0.02)
+            with lock:
+                in_flight -= 1
+            return item * 2
+
+        results = {index: result for index, _, result in map_bounded(work, iter(range(12)), 3)}
+        self.assertEqual(results, {index: index * 2 for index in range(12)})
+        self.assertLessEqual(peak, 3)
+
+    def test_reraises_source_errors(self):
+        def source():
+            yield 1
+            raise RuntimeError('crawl failed')
+
+        with self.assertRaisesMessage(RuntimeError, 'crawl failed'):
+            list(map_bounded(lambda item: item, source(), 2))
+
+    def test_async_counterpart_yields_every_item(self):
+        async def source():
+            for item in range(6):
+                yield item
+
+        async def work(item):
+            await asyncio.sleep(0.01)
+            return item + 1
+
+        async def collect():
+            return {index: result async for index, _, result in amap_bounded(work, source(), 2)}
+
+        self.assertEqual(asyncio.run(collect()), {index: index + 1 for index in range(6)})
+
+
+class SingleFlightTests(SimpleTestCase):
+    def test_concurrent_calls_share_one_execution(self):
+        group = SingleFlight()
+        calls = 0
+        started = threading.Event()
+        release = threading.Event()
+
+        def compute():
+            nonlocal calls
+            calls += 1
+            started.set()
+            release.wait(5)
+            return 'grade A'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(group.do('example.com', compute)))
+                   for _ in range(8)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(calls, 1)
+        self.assertEqual(results, ['grade A'] * 8)
+
+    def test_memoize_keeps_results_but_not_errors(self):
+        group = SingleFlight(memoize=True)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            if len(calls) == 1:
+                raise ValueError('upstream down')
+            return len(calls)
+
+        with self.assertRaises(ValueError):
+            group.do('key', compute)
+        self.assertEqual(group.do('key', compute), 2)
+        self.assertEqual(group.do('key', compute), 2)
+        self.assertEqual(len(calls), 2)
+
+    def test_async_calls_share_one_execution(self):
+        group = AsyncSingleFlight()
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.02)
+            return 'grade A'
+
+        async def run():
+            return await asyncio.gather(*(group.do('example.com', compute) for _ in range(8)))
+
+        self.assertEqual(asyncio.run(run()), ['grade A'] * 8)
+        self.assertEqual(calls, 1)
@@ -0,0 +1,127 @@
+import os
+from urllib.request import urlopen
+
+from django.test import SimpleTestCase
+
+from .. import browser
+from ..browser import BrowserPool
+from ..crawler import SiteCrawler
+from ..urlutils import canonical_page_url
+from .base import FakeUpstreamsMixin
+
+
+# Stands in for a Chrome WebDriver: "renders" a page by downloading it
+class FakeDriver:
+    def __init__(self):
+        self.page_source = ''
+        self.loads = 0
+        self.healthy = True
+        self.closed = False
+
+    def get(self, url):
+        with urlopen(url, timeout=5) as response:
+            self.page_source = response.read().decode('utf-8')
+        self.loads += 1
+
+    def execute_script(self, script):
+        if not self.healthy:
+            raise RuntimeError('chrome not reachable')
+        if 'readyState' in script:
+            return 'complete'
+        if 'getEntriesByType' in script:
+            return 2
+        return 1
+
+    def quit(self):
+        self.closed = True
+
+
+class SiteCrawlerTests(FakeUpstreamsMixin, SimpleTestCase):
+    def crawl(self, site, **options):
+        return list(SiteCrawler(site.base_url, render=False, **options).crawl())
+
+    def test_follows_links_breadth_first(self):
+        site = self.start_site(pages=13, links_per_page=3)
+        urls = site.page_urls()
+        self.assertEqual(self.crawl(site, max_depth=1), urls[:4])
+        self.assertEqual(self.crawl(site, max_depth=2), urls)
+        self.assertEqual(self.crawl(site, max_depth=2, max_pages=6), urls[:6])
+
+    def test_sitemap_entries_are_one_hop_from_the_base_page(self):
+        site = self.start_site(pages=13, links_per_page=3, sitemap=True)
+        self.assertEqual(sorted(self.crawl(site, max_depth=1)), sorted(site.page_urls()))
+        self.assertEqual(self.crawl(site, max_depth=0), [site.base_url])
+
+    def test_sitemap_entities_are_not_expanded(self):
+        site = self.start_site(pages=3, sitemap=True)
+        with open(os.path.join(site.directory, 'sitemap.xml'), 'w', encoding='utf-8') as f:
+            f.write(f'<?xml version="1.0"?>\n<!DOCTYPE urlset [<!ENTITY page "{site.base_url}page-1.html">'
+                    f'<!ENTITY secret SYSTEM "file:///etc/hostname">]>\n'
+                    f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                    f'<url><loc>&page;</loc></url><url><loc>&secret;</loc></url>'
+                    f'<url><loc>{site.base_url}page-2.html</loc></url></urlset>\n')
+        self.assertEqual(list(SiteCrawler(site.base_url, render=False).sitemap_urls()),
+                         [f"{site.base_url}page-2.html"])
+
+    def test_internal_urls_are_matched_on_canonical_host_and_port(self):
+        crawler = SiteCrawler('https://Example.com/', render=False, respect_robots=False)
+        self.assertEqual(crawler.to_internal_url('https://example.com:443/About/'), 'https://example.com/About')
+        self.assertEqual(crawler.to_internal_url('HTTPS://EXAMPLE.COM/contact?utm_source=x'), 'https://example.com/contact')
+        for url in ('https://example.com:8443/', 'https://example.com:99999/', 'https://other.com/',
+                    'mailto:team@example.com', 'https://example.com/logo.png'):
+            with self.subTest(url=url):
+                self.assertIsNone(crawler.to_internal_url(url))
+
+    def test_ref_parameters_are_kept(self):
+        self.assertEqual(canonical_page_url('https://example.com/docs?ref=v2&utm_medium=email'),
+                         'https://example.com/docs?ref=v2')
+
+
+class BrowserPoolTests(FakeUpstreamsMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.drivers = []
+
+    def factory(self):
+        driver = FakeDriver()
+        self.drivers.append(driver)
+        return driver
+
+    def test_reuses_warm_browsers_and_recycles_them(self):
+        site = self.start_site(pages=2)
+        pool = BrowserPool(size=1, max_pages=2, factory=self.factory, ready_timeout=1)
+        self.addCleanup(pool.close)
+        for _ in range(3):
+            self.assertIn('<title>Benchmark page 0</title>', pool.render(site.base_url))
+        self.assertEqual(len(self.drivers), 2)
+        self.assertTrue(self.drivers[0].closed)
+        self.assertEqual(self.drivers[0].loads, 2)
+
+    def test_replaces_unhealthy_browsers(self):
+        pool = BrowserPool(size=1, factory=self.factory)
+        self.addCleanup(pool.close)
+        with pool.lease():
+            pass
+        self.drivers[0].healthy = False
+        with pool.lease() as driver:
+            self.assertIs(driver, self.drivers[1])
+        self.assertTrue(self.drivers[0].closed)
+
+    def test_lease_times_out_when_every_browser_is_busy(self):
+        pool = BrowserPool(size=1, factory=self.factory)
+        self.addCleanup(pool.close)
+        with pool.lease():
+            with self.assertRaises(TimeoutError):
+                with pool.lease(timeout=0.05):
+                    pass
+
+    def test_rendering_crawler_uses_the_pool(self):
+        site = self.start_site(pages=5)
+        pool = BrowserPool(size=2, factory=self.factory, ready_timeout=1)
+        self.addCleanup(pool.close)
+        previous_pool, browser._pool = browser._pool, pool
+        self.addCleanup(setattr, browser, '_pool', previous_pool)
+
+        urls = list(SiteCrawler(site.base_url, max_depth=1, render=True).crawl())
+        self.assertEqual(urls, site.page_urls())
+        self.assertEqual(sum(driver.loads for driver in self.drivers), 1)
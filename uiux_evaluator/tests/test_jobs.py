@@ -0,0 +1,93 @@
+import time
+from collections import Counter
+
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from ..cache import get_analyzer_cache
+from ..jobs import execute_scan_job
+from ..models import Scan, ScanJob, ScanJobPage
+from .base import FakeUpstreamsMixin
+
+ALL_SERVICES = {'is_accessibility_applied': True, 'is_pagespeed_applied': True, 'is_security_applied': True}
+
+
+# Jobs write from worker threads, so these tests commit instead of rolling back
+class ScanJobTests(FakeUpstreamsMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.upstreams = self.start_upstreams()
+        self.site = self.start_site(pages=5)
+
+    def submit(self, backend, path='website-full-scan', **data):
+        self.use_upstreams(self.upstreams, UIUX_JOB_BACKEND=backend)
+        response = self.client.post(reverse(path), dict(data, run_async=True, **ALL_SERVICES),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 202, response.content)
+        return ScanJob.objects.get(pk=response.json()['job_id'])
+
+    def wait_for(self, job, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            payload = self.client.get(reverse('scan-job-detail', args=[job.id])).json()
+            if payload['status'] in (ScanJob.STATUS_COMPLETED, ScanJob.STATUS_FAILED):
+                return payload
+            time.sleep(0.05)
+        self.fail(f"Job {job.id} did not finish in {timeout}s")
+
+    # Puts a finished job back in the state a worker that died mid-scan leaves behind
+    def interrupt(self, job, status):
+        ScanJob.objects.filter(pk=job.pk).update(status=status, finished_at=None)
+        get_analyzer_cache().clear()
+        return Counter(self.upstreams.requests)
+
+    def requests_since(self, before):
+        return Counter(self.upstreams.requests) - before
+
+    def test_thread_backend_runs_full_scans_in_the_background(self):
+        job = self.submit('thread', url=self.site.base_url)
+        payload = self.wait_for(job)
+        self.assertEqual(payload['status'], ScanJob.STATUS_COMPLETED)
+        self.assertEqual(payload['progress'], 100.0)
+        self.assertEqual([page['url'] for page in payload['pages']], self.site.page_urls())
+        self.assertEqual(Scan.objects.get(pk=payload['scan_id']).total_pages, 5)
+
+        pages = self.client.get(reverse('scan-job-pages', args=[job.id])).json()
+        self.assertTrue(all(page['report']['all_results'] for page in pages))
+
+    def test_redelivered_full_scan_resumes(self):
+        job = self.submit('eager', url=self.site.base_url)
+        urls = self.site.page_urls()
+        before = self.interrupt(job, ScanJob.STATUS_CRAWLING)
+        # Page 3 was never analyzed, page 4 held another URL and the crawl had gone further
+        ScanJobPage.objects.filter(job=job, index=3).update(status=ScanJobPage.STATUS_PENDING, report=None)
+        ScanJobPage.objects.filter(job=job, index=4).update(url=f"{self.site.base_url}old.html")
+        ScanJobPage.objects.create(job=job, index=5, url=f"{self.site.base_url}gone.html")
+
+        job = execute_scan_job(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ScanJob.STATUS_COMPLETED, job.error)
+        self.assertEqual((job.total_pages, job.completed_pages), (5, 5))
+        self.assertEqual(list(job.pages.values_list('url', flat=True)), urls)
+        self.assertFalse(job.pages.filter(report__isnull=True).exists())
+        self.assertEqual(self.requests_since(before)['wave'], 2)
+        self.assertEqual(Scan.objects.get(job=job).total_pages, 5)
+        self.assertEqual(Scan.objects.count(), 1)
+
+    def test_redelivered_batch_job_analyzes_only_unfinished_pages(self):
+        urls = self.site.page_urls()[:3]
+        job = self.submit('eager', path='batch-analysis', urls=urls)
+        before = self.interrupt(job, ScanJob.STATUS_RUNNING)
+        ScanJobPage.objects.filter(job=job, index=1).update(status=ScanJobPage.STATUS_PENDING, report=None)
+
+        execute_scan_job(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ScanJob.STATUS_COMPLETED, job.error)
+        self.assertEqual(job.completed_pages, 3)
+        self.assertEqual(self.requests_since(before)['wave'], 1)
+
+    def test_finished_jobs_are_not_run_again(self):
+        job = self.submit('eager', url=self.site.base_url)
+        before = Counter(self.upstreams.requests)
+        execute_scan_job(job.id)
+        self.assertEqual(self.requests_since(before), Counter())
@@ -0,0 +1,67 @@
+import json
+import tracemalloc
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from ..benchmark import load_fixtures
+from ..jsonselect import loads_selected
+from ..views import UIUXRecommendationAPIView
+
+
+# A PageSpeed response with a heavy audit the summary does not read, like the
+# network-requests and screenshot audits of real Lighthouse reports
+def heavy_pagespeed_report(items=20000):
+    report = load_fixtures()['pagespeed']
+    report['lighthouseResult']['audits']['network-requests'] = {
+        'id': 'network-requests', 'score': None,
+        'details': {'type': 'table', 'items': [
+            {'url': f"https://example.com/asset-{index}.js", 'transferSize': index, 'resourceType': 'Script'}
+            for index in range(items)
+        ]},
+    }
+    return json.dumps(report).encode('utf-8')
+
+
+def peak_memory(function, *args):
+    tracemalloc.start()
+    try:
+        function(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+class LoadsSelectedTests(SimpleTestCase):
+    document = b'{"a": {"keep": [1, {"x": 2}], "drop": {"deep": [1, 2, 3]}, "n": 1}, "b": "text", "c": [1, 2]}'
+
+    def test_decodes_only_the_selected_fields(self):
+        self.assertEqual(loads_selected(self.document, {'a': {'keep': True, 'n': True}, 'c': True}),
+                         {'a': {'keep': [1, {'x': 2}], 'n': 1}, 'c': [1, 2]})
+        self.assertEqual(loads_selected(self.document, {'a': True}), {'a': json.loads(self.document)['a']})
+        self.assertEqual(loads_selected(self.document, {'missing': True}), {})
+
+    def test_non_object_values_are_decoded_whole(self):
+        self.assertEqual(loads_selected(self.document, {'b': {'x': True}, 'c': {'x': True}}), {'b': 'text', 'c': [1, 2]})
+        self.assertEqual(loads_selected(b' [1, 2] ', {'x': True}), [1, 2])
+
+    def test_rejects_invalid_json_like_json_loads(self):
+        for document in (b'{"a": 1,}', b'{"a" 1}', b'{"a": [1, }', b'{"a": 1} extra', b'', b'{"a": 1'):
+            with self.subTest(document=document), self.assertRaises(json.JSONDecodeError):
+                loads_selected(document, {'a': True})
+
+
+@override_settings(UIUX_ARCHIVE_RAW_PAYLOADS=False)
+class PageSpeedParsingTests(SimpleTestCase):
+    def test_summary_matches_a_full_decode(self):
+        content = heavy_pagespeed_report(items=10)
+        view = UIUXRecommendationAPIView()
+        with mock.patch('uiux_evaluator.views.loads_selected', lambda content, fields: json.loads(content)):
+            expected = view.parse_pagespeed(content)
+        self.assertEqual(view.parse_pagespeed(content), expected)
+        self.assertGreater(expected['overall_score'], 0)
+
+    def test_does_not_decode_the_whole_report(self):
+        content = heavy_pagespeed_report()
+        view = UIUXRecommendationAPIView()
+        self.assertLess(peak_memory(view.parse_pagespeed, content), peak_memory(json.loads, content) / 2)
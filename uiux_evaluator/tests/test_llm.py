@@ -0,0 +1,54 @@
+import asyncio
+import threading
+
+from django.test import SimpleTestCase
+
+from ..llm import LLMClient, LLMError, memoized_summary
+from ..views import UIUXRecommendationAPIView
+from .base import FakeUpstreamsMixin
+
+
+class LLMClientTests(FakeUpstreamsMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.upstreams = self.start_upstreams()
+        self.use_upstreams(self.upstreams)
+
+    def llm_client(self, **options):
+        return LLMClient(self.upstreams.endpoints()['llm'], 'mistral', timeout=5, **options)
+
+    def test_generate(self):
+        self.assertTrue(self.llm_client().generate('Summarize').startswith('Summary 1:'))
+        self.assertTrue(asyncio.run(self.llm_client().agenerate('Summarize')).startswith('Summary 1:'))
+
+    def test_upstream_errors_raise_llm_error(self):
+        self.upstreams.error_rate = 1.0
+        with self.assertRaises(LLMError):
+            self.llm_client().generate('Summarize')
+
+    def test_concurrent_prompts_share_a_batched_generation(self):
+        client = self.llm_client(batch_size=4, batch_window=0.5)
+        answers = {}
+        threads = [threading.Thread(target=lambda number=number: answers.update({number: client.summarize(f"Page {number}")}))
+                   for number in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(self.upstreams.requests['llm'], 1)
+        self.assertEqual(sorted(answer.split(':')[0] for answer in answers.values()),
+                         ['Summary 1', 'Summary 2', 'Summary 3', 'Summary 4'])
+
+    def test_identical_fields_are_summarized_once(self):
+        client = self.llm_client()
+        fields = {'counts': {'error': 3}, 'top_errors': ['alt_missing']}
+        for _ in range(3):
+            memoized_summary(fields, lambda: client.generate('Summarize'))
+        self.assertEqual(self.upstreams.requests['llm'], 1)
+
+    def test_accessibility_summary_falls_back_without_the_llm(self):
+        # Nothing listens on the discard port
+        self.use_upstreams(self.upstreams, UIUX_LLM_URL='http://127.0.0.1:9')
+        result = UIUXRecommendationAPIView().analyze_accessibility_summary('https://example.com/')
+        self.assertTrue(result['summary'].startswith("The accessibility analysis for"))
+        self.assertEqual(result['page']['url'], 'https://example.com/')
@@ -0,0 +1,45 @@
+from django.test import SimpleTestCase
+
+from ..concurrency import run_parallel
+from ..metrics import Registry, span, trace
+
+
+class RegistryTests(SimpleTestCase):
+    def test_renders_the_prometheus_text_format(self):
+        registry = Registry()
+        requests = registry.counter('test_requests_total', 'Requests.')
+        latency = registry.histogram('test_latency_seconds', 'Latency.', buckets=(0.1, 1))
+        requests.inc(service='wave', status='200')
+        requests.inc(2, service='wave', status='200')
+        for value in (0.05, 0.5, 5):
+            latency.observe(value, stage='fetch')
+
+        self.assertEqual(requests.value(service='wave', status='200'), 3)
+        lines = registry.render().splitlines()
+        self.assertIn('# TYPE test_requests_total counter', lines)
+        self.assertIn('test_requests_total{service="wave",status="200"} 3', lines)
+        self.assertIn('# TYPE test_latency_seconds histogram', lines)
+        self.assertIn('test_latency_seconds_bucket{stage="fetch",le="0.1"} 1', lines)
+        self.assertIn('test_latency_seconds_bucket{stage="fetch",le="1"} 2', lines)
+        self.assertIn('test_latency_seconds_bucket{stage="fetch",le="+Inf"} 3', lines)
+        self.assertIn('test_latency_seconds_count{stage="fetch"} 3', lines)
+
+
+class TraceTests(SimpleTestCase):
+    def test_spans_from_worker_threads_join_the_request_trace(self):
+        def fetch(name):
+            with span('test.fetch', page=name):
+                return name
+
+        with trace() as current:
+            with span('test.analyze') as outer:
+                run_parallel({'a': lambda: fetch('a'), 'b': lambda: fetch('b')})
+                outer.check({'error': 'upstream down'})
+
+        timings = current.timings()
+        spans = {span_data.get('page', span_data['name']): span_data for span_data in timings['spans']}
+        self.assertEqual(spans['a']['parent_id'], spans['test.analyze']['id'])
+        self.assertEqual(spans['b']['parent_id'], spans['test.analyze']['id'])
+        self.assertEqual(timings['stages']['test.fetch']['count'], 2)
+        self.assertEqual(timings['stages']['test.analyze']['errors'], 1)
+        self.assertNotIn('spans', current.timings(include_spans=False))
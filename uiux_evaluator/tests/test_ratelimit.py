@@ -0,0 +1,48 @@
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from ..ratelimit import TokenBucket, UpstreamLimiter, RateLimitTimeout
+
+
+class TokenBucketTests(SimpleTestCase):
+    def test_allows_a_burst_then_refills_at_the_rate(self):
+        bucket = TokenBucket(rate=20, capacity=3)
+        self.assertTrue(all(bucket.acquire(timeout=0) for _ in range(3)))
+        self.assertFalse(bucket.acquire(timeout=0))
+        started = time.monotonic()
+        self.assertTrue(bucket.acquire(timeout=1))
+        self.assertGreaterEqual(time.monotonic() - started, 0.03)
+
+
+class UpstreamLimiterTests(SimpleTestCase):
+    def test_caps_calls_in_flight(self):
+        limiter = UpstreamLimiter('test', rate=1000, burst=1000, concurrency=2)
+        in_flight = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def call():
+            nonlocal in_flight, peak
+            with limiter.slot(timeout=5):
+                with lock:
+                    in_flight += 1
+                    peak = max(peak, in_flight)
+                time.sleep(0.02)
+                with lock:
+                    in_flight -= 1
+
+        threads = [threading.Thread(target=call) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(peak, 2)
+
+    def test_times_out_without_a_free_slot(self):
+        limiter = UpstreamLimiter('test', rate=1000, burst=1000, concurrency=1)
+        with limiter.slot():
+            with self.assertRaises(RateLimitTimeout):
+                with limiter.slot(timeout=0.05):
+                    pass
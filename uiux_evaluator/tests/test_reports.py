@@ -0,0 +1,46 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Scan
+from ..reports import store_scan
+
+PAGE_REPORT = {
+    'url': 'https://example.com/',
+    'all_results': {'static': {'mobile_friendly': 1, 'recommendations': ['Add a descriptive <title> to the page.']}},
+    'final_recommendation': {
+        'summary': 'UI/UX recommendations categorized by service.',
+        'categories': {'static': ['Add a descriptive <title> to the page.']},
+    },
+}
+
+
+class ScanHistoryTests(TestCase):
+    def setUp(self):
+        for url in ('https://example.com/', 'https://example.com/about', 'https://example.org/'):
+            store_scan(Scan.KIND_SINGLE, url, {}, [dict(PAGE_REPORT, url=url)])
+        store_scan(Scan.KIND_FULL, 'https://example.com', {}, [PAGE_REPORT, dict(PAGE_REPORT, error='Timed out')])
+        self.url = reverse('scan-history')
+
+    def history(self, **params):
+        return self.client.get(self.url, params)
+
+    def test_filters(self):
+        self.assertEqual(len(self.history().json()), 4)
+        self.assertEqual(len(self.history(host='EXAMPLE.com').json()), 3)
+        self.assertEqual([scan['kind'] for scan in self.history(url='https://example.com/').json()], ['full', 'single'])
+        self.assertEqual(len(self.history(kind='full').json()), 1)
+        self.assertEqual(len(self.history(limit=2).json()), 2)
+
+    def test_rejects_invalid_parameters(self):
+        for params in ({'limit': -1}, {'limit': 0}, {'limit': 501}, {'limit': 'ten'}, {'kind': 'partial'}):
+            with self.subTest(**params):
+                response = self.history(**params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(next(iter(params)), response.json())
+
+    def test_stored_report_round_trips(self):
+        scan = Scan.objects.get(kind=Scan.KIND_FULL)
+        report = self.client.get(reverse('scan-report-detail', args=[scan.pk])).json()
+        self.assertEqual(report['total_pages_scanned'], 2)
+        self.assertEqual(report['results'][0]['final_recommendation'], PAGE_REPORT['final_recommendation'])
+        self.assertEqual(report['results'][1], {'url': 'https://example.com/', 'error': 'Timed out'})
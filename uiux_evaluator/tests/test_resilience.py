@@ -0,0 +1,174 @@
+import asyncio
+import time
+from functools import partial
+from urllib.parse import urlencode
+
+import requests
+from django.test import SimpleTestCase
+
+from ..clients import httpx
+from ..concurrency import run_parallel
+from ..metrics import RETRY_BUDGET_EXHAUSTED
+from ..ratelimit import get_limiter
+from ..resilience import (
+    CircuitBreaker, CircuitOpenError, RetryBudget, get_policy, parse_retry_after, request_with_retries,
+    arequest_with_retries, CLOSED, OPEN, HALF_OPEN
+)
+from ..views import UIUXRecommendationAPIView
+from .base import FakeUpstreamsMixin
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker('test', failure_threshold=3, reset_timeout=60)
+        for _ in range(2):
+            breaker.record(True, breaker.before_call())
+        self.assertEqual(breaker.state, CLOSED)
+        breaker.record(True, breaker.before_call())
+        self.assertEqual(breaker.state, OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+    def test_success_resets_the_failure_count(self):
+        breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=60)
+        breaker.record(True, breaker.before_call())
+        breaker.record(False, breaker.before_call())
+        breaker.record(True, breaker.before_call())
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_lets_one_probe_through_after_reset_timeout(self):
+        breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=0.05)
+        breaker.record(True, breaker.before_call())
+        time.sleep(0.06)
+        self.assertTrue(breaker.before_call())
+        self.assertEqual(breaker.state, HALF_OPEN)
+        # Everyone else is refused while the probe is out
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record(False, probe=True)
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertFalse(breaker.before_call())
+
+    def test_failed_probe_reopens(self):
+        breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=0.05)
+        breaker.record(True, breaker.before_call())
+        time.sleep(0.06)
+        breaker.record(True, breaker.before_call())
+        self.assertEqual(breaker.state, OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+    def test_cancelled_probe_frees_the_slot(self):
+        breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=0.05)
+        breaker.record(True, breaker.before_call())
+        time.sleep(0.06)
+        breaker.record(None, breaker.before_call())
+        self.assertTrue(breaker.before_call())
+
+
+class RetryBudgetTests(SimpleTestCase):
+    def test_retries_are_capped_by_recent_traffic(self):
+        budget = RetryBudget(ratio=0.5, min_per_second=0, window=60)
+        for _ in range(4):
+            budget.record_request()
+        self.assertTrue(budget.try_spend())
+        self.assertTrue(budget.try_spend())
+        self.assertFalse(budget.try_spend())
+
+    def test_minimum_rate_allows_retries_without_traffic(self):
+        budget = RetryBudget(ratio=0, min_per_second=0.1, window=10)
+        self.assertTrue(budget.try_spend())
+        self.assertFalse(budget.try_spend())
+
+
+class RetryAfterTests(SimpleTestCase):
+    def test_parses_seconds_and_dates(self):
+        self.assertEqual(parse_retry_after('7'), 7.0)
+        self.assertEqual(parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT'), 0.0)
+        self.assertIsNone(parse_retry_after('soon'))
+        self.assertIsNone(parse_retry_after(None))
+
+
+class UpstreamResilienceTests(FakeUpstreamsMixin, SimpleTestCase):
+    def use_policy(self, upstreams, **policy):
+        self.use_upstreams(upstreams, UIUX_UPSTREAM_RESILIENCE={'pagespeed': policy})
+        return upstreams.endpoints()['pagespeed']
+
+    def test_retries_transient_errors(self):
+        upstreams = self.start_upstreams(error_rate=1.0)
+        url = self.use_policy(upstreams, attempts=3, backoff=0, failure_threshold=10)
+        with self.assertRaises(requests.HTTPError):
+            request_with_retries('pagespeed', 'GET', url)
+        self.assertEqual(upstreams.requests['pagespeed'], 3)
+
+    def test_breaker_opens_and_recovers(self):
+        upstreams = self.start_upstreams(error_rate=1.0)
+        url = self.use_policy(upstreams, attempts=1, failure_threshold=2, reset_timeout=0.2)
+        for _ in range(2):
+            with self.assertRaises(requests.HTTPError):
+                request_with_retries('pagespeed', 'GET', url)
+        self.assertEqual(get_policy('pagespeed').breaker.state, OPEN)
+
+        with self.assertRaises(CircuitOpenError):
+            request_with_retries('pagespeed', 'GET', url)
+        self.assertEqual(upstreams.requests['pagespeed'], 2)
+
+        upstreams.error_rate = 0
+        time.sleep(0.25)
+        self.assertEqual(request_with_retries('pagespeed', 'GET', url).status_code, 200)
+        self.assertEqual(get_policy('pagespeed').breaker.state, CLOSED)
+
+    def test_retry_budget_exhaustion_stops_retrying(self):
+        upstreams = self.start_upstreams(error_rate=1.0)
+        url = self.use_policy(upstreams, attempts=3, backoff=0, retry_ratio=0, min_retries_per_second=0,
+                              failure_threshold=10)
+        exhausted = RETRY_BUDGET_EXHAUSTED.value(service='pagespeed')
+        with self.assertRaises(requests.HTTPError):
+            request_with_retries('pagespeed', 'GET', url)
+        self.assertEqual(upstreams.requests['pagespeed'], 1)
+        self.assertEqual(RETRY_BUDGET_EXHAUSTED.value(service='pagespeed'), exhausted + 1)
+
+    def test_abandoned_calls_stop_at_the_deadline(self):
+        upstreams = self.start_upstreams(latency={'pagespeed': 1.0})
+        self.use_upstreams(upstreams, UIUX_UPSTREAM_LIMITS={'pagespeed': {'concurrency': 1}},
+                           UIUX_UPSTREAM_RESILIENCE={'pagespeed': {'attempts': 3, 'backoff': 0, 'failure_threshold': 1}})
+        call = partial(request_with_retries, 'pagespeed', 'GET', upstreams.endpoints()['pagespeed'])
+
+        started = time.monotonic()
+        results, _ = run_parallel({'pagespeed': call}, deadline=0.2)
+        self.assertTrue(results['pagespeed']['timed_out'])
+        # The abandoned call gives its limiter slot back well before the upstream answers
+        with get_limiter('pagespeed').slot(timeout=0.5):
+            self.assertLess(time.monotonic() - started, 0.7)
+        self.assertEqual(upstreams.requests['pagespeed'], 1)
+        self.assertEqual(get_policy('pagespeed').breaker.state, CLOSED)
+
+    def test_open_breaker_gives_degraded_result(self):
+        upstreams = self.start_upstreams(error_rate=1.0)
+        self.use_policy(upstreams, attempts=1, failure_threshold=1, reset_timeout=60)
+        analyzer = UIUXRecommendationAPIView()
+        first = analyzer.request_pagespeed('https://example.com/', 'mobile')
+        self.assertNotIn('degraded', first)
+        second = analyzer.request_pagespeed('https://example.com/', 'mobile')
+        self.assertTrue(second['degraded'])
+        self.assertEqual(second['service'], 'pagespeed')
+        self.assertEqual(upstreams.requests['pagespeed'], 1)
+
+    def test_lighthouse_page_errors_are_final_and_not_upstream_failures(self):
+        broken = 'https://broken.example.com/'
+        upstreams = self.start_upstreams(broken_pages=[broken])
+        url = self.use_policy(upstreams, attempts=3, backoff=0, failure_threshold=1)
+        url = f"{url}?{urlencode({'url': broken})}"
+
+        with self.assertRaises(requests.HTTPError):
+            request_with_retries('pagespeed', 'GET', url)
+        with self.assertRaises(httpx.HTTPStatusError):
+            asyncio.run(arequest_with_retries('pagespeed', 'GET', url))
+        self.assertEqual(upstreams.requests['pagespeed'], 2)
+        self.assertEqual(get_policy('pagespeed').breaker.state, CLOSED)
+
+        result = UIUXRecommendationAPIView().request_pagespeed(broken, 'mobile')
+        self.assertTrue(result['target_error'])
+        self.assertIn('FAILED_DOCUMENT_REQUEST', result['error'])
+        self.assertNotIn('degraded', result)
+        self.assertEqual(get_policy('pagespeed').breaker.state, CLOSED)
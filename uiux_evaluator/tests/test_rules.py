@@ -0,0 +1,62 @@
+from django.test import SimpleTestCase
+
+from ..rules import RuleSet, evaluate_pagespeed, evaluate_security, extract_savings, OPERATORS
+
+
+class RuleSetTests(SimpleTestCase):
+    def test_findings_are_ordered_by_severity_then_savings(self):
+        ruleset = RuleSet([
+            {'id': 'slow', 'field': 'score', 'op': 'lt', 'threshold': 50, 'severity': 'low', 'message': "Score {value}"},
+            {'id': 'images', 'field': 'images', 'op': 'gt', 'threshold': 0, 'severity': 'medium',
+             'savings': 'images', 'message': "{count} images"},
+            {'id': 'scripts', 'field': 'scripts', 'op': 'gt', 'threshold': 0, 'severity': 'medium',
+             'savings': 'scripts', 'message': "{count} scripts"},
+        ])
+        metrics = {'score': 20, 'images': 3, 'scripts': 2,
+                   'savings': {'images': {'ms': 100, 'bytes': None}, 'scripts': {'ms': 900, 'bytes': None}}}
+        findings = ruleset.evaluate([('page', '', metrics), ('other', '', {'score': 90})])
+        self.assertEqual([(finding['rule'], finding['priority']) for finding in findings['page']],
+                         [('scripts', 1), ('images', 2), ('slow', 3)])
+        self.assertEqual(findings['page'][0]['estimated_savings_ms'], 900)
+        self.assertEqual(findings['other'], [])
+
+    def test_rejects_unknown_ops_and_severities(self):
+        with self.assertRaises(ValueError):
+            RuleSet([{'id': 'broken', 'field': 'score', 'op': 'between', 'message': ''}])
+        with self.assertRaises(ValueError):
+            RuleSet([{'id': 'broken', 'field': 'score', 'op': 'lt', 'severity': 'urgent', 'message': ''}])
+
+    def test_pagespeed_pairs_are_evaluated_together(self):
+        slow = {'overall_score': 40, 'mobile_friendly': 1}
+        fast = {'overall_score': 95, 'mobile_friendly': 1}
+        findings = evaluate_pagespeed([(slow, fast), (fast, fast), ({'error': 'Timed out'}, None)])
+        self.assertEqual([finding['message'] for finding in findings[0]], [
+            "Mobile: Performance is below optimal. Optimize images, enable compression, and minimize blocking scripts.",
+        ])
+        self.assertEqual(findings[1:], [[], []])
+
+    def test_extract_savings(self):
+        audits = {
+            'render-blocking-resources': {'details': {'overallSavingsMs': 420.4, 'overallSavingsBytes': 1000}},
+            'uses-text-compression': {'metricSavings': {'FCP': 150, 'LCP': None}},
+            'unused-css-rules': {'details': {}},
+        }
+        self.assertEqual(extract_savings(audits), {
+            'render-blocking-resources': {'ms': 420, 'bytes': 1000},
+            'uses-text-compression': {'ms': 150, 'bytes': None},
+        })
+
+
+class SecurityRulesTests(SimpleTestCase):
+    def rules(self, metrics):
+        return [finding['rule'] for finding in evaluate_security([metrics])[0]]
+
+    def test_hsts_missing_needs_a_reported_policy(self):
+        self.assertNotIn('hsts-missing', self.rules({'grade': 'A'}))
+        self.assertIn('hsts-missing', self.rules({'grade': 'A', 'hsts_status': 'absent'}))
+        self.assertNotIn('hsts-missing', self.rules({'grade': 'A', 'hsts_status': 'present'}))
+
+    def test_comparisons_never_match_missing_metrics(self):
+        for op in ('lt', 'le', 'gt', 'ge', 'eq', 'ne'):
+            with self.subTest(op=op):
+                self.assertFalse(OPERATORS[op](None, 0))
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+
+from django.test import SimpleTestCase
+
+from ..ssllabs import SSLLabsTracker, READY, PENDING, TIMEOUT, ERROR
+from ..views import UIUXRecommendationAPIView
+from .base import FakeUpstreamsMixin
+
+
+class SSLLabsTrackerTests(FakeUpstreamsMixin, SimpleTestCase):
+    def tracker(self, statuses, max_duration=5):
+        self.upstreams = self.start_upstreams(ssllabs_statuses=statuses)
+        self.use_upstreams(self.upstreams)
+        return SSLLabsTracker(self.upstreams.endpoints()['ssllabs'], min_interval=0.01, max_interval=0.05,
+                              max_duration=max_duration)
+
+    def test_polls_until_ready(self):
+        tracker = self.tracker(['DNS', 'IN_PROGRESS', 'IN_PROGRESS', 'READY'])
+        assessment = tracker.assess('example.com', timeout=5)
+        self.assertEqual(assessment['state'], READY)
+        self.assertEqual(assessment['polls'], 4)
+        self.assertEqual(assessment['data']['endpoints'][0]['grade'], 'A')
+        # The endpoint ETA (1s) is capped at max_interval
+        self.assertEqual(tracker.track('example.com').interval, 0.05)
+
+    def test_backs_off_while_overloaded(self):
+        tracker = self.tracker([529, 529, 'READY'])
+        assessment = tracker.assess('example.com', timeout=5)
+        self.assertEqual(assessment['state'], READY)
+        self.assertEqual(self.upstreams.ssllabs_polls['example.com'], 3)
+        self.assertEqual(tracker.track('example.com').interval, 0.02)
+
+    def test_reports_assessment_errors(self):
+        tracker = self.tracker(['ERROR'])
+        assessment = tracker.assess('example.com', timeout=5)
+        self.assertEqual(assessment['state'], ERROR)
+        self.assertEqual(assessment['error'], 'Unable to resolve domain name')
+
+    def test_unexpected_response_shapes_end_the_assessment(self):
+        for body in (['unexpected'], 'Service unavailable'):
+            tracker = self.tracker([body])
+            assessment = tracker.assess('example.com', timeout=5)
+            self.assertEqual(assessment['state'], ERROR)
+            self.assertIn('expected an object', assessment['error'])
+
+    def test_malformed_endpoints_are_ignored_while_in_progress(self):
+        tracker = self.tracker([{'status': 'IN_PROGRESS', 'endpoints': ['pending']},
+                                {'status': 'IN_PROGRESS', 'endpoints': 'pending'}, 'READY'])
+        self.assertEqual(tracker.assess('example.com', timeout=5)['state'], READY)
+
+    def test_unexpected_errors_end_the_assessment(self):
+        tracker = self.tracker(['IN_PROGRESS'])
+
+        def broken_interval(assessment, data):
+            raise KeyError('eta')
+
+        tracker._next_interval = broken_interval
+        assessment = tracker.assess('example.com', timeout=5)
+        self.assertEqual(assessment['state'], ERROR)
+        self.assertIn('Unexpected error', assessment['error'])
+
+    def test_times_out_after_max_duration(self):
+        tracker = self.tracker(['IN_PROGRESS'], max_duration=0.2)
+        assessment = tracker.assess('example.com', timeout=5)
+        self.assertEqual(assessment['state'], TIMEOUT)
+        self.assertIn('not ready after', assessment['error'])
+
+    def test_short_wait_reports_pending_and_keeps_polling(self):
+        tracker = self.tracker(['IN_PROGRESS', 'IN_PROGRESS', 'READY'])
+        self.assertEqual(tracker.assess('example.com', timeout=0)['state'], PENDING)
+        self.assertEqual(tracker.assess('example.com', timeout=5)['state'], READY)
+        self.assertEqual(self.upstreams.ssllabs_polls['example.com'], 3)
+
+    def test_concurrent_requests_share_one_assessment(self):
+        tracker = self.tracker(['IN_PROGRESS', 'READY'])
+        states = []
+        threads = [threading.Thread(target=lambda: states.append(tracker.assess('example.com', timeout=5)['state']))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(states, [READY] * 5)
+        self.assertEqual(self.upstreams.ssllabs_polls['example.com'], 2)
+
+    def test_async_wait(self):
+        tracker = self.tracker(['IN_PROGRESS', 'READY'])
+        assessment = asyncio.run(tracker.assess_async('example.com', timeout=5))
+        self.assertEqual(assessment['state'], READY)
+
+    def test_pending_result_is_an_error_without_grade(self):
+        result = UIUXRecommendationAPIView().build_ssllabs_result(
+            {'state': PENDING, 'elapsed_seconds': 75.0, 'polls': 3, 'data': None, 'error': None}
+        )
+        self.assertEqual(result['assessment_status'], PENDING)
+        self.assertIn('retry later', result['error'])
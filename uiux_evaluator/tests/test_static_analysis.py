@@ -0,0 +1,77 @@
+from django.test import SimpleTestCase
+
+from ..static_analysis import (
+    _Collector, _feed_lxml, _feed_stdlib, analyze_response, analyze_static_html, fetch_and_analyze,
+    remote_analysis_skip_reason
+)
+from .base import FakeUpstreamsMixin
+
+PAGE_URL = 'https://example.com/'
+DOCUMENTS = {
+    'meta charset': '<meta charset="iso-8859-1"><title>Café page</title><h1>Crème brûlée</h1>',
+    'http-equiv': ('<html lang="fr"><head><meta http-equiv="Content-Type" content="text/html; charset=windows-1252">'
+                   '<title>Ça va — “très” bien</title></head><body><img src="/a.png"></body></html>'),
+    'xml declaration': ('<?xml version="1.0" encoding="iso-8859-1"?>\n<html xmlns="http://www.w3.org/1999/xhtml">'
+                        '<head><title>Über uns</title></head><body><h1>Hallo</h1><h3>Größe</h3></body></html>'),
+    'no charset': ('<!DOCTYPE html><html lang="en"><head><meta name="viewport" content="width=device-width">'
+                   '<title>日本語のページ</title><script src="https://cdn.example.net/app.js"></script></head>'
+                   '<body><h1>Hello</h1><img src="/x.png" alt=""></body></html>'),
+}
+
+
+def analyze_with(feed, html_text):
+    collector = _Collector(PAGE_URL)
+    report = collector.report(feed(collector, html_text))
+    del report['parser']
+    return report
+
+
+class StaticHTMLTests(SimpleTestCase):
+    def test_parsers_agree(self):
+        for name, html_text in DOCUMENTS.items():
+            with self.subTest(name):
+                self.assertEqual(analyze_with(_feed_lxml, html_text), analyze_with(_feed_stdlib, html_text))
+
+    def test_declared_charset_does_not_garble_decoded_text(self):
+        report = analyze_static_html(PAGE_URL, DOCUMENTS['meta charset'])
+        self.assertEqual(report['checks']['title'], 'Café page')
+
+    def test_reports_common_problems(self):
+        report = analyze_static_html(PAGE_URL, DOCUMENTS['no charset'])
+        self.assertEqual(report['mobile_friendly'], 1)
+        self.assertEqual(report['render_blocking_resources'], 0)
+        self.assertEqual(report['checks']['origins_without_preconnect'], ['https://cdn.example.net'])
+        self.assertEqual(analyze_static_html(PAGE_URL, DOCUMENTS['xml declaration'])['checks']['skipped_heading_levels'],
+                         ['h1 -> h3'])
+
+    def test_unparseable_documents_get_no_findings(self):
+        for html_text in ('', ' \n\t', '<!-- nothing here -->'):
+            with self.subTest(html_text=html_text):
+                report = analyze_static_html(PAGE_URL, html_text)
+                self.assertTrue(report['unparseable'])
+                self.assertEqual(report['parse_error'], 'Document is empty')
+                self.assertEqual(report['recommendations'], [])
+
+    def test_empty_html_response_is_unparseable(self):
+        report = analyze_response(PAGE_URL, 200, {'Content-Type': 'text/html'}, PAGE_URL, '')
+        self.assertTrue(report['is_html_page'])
+        self.assertTrue(report['unparseable'])
+        self.assertEqual(report['recommendations'], [])
+        self.assertIsNone(remote_analysis_skip_reason(report))
+
+
+class FetchAndAnalyzeTests(FakeUpstreamsMixin, SimpleTestCase):
+    def test_analyzes_pages_of_a_static_site(self):
+        site = self.start_site(pages=2)
+        result = fetch_and_analyze(site.base_url)
+        self.assertTrue(result['is_html_page'])
+        self.assertEqual(result['checks']['title'], 'Benchmark page 0')
+        self.assertEqual(result['checks']['images_missing_alt'], 1)
+        self.assertIsNone(remote_analysis_skip_reason(result))
+
+    def test_missing_and_non_html_pages_skip_the_remote_analyzers(self):
+        site = self.start_site(pages=2)
+        missing = fetch_and_analyze(f"{site.base_url}gone.html")
+        self.assertEqual(remote_analysis_skip_reason(missing), 'Page returned HTTP 404')
+        robots = fetch_and_analyze(f"{site.base_url}robots.txt")
+        self.assertEqual(remote_analysis_skip_reason(robots), 'Page is not an HTML document (text/plain)')
@@ -0,0 +1,121 @@
+import ssl
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from django.test import SimpleTestCase, TestCase
+
+from ..models import AnalyzerResult, Scan
+from ..reports import reevaluate_stored_results, store_scan
+from ..tls_inspect import inspect_host, _split_host
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+# Self-signed for localhost and 127.0.0.1, valid until 2126
+CERT_FILE = str(FIXTURES / 'tls_cert.pem')
+KEY_FILE = str(FIXTURES / 'tls_key.pem')
+ONE_YEAR = 365 * 24 * 60 * 60
+
+
+# HTTPS server on 127.0.0.1 presenting the fixture certificate; answers every
+# request with an empty page and, if hsts_max_age is set, an HSTS header
+class TLSServer:
+    def __init__(self, hsts_max_age=ONE_YEAR, maximum_version=None):
+        hsts_max_age_header = hsts_max_age
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_HEAD(self):
+                self.send_response(200)
+                if hsts_max_age_header is not None:
+                    self.send_header('Strict-Transport-Security', f'max-age={hsts_max_age_header}; includeSubDomains')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(CERT_FILE, KEY_FILE)
+        if maximum_version:
+            context.maximum_version = maximum_version
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.server.socket = context.wrap_socket(self.server.socket, server_side=True)
+        self.host = f"127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TLSInspectionMixin:
+    def inspect(self, cafile=CERT_FILE, **options):
+        server = TLSServer(**options).start()
+        self.addCleanup(server.stop)
+        return inspect_host(server.host, timeout=5, cafile=cafile)
+
+    def rules(self, result):
+        return [finding['rule'] for finding in result['prioritized_recommendations']]
+
+
+class TLSInspectTests(TLSInspectionMixin, SimpleTestCase):
+    def test_trusted_modern_host_with_long_hsts_gets_a_plus(self):
+        result = self.inspect()
+        self.assertEqual(result['ssllabs_grade'], 'A+')
+        self.assertEqual(result['endpoint_info']['ipAddress'], '127.0.0.1')
+        details = result['details']
+        self.assertEqual(details['certificate']['subject'], 'localhost')
+        self.assertGreater(details['certificate']['days_remaining'], 365)
+        self.assertEqual(details['hsts_max_age'], ONE_YEAR)
+        self.assertTrue(details['protocols']['TLSv1.2'])
+        self.assertIn(details['protocols']['TLSv1.0'], (False, None))
+        self.assertEqual(result['metrics']['grade'], 'A+')
+        self.assertEqual(result['recommendations'][0], "Site has a strong SSL/TLS configuration with a grade of A+.")
+        self.assertIn('hsts-long-max-age', self.rules(result))
+        self.assertNotIn('rc4-disabled', self.rules(result))
+
+    def test_untrusted_certificate_caps_the_grade(self):
+        result = self.inspect(cafile=None)
+        self.assertEqual(result['ssllabs_grade'], 'T')
+        self.assertIsNone(result['details']['certificate'])
+        self.assertEqual(self.rules(result)[:2], ['certificate-untrusted', 'weak-grade'])
+        self.assertIn('self-signed certificate', result['recommendations'][0])
+
+    def test_missing_or_short_hsts(self):
+        result = self.inspect(hsts_max_age=None)
+        self.assertEqual(result['ssllabs_grade'], 'A')
+        self.assertIn("Enable HSTS (Strict-Transport-Security header).", result['recommendations'])
+
+        result = self.inspect(hsts_max_age=3600)
+        self.assertEqual(result['ssllabs_grade'], 'A')
+        self.assertIn('hsts-short-max-age', self.rules(result))
+
+    def test_recommends_tls_1_3(self):
+        result = self.inspect(maximum_version=ssl.TLSVersion.TLSv1_2)
+        self.assertFalse(result['details']['protocols']['TLSv1.3'])
+        self.assertIn('tls13-disabled', self.rules(result))
+
+    def test_unreachable_host(self):
+        server = TLSServer().start()
+        server.stop()
+        self.assertIn('TLS inspection failed', inspect_host(server.host, timeout=1)['error'])
+
+    def test_split_host(self):
+        self.assertEqual(_split_host('example.com'), ('example.com', 443))
+        self.assertEqual(_split_host('example.com:8443'), ('example.com', 8443))
+        self.assertEqual(_split_host('[::1]:8443'), ('::1', 8443))
+        self.assertEqual(_split_host('::1'), ('::1', 443))
+
+
+class StoredTLSResultTests(TLSInspectionMixin, TestCase):
+    def test_stored_local_results_are_reevaluated(self):
+        result = self.inspect()
+        page_report = {'url': 'https://localhost/', 'all_results': {'security': dict(result, recommendations=[])},
+                       'final_recommendation': {}}
+        scan = store_scan(Scan.KIND_SINGLE, 'https://localhost/', {}, [page_report])
+        self.assertEqual(reevaluate_stored_results(scan_ids=[scan.pk]), 1)
+        stored = AnalyzerResult.objects.get(page__scan=scan, service='security').payload
+        self.assertEqual(stored['recommendations'], result['recommendations'])
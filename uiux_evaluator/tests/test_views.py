@@ -0,0 +1,198 @@
+import json
+from unittest import mock
+
+from django.test import TestCase, SimpleTestCase
+from django.urls import reverse
+
+from ..cache import cached_call
+from ..models import Scan
+from ..reports import IncrementalScanWriter
+from ..rules import evaluate_pagespeed
+from .base import FakeUpstreamsMixin
+
+ALL_SERVICES = {'is_accessibility_applied': True, 'is_pagespeed_applied': True, 'is_security_applied': True}
+
+
+class CachedCallTests(FakeUpstreamsMixin, SimpleTestCase):
+    def test_hits_misses_and_errors(self):
+        calls = []
+
+        def compute(result):
+            calls.append(result)
+            return dict(result)
+
+        first = cached_call('wave', 'https://example.com/', lambda: compute({'grade': 'A'}))
+        second = cached_call('wave', 'https://example.com', lambda: compute({'grade': 'B'}))
+        self.assertFalse(first['cache']['hit'])
+        self.assertTrue(second['cache']['hit'])
+        self.assertEqual(second['grade'], 'A')
+
+        refreshed = cached_call('wave', 'https://example.com/', lambda: compute({'grade': 'C'}), force_refresh=True)
+        self.assertEqual(refreshed['grade'], 'C')
+
+        for _ in range(2):
+            cached_call('wave', 'https://example.org/', lambda: compute({'error': 'upstream down'}))
+        self.assertEqual(len(calls), 4)
+
+
+class SinglePageAnalysisTests(FakeUpstreamsMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.upstreams = self.start_upstreams()
+        # Failures are retried right away and never open the breaker
+        self.use_upstreams(self.upstreams, UIUX_UPSTREAM_RESILIENCE={'pagespeed': {'backoff': 0, 'failure_threshold': 100}})
+        self.url = reverse('uiux-feedback')
+
+    def analyze(self, **data):
+        response = self.client.post(self.url, dict({'url': 'https://example.com/'}, **data),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_runs_every_analyzer_and_stores_the_scan(self):
+        payload = self.analyze()
+        results = payload['all_results']
+        self.assertEqual(results['security']['ssllabs_grade'], 'A')
+        self.assertIn('mobile', results['pagespeed'])
+        accessibility = results['accessibility']
+        self.assertTrue(accessibility['summary'].startswith('Summary'))
+        self.assertEqual(set(accessibility['counts']), {'error', 'contrast', 'alert', 'feature', 'structure', 'aria'})
+        self.assertTrue(all(len(items) <= 5 for items in accessibility['top_items'].values()))
+        self.assertEqual(payload['degraded_services'], [])
+        self.assertEqual(Scan.objects.get(pk=payload['scan_id']).kind, Scan.KIND_SINGLE)
+        self.assertEqual(self.upstreams.requests, {'pagespeed': 2, 'wave': 1, 'ssllabs': 1, 'llm': 1})
+
+    def test_second_request_is_served_from_the_cache(self):
+        self.analyze()
+        payload = self.analyze()
+        self.assertTrue(payload['all_results']['security']['cache']['hit'])
+        self.assertTrue(payload['all_results']['pagespeed']['mobile']['cache']['hit'])
+        self.assertEqual(self.upstreams.requests, {'pagespeed': 2, 'wave': 1, 'ssllabs': 1, 'llm': 1})
+
+        self.analyze(force_refresh=True)
+        self.assertEqual(self.upstreams.requests['pagespeed'], 4)
+
+    def test_failed_upstream_is_reported_not_cached(self):
+        self.upstreams.error_rate = 1.0
+        payload = self.analyze(is_accessibility_applied=False, is_security_applied=False)
+        self.assertIn('error', payload['all_results']['pagespeed']['mobile'])
+        self.assertEqual(self.upstreams.requests['pagespeed'], 6)
+        self.upstreams.error_rate = 0
+        payload = self.analyze(is_accessibility_applied=False, is_security_applied=False)
+        self.assertNotIn('error', payload['all_results']['pagespeed']['mobile'])
+
+    def test_failed_accessibility_analysis_is_an_error_result(self):
+        self.upstreams.error_rate = 1.0
+        payload = self.analyze(is_pagespeed_applied=False, is_security_applied=False)
+        accessibility = payload['all_results']['accessibility']
+        self.assertEqual(set(accessibility), {'error'})
+        self.assertTrue(accessibility['error'].startswith('Accessibility analysis failed'))
+        self.assertEqual(self.upstreams.requests['llm'], 0)
+
+
+class FullScanTests(FakeUpstreamsMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.upstreams = self.start_upstreams()
+        self.use_upstreams(self.upstreams)
+        self.site = self.start_site(pages=5)
+        self.url = reverse('website-full-scan')
+
+    def scan(self, **data):
+        data = dict(ALL_SERVICES, url=self.site.base_url, **data)
+        response = self.client.post(self.url, data, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def stream(self, **data):
+        response = self.scan(stream='ndjson', **data)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_scans_every_crawled_page(self):
+        payload = self.scan().json()
+        self.assertEqual([page['url'] for page in payload['results']], self.site.page_urls())
+        self.assertEqual(self.upstreams.requests['pagespeed'], 10)
+        # Pages of one host share a single SSL Labs assessment
+        self.assertEqual(self.upstreams.requests['ssllabs'], 1)
+        self.assertEqual(Scan.objects.get(pk=payload['scan_id']).total_pages, 5)
+
+    def test_rules_run_once_for_the_whole_scan(self):
+        with mock.patch('uiux_evaluator.views.evaluate_pagespeed', wraps=evaluate_pagespeed) as evaluate:
+            payload = self.scan().json()
+        self.assertEqual(evaluate.call_count, 1)
+        self.assertEqual(len(evaluate.call_args.args[0]), 5)
+        for page in payload['results']:
+            pagespeed = page['all_results']['pagespeed']
+            self.assertIn('prioritized_recommendations', pagespeed)
+            self.assertEqual(page['final_recommendation']['categories'].get('pagespeed'),
+                             pagespeed['recommendations'] or None)
+
+    def test_incremental_scan_reuses_unchanged_pages(self):
+        self.scan(incremental=True)
+        requests_before = dict(self.upstreams.requests)
+        payload = self.scan(incremental=True, force_refresh=True).json()
+        self.assertEqual(payload['total_pages_reused'], 5)
+        self.assertTrue(all(page['reused'] for page in payload['results']))
+        self.assertEqual(self.upstreams.requests, requests_before)
+
+    def test_incremental_scan_needs_matching_options(self):
+        self.scan(incremental=True)
+        payload = self.scan(incremental=True, is_accessibility_applied=False).json()
+        self.assertEqual(payload['total_pages_reused'], 0)
+
+    def test_unfinished_scans_are_not_reused(self):
+        payload = self.scan(incremental=True).json()
+        # A streamed scan that is still running (or was aborted) has no pages yet
+        options = Scan.objects.get(pk=payload['scan_id']).options
+        IncrementalScanWriter(Scan.KIND_FULL, self.site.base_url, options)
+        payload = self.scan(incremental=True).json()
+        self.assertEqual(payload['total_pages_reused'], 5)
+
+    def test_streamed_incremental_scan_reuses_unchanged_pages(self):
+        self.stream(incremental=True)
+        requests_before = dict(self.upstreams.requests)
+        summary = self.stream(incremental=True, force_refresh=True)[-1]
+        self.assertEqual(summary['total_pages_scanned'], 5)
+        self.assertEqual(summary['total_pages_reused'], 5)
+        self.assertEqual(self.upstreams.requests, requests_before)
+
+    def test_streamed_scan_emits_pages_then_summary(self):
+        events = self.stream()
+        pages = [event for event in events if event['event'] == 'page']
+        self.assertEqual(len(pages), 5)
+        summary = events[-1]
+        self.assertEqual(summary['event'], 'summary')
+        self.assertEqual(summary['total_pages_scanned'], 5)
+        self.assertEqual(Scan.objects.get(pk=summary['scan_id']).pages.count(), 5)
+
+
+class MultiPageOptionsTests(SimpleTestCase):
+    def test_single_page_options_are_rejected(self):
+        requests = {'website-full-scan': {'url': 'https://example.com/'},
+                    'batch-analysis': {'urls': ['https://example.com/']}}
+        for name, data in requests.items():
+            for option, value in (('deadline_seconds', 30), ('include_details', True)):
+                with self.subTest(name, option=option):
+                    response = self.client.post(reverse(name), dict(data, **{option: value}),
+                                                content_type='application/json')
+                    self.assertEqual(response.status_code, 400)
+                    self.assertEqual(list(response.json()), [option])
+
+
+class MetricsTests(SimpleTestCase):
+    def test_disabled_by_default(self):
+        with self.settings(UIUX_METRICS_ENABLED=False):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+
+    def test_token_is_required_when_configured(self):
+        with self.settings(UIUX_METRICS_ENABLED=True, UIUX_METRICS_TOKEN='s3cret'):
+            self.assertIn(self.client.get(reverse('metrics')).status_code, (401, 403))
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong')
+            self.assertIn(response.status_code, (401, 403))
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer s3cret')
+            self.assertEqual(response.status_code, 200)
+
+        body = response.content.decode()
+        self.assertIn('# TYPE uiux_http_pool_requests_total counter', body)
+        self.assertIn('# TYPE uiux_http_pool_reuse_ratio gauge', body)
@@ -0,0 +1,46 @@
+from django.test import SimpleTestCase
+
+from ..wave import extract_wave_features, prompt_fields
+
+
+def wave_item(item_id, count):
+    return {'id': item_id, 'description': item_id.replace('_', ' ').capitalize(), 'count': count,
+            'selectors': [f"#{item_id}-{number}" for number in range(count)]}
+
+
+WAVE_REPORT = {
+    'status': {'success': True, 'httpstatuscode': 200},
+    'statistics': {'pagetitle': 'Example', 'pageurl': 'https://example.com/', 'totalelements': 120, 'time': 1.2},
+    'categories': {
+        'error': {'description': 'Errors', 'count': 28, 'items': {
+            item_id: wave_item(item_id, count) for item_id, count in
+            (('alt_missing', 9), ('label_missing', 7), ('link_empty', 5), ('button_empty', 4),
+             ('language_missing', 2), ('title_invalid', 1))
+        }},
+        'contrast': {'description': 'Contrast Errors', 'count': 3, 'items': {'contrast': wave_item('contrast', 3)}},
+        'feature': {'description': 'Features', 'count': 4, 'items': {'alt': wave_item('alt', 4)}},
+    },
+}
+
+
+class WaveFeaturesTests(SimpleTestCase):
+    def test_keeps_counts_and_top_issue_items(self):
+        features = extract_wave_features(WAVE_REPORT)
+        self.assertTrue(features['success'])
+        self.assertEqual(features['page'], {'title': 'Example', 'url': 'https://example.com/', 'total_elements': 120})
+        self.assertEqual(features['counts'], {'error': 28, 'contrast': 3, 'alert': 0, 'feature': 4, 'structure': 0, 'aria': 0})
+        self.assertEqual([item['id'] for item in features['top_items']['error']],
+                         ['alt_missing', 'label_missing', 'link_empty', 'button_empty', 'language_missing'])
+        self.assertNotIn('feature', features['top_items'])
+        self.assertNotIn('selectors', features['top_items']['contrast'][0])
+
+    def test_prompt_fields_leave_out_the_page(self):
+        other_page = dict(WAVE_REPORT, statistics={'pagetitle': 'About', 'pageurl': 'https://example.com/about'})
+        self.assertEqual(prompt_fields(extract_wave_features(WAVE_REPORT)),
+                         prompt_fields(extract_wave_features(other_page)))
+
+    def test_failed_request(self):
+        features = extract_wave_features({'status': {'success': False, 'httpstatuscode': 401}})
+        self.assertFalse(features['success'])
+        self.assertEqual(features['http_status'], 401)
+        self.assertEqual(features['top_items'], {})
@@ -0,0 +1,225 @@
+import socket
+import ssl
+import time
+from functools import partial
+
+from .concurrency import run_parallel
+from .rules import OPERATORS, evaluate_security, messages, SECURITY_FALLBACK
+
+DEFAULT_PORT = 443
+# Protocol versions probed, oldest first
+PROBED_PROTOCOLS = {
+    'TLSv1.0': ssl.TLSVersion.TLSv1,
+    'TLSv1.1': ssl.TLSVersion.TLSv1_1,
+    'TLSv1.2': ssl.TLSVersion.TLSv1_2,
+    'TLSv1.3': ssl.TLSVersion.TLSv1_3,
+}
+LEGACY_PROTOCOLS = ('TLSv1.0', 'TLSv1.1')
+# HSTS max-age SSL Labs requires for an A+ (180 days)
+HSTS_LONG_MAX_AGE = 180 * 24 * 60 * 60
+
+# Approximation of SSL Labs' grade caps, as data: the first cap whose metric
+# test matches sets the grade (ops as in rules.py). Hosts that pass every cap
+# get an A, or an A+ with a long HSTS max-age.
+GRADE_CAPS = [
+    {'field': 'cert_issues', 'op': 'truthy', 'grade': 'T'},
+    {'field': 'supports_modern_tls', 'op': 'falsy', 'grade': 'C'},
+    {'field': 'legacy_protocols', 'op': 'truthy', 'grade': 'B'},
+    {'field': 'forward_secrecy', 'op': 'ne', 'threshold': 2, 'grade': 'B'},
+]
+
+
+# Local alternative to SSL Labs: a handful of direct TLS handshakes against the
+# host (one verified handshake plus one per protocol version, all concurrent)
+# and a HEAD request over the first connection for HSTS. Returns the same
+# ssllabs_grade / endpoint_info / metrics / recommendations shape as the SSL
+# Labs analyzer, with recommendations from the security rules (rules.py), so
+# stored results are re-evaluated like SSL Labs ones.
+def inspect_host(host, timeout=5, cafile=None):
+    hostname, port = _split_host(host)
+    started = time.monotonic()
+
+    tasks = {'handshake': partial(_handshake, hostname, port, timeout, cafile)}
+    for name, version in PROBED_PROTOCOLS.items():
+        tasks[name] = partial(_probe_protocol, hostname, port, timeout, version)
+    results, _ = run_parallel(tasks, deadline=timeout * 2)
+
+    handshake = results['handshake']
+    if 'error' in handshake:
+        return {'error': f"TLS inspection failed: {handshake['error']}"}
+    protocols = {name: results[name] if isinstance(results[name], bool) else None for name in PROBED_PROTOCOLS}
+
+    metrics = tls_metrics(handshake, protocols)
+    grade = metrics['grade'] = _grade(metrics)
+    findings = evaluate_security([metrics])[0]
+    return {
+        'engine': 'local',
+        'ssllabs_grade': grade,
+        'endpoint_info': {
+            'ipAddress': handshake['ip_address'],
+            'grade': grade,
+            'serverName': hostname,
+            'statusMessage': 'Ready',
+        },
+        'details': {
+            'protocols': protocols,
+            'negotiated_protocol': handshake['protocol'],
+            'cipher': handshake['cipher'],
+            'forward_secrecy': handshake['forward_secrecy'],
+            'certificate': handshake['certificate'],
+            'hsts_max_age': handshake['hsts_max_age'],
+            'elapsed_ms': round((time.monotonic() - started) * 1000, 1),
+        },
+        'metrics': metrics,
+        'recommendations': messages(findings) or [SECURITY_FALLBACK],
+        'prioritized_recommendations': findings,
+    }
+
+
+def _split_host(host):
+    hostname, _, port = host.rpartition(':')
+    # "host:port" or "[v6]:port"; a bare IPv6 address has more than one colon
+    if port.isdigit() and hostname and (':' not in hostname or hostname.endswith(']')):
+        return hostname.strip('[]'), int(port)
+    return host.strip('[]'), DEFAULT_PORT
+
+
+def _handshake(hostname, port, timeout, cafile):
+    context = ssl.create_default_context()
+    if cafile:
+        context.load_verify_locations(cafile)
+    trust_error = None
+    try:
+        connection = _connect(context, hostname, port, timeout)
+    except ssl.SSLCertVerificationError as e:
+        # Still inspect the endpoint, but report why its certificate is not trusted
+        trust_error = e.verify_message or str(e)
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        connection = _connect(context, hostname, port, timeout)
+
+    with connection:
+        cipher_name, protocol, _ = connection.cipher()
+        certificate = _describe_certificate(connection.getpeercert()) if trust_error is None else None
+        result = {
+            'ip_address': connection.getpeername()[0],
+            'protocol': protocol,
+            'cipher': cipher_name,
+            # TLS 1.3 suites are always ephemeral; earlier suites need (EC)DHE key exchange
+            'forward_secrecy': protocol == 'TLSv1.3' or 'DHE' in cipher_name,
+            'trusted': trust_error is None,
+            'trust_error': trust_error,
+            'certificate': certificate,
+            'hsts_max_age': _hsts_max_age(connection, hostname, timeout),
+        }
+    return result
+
+
+def _connect(context, hostname, port, timeout):
+    sock = socket.create_connection((hostname, port), timeout=timeout)
+    try:
+        return context.wrap_socket(sock, server_hostname=hostname)
+    except BaseException:
+        sock.close()
+        raise
+
+
+# True/False for a completed/refused handshake restricted to one protocol
+# version, None when it could not be tested (e.g. disabled in the local OpenSSL)
+def _probe_protocol(hostname, port, timeout, version):
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    try:
+        context.minimum_version = version
+        context.maximum_version = version
+        if version < ssl.TLSVersion.TLSv1_2:
+            context.set_ciphers('ALL:@SECLEVEL=0')
+    except (ValueError, ssl.SSLError):
+        return None
+    try:
+        with _connect(context, hostname, port, timeout):
+            return True
+    except ssl.SSLError:
+        return False
+    except OSError:
+        return None
+
+
+def _describe_certificate(cert):
+    if not cert:
+        return None
+    not_after = cert.get('notAfter')
+    expires_at = ssl.cert_time_to_seconds(not_after) if not_after else None
+    return {
+        'subject': _name(cert.get('subject', ())),
+        'issuer': _name(cert.get('issuer', ())),
+        'not_after': not_after,
+        'days_remaining': int((expires_at - time.time()) // 86400) if expires_at else None,
+    }
+
+
+def _name(rdns):
+    fields = dict(pair for rdn in rdns for pair in rdn)
+    return fields.get('commonName') or fields.get('organizationName')
+
+
+def _hsts_max_age(connection, hostname, timeout):
+    try:
+        connection.settimeout(timeout)
+        connection.sendall(
+            f"HEAD / HTTP/1.1\r\nHost: {hostname}\r\nUser-Agent: UIUXAnalyzer\r\nConnection: close\r\n\r\n".encode('ascii')
+        )
+        head = b''
+        while b'\r\n\r\n' not in head and len(head) < 65536:
+            chunk = connection.recv(4096)
+            if not chunk:
+                break
+            head += chunk
+    except OSError:
+        return None
+
+    for line in head.split(b'\r\n\r\n', 1)[0].decode('latin-1').split('\r\n')[1:]:
+        name, _, value = line.partition(':')
+        if name.strip().lower() != 'strict-transport-security':
+            continue
+        for directive in value.split(';'):
+            key, _, number = directive.strip().partition('=')
+            if key.lower() == 'max-age' and number.strip().strip('"').isdigit():
+                return int(number.strip().strip('"'))
+        return 0
+    return None
+
+
+# Metrics for the security rules, using SSL Labs' field names and encodings where
+# there is an equivalent (forward_secrecy 2: with modern browsers, cert_issues
+# bit 0: no chain of trust) and local fields the SSL Labs metrics never set.
+def tls_metrics(handshake, protocols):
+    certificate = handshake['certificate'] or {}
+    hsts_max_age = handshake['hsts_max_age']
+    supports_modern_tls = bool(protocols.get('TLSv1.2') or protocols.get('TLSv1.3'))
+    return {
+        'forward_secrecy': 2 if handshake['forward_secrecy'] else 0,
+        # RC4 is not probed (the local OpenSSL cannot negotiate it)
+        'supports_rc4': None,
+        'hsts_status': 'present' if hsts_max_age else 'absent',
+        'hsts_long_max_age': bool(hsts_max_age and hsts_max_age >= HSTS_LONG_MAX_AGE),
+        'hsts_short_max_age': bool(hsts_max_age and hsts_max_age < HSTS_LONG_MAX_AGE),
+        'cert_issues': 0 if handshake['trusted'] else 1,
+        'cert_not_after': certificate.get('not_after'),
+        'cert_days_remaining': certificate.get('days_remaining'),
+        'trust_error': handshake['trust_error'],
+        'has_warnings': False,
+        'legacy_protocols': ', '.join(name for name in LEGACY_PROTOCOLS if protocols.get(name)),
+        'supports_modern_tls': supports_modern_tls,
+        # Only worth recommending once TLS 1.2 is there
+        'supports_tls13': protocols.get('TLSv1.3') if supports_modern_tls else None,
+    }
+
+
+def _grade(metrics):
+    for cap in GRADE_CAPS:
+        if OPERATORS[cap['op']](metrics.get(cap['field']), cap.get('threshold')):
+            return cap['grade']
+    return 'A+' if metrics['hsts_long_max_age'] else 'A'
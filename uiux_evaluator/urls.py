@@ -1,7 +1,32 @@
+from django.conf import settings
 from django.urls import path
-from .views import UIUXRecommendationAPIView, WebsiteFullScanAPIView
+from .views import (
+    UIUXRecommendationAPIView, WebsiteFullScanAPIView, ScanJobDetailAPIView, ScanJobPagesAPIView,
+    ScanReportDetailAPIView, ScanHistoryAPIView, RawPayloadDetailAPIView, BatchAnalysisAPIView, MetricsAPIView
+)
+
+# Under ASGI (hackathon_app/asgi.py) the analysis endpoints are served by their
+# async counterparts, which keep the same request and response contract. The
+# remaining sync views are short database reads.
+if getattr(settings, 'UIUX_ASYNC_VIEWS', False):
+    from .async_views import AsyncUIUXRecommendationView, AsyncWebsiteFullScanView, AsyncBatchAnalysisView
+
+    recommendation_view = AsyncUIUXRecommendationView.as_view()
+    full_scan_view = AsyncWebsiteFullScanView.as_view()
+    batch_view = AsyncBatchAnalysisView.as_view()
+else:
+    recommendation_view = UIUXRecommendationAPIView.as_view()
+    full_scan_view = WebsiteFullScanAPIView.as_view()
+    batch_view = BatchAnalysisAPIView.as_view()
 
 urlpatterns = [
-    path("", UIUXRecommendationAPIView.as_view(), name='uiux-feedback'),
-    path("full-scan/", WebsiteFullScanAPIView.as_view(), name='website-full-scan'),
+    path("", recommendation_view, name='uiux-feedback'),
+    path("full-scan/", full_scan_view, name='website-full-scan'),
+    path("batch/", batch_view, name='batch-analysis'),
+    path("full-scan/jobs/<uuid:pk>/", ScanJobDetailAPIView.as_view(), name='scan-job-detail'),
+    path("full-scan/jobs/<uuid:pk>/pages/", ScanJobPagesAPIView.as_view(), name='scan-job-pages'),
+    path("reports/", ScanHistoryAPIView.as_view(), name='scan-history'),
+    path("reports/<int:pk>/", ScanReportDetailAPIView.as_view(), name='scan-report-detail'),
+    path("reports/raw/<str:digest>/", RawPayloadDetailAPIView.as_view(), name='raw-payload-detail'),
+    path("metrics/", MetricsAPIView.as_view(), name='metrics'),
 ]
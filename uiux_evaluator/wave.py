@@ -0,0 +1,47 @@
+# Compact, fixed-size view of a WAVE (reporttype 4) response. The raw report
+# lists every selector for every item and grows with the page; the features
+# below are bounded by the number of categories and top_n.
+
+WAVE_CATEGORIES = ('error', 'contrast', 'alert', 'feature', 'structure', 'aria')
+ISSUE_CATEGORIES = ('error', 'contrast', 'alert', 'aria')
+DEFAULT_TOP_ITEMS = 5
+
+
+def extract_wave_features(data, top_n=DEFAULT_TOP_ITEMS):
+    status = data.get('status', {})
+    stats = data.get('statistics', {})
+    categories = data.get('categories', {})
+
+    top_items = {}
+    for name in ISSUE_CATEGORIES:
+        items = (categories.get(name, {}).get('items') or {}).values()
+        ranked = sorted(items, key=lambda item: (-item.get('count', 0), item.get('id', '')))[:top_n]
+        if ranked:
+            top_items[name] = [
+                {'id': item.get('id'), 'description': item.get('description'), 'count': item.get('count', 0)}
+                for item in ranked
+            ]
+
+    return {
+        'success': bool(status.get('success', False)),
+        'http_status': status.get('httpstatuscode', 'Unknown'),
+        'page': {
+            'title': stats.get('pagetitle', 'Unknown page'),
+            'url': stats.get('pageurl', 'Unknown URL'),
+            'total_elements': stats.get('totalelements', 0),
+        },
+        'error_description': categories.get('error', {}).get('description', 'Errors'),
+        'counts': {name: categories.get(name, {}).get('count', 0) for name in WAVE_CATEGORIES},
+        'top_items': top_items,
+    }
+
+
+# The page-independent part of the features: what the LLM prompt (and its
+# memoization key) is built from
+def prompt_fields(features):
+    return {'counts': features['counts'], 'top_items': features['top_items']}
+
+
+# What the accessibility result returns next to its summary
+def result_fields(features):
+    return {'page': features['page'], 'counts': features['counts'], 'top_items': features['top_items']}